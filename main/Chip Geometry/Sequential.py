@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
-import subprocess
+import runpy
+import sys
 import time
 import os
 
 def run_script(path, display_name):
     """
     Attempt to run the given Python script, reporting success or error.
+    The script is executed in this interpreter (runpy), so NumPy & co. are
+    imported once for the whole sequence instead of once per script. The
+    script's folder is put on sys.path for the call, as `python path` would.
     Does not raise — errors are caught and logged so subsequent scripts still run.
     """
     if not os.path.exists(path):
@@ -13,13 +17,21 @@ def run_script(path, display_name):
         return
 
     print(f"🔄 Starting {display_name}...")
+    folder = os.path.dirname(os.path.abspath(path))
+    sys.path.insert(0, folder)
     try:
-        subprocess.run(["python", path], check=True)
+        runpy.run_path(path, run_name="__main__")
         print(f"✅ Finished {display_name}.\n")
-    except subprocess.CalledProcessError as e:
-        print(f"❌ {display_name} exited with error code {e.returncode}\n")
+    except SystemExit as e:
+        if e.code in (None, 0):
+            print(f"✅ Finished {display_name}.\n")
+        else:
+            print(f"❌ {display_name} exited with error code {e.code}\n")
     except Exception as e:
         print(f"❌ Unexpected error running {display_name}: {e}\n")
+    finally:
+        if folder in sys.path:
+            sys.path.remove(folder)
 
 def main():
     # Absolute paths to your scripts
@@ -7,22 +7,33 @@ from abaqusConstants import *
 from scipy.interpolate import UnivariateSpline
 from scipy.spatial import distance 
 from scipy.spatial.distance import cdist
+try:                                         # main/tracing.py, on PYTHONPATH when the loop traces
+    from tracing import set_process_name, span
+    set_process_name("chip extraction (final_code_for_Fegor.py)")
+except ImportError:
+    from contextlib import contextmanager
+
+    @contextmanager
+    def span(name, **args):
+        yield
 
 def extraction_evf_void(odb_path):
-    odb = openOdb(odb_path)
+    with span("ODB open", cat="extract"):
+        odb = openOdb(odb_path)
     element_set = odb.rootAssembly.instances['MASSIF-1'].elementSets['SET-MASSIF']
     step_name = list(odb.steps.keys())[0]
     step = odb.steps[step_name]
     frame = step.frames[-1]
     field_output = frame.fieldOutputs['EVF_VOID']
     filtered_results = []
-    for element in element_set.elements:
-        element_values = field_output.getSubset(region=element).values
-        for value in element_values:
-            filtered_results.append("{}, {}, {}".format(element.label, value.integrationPoint, value.data))
-    with open('evf_void_by_element.txt', 'w') as file:
-        file.write("Element Label, Integration Point, EVF_VOID\n")
-        file.write("\n".join(filtered_results)) 
+    with span("EVF read", cat="extract"):
+        for element in element_set.elements:
+            element_values = field_output.getSubset(region=element).values
+            for value in element_values:
+                filtered_results.append("{}, {}, {}".format(element.label, value.integrationPoint, value.data))
+        with open('evf_void_by_element.txt', 'w') as file:
+            file.write("Element Label, Integration Point, EVF_VOID\n")
+            file.write("\n".join(filtered_results)) 
 
 def detect_elements_isolated(input_file, output_file):
     with open(input_file, "r") as file:
@@ -235,16 +246,21 @@ def main(filename, p1, p2):
 
 filepath = "element_coordinates_with_labels.txt"
 odb_path = 'C:\\Users\\Ougbine\\Yil.odb'
+if "-odb" in sys.argv:                       # abaqus cae noGUI=... -- -odb <file>
+    odb_path = sys.argv[sys.argv.index("-odb") + 1]
 input_file = "evf_void_by_element.txt"
 output_file = "isolated_elements.txt"
 isolated_elements_file = 'isolated_elements.txt'
 extraction_evf_void(odb_path)
-detect_elements_isolated(input_file, output_file)
-nodes = lire_elements(output_file)
-extraire_coordonnees_odb(odb_path, 'isolated_elements.txt', 'element_coordinates_with_labels.txt')
-odb = openOdb(odb_path)
-coordinates = get_node_coordinates(odb, nodes) 
-distances_min = calculer_distances_min(filepath)  
+with span("detection", cat="extract"):
+    detect_elements_isolated(input_file, output_file)
+    nodes = lire_elements(output_file)
+with span("coordinates", cat="extract"):
+    extraire_coordonnees_odb(odb_path, 'isolated_elements.txt', 'element_coordinates_with_labels.txt')
+    odb = openOdb(odb_path)
+    coordinates = get_node_coordinates(odb, nodes) 
+with span("distance search", cat="extract"):
+    distances_min = calculer_distances_min(filepath)  
 
 ########## calcul de longueur de contact############
 def load_courbure2(filename):
@@ -278,6 +294,8 @@ p1 = np.array([-1.90702e-02,  1.00937e-01,  5.00000e-03])
 p2 = np.array([-2.99156e-02, -2.24936e-03,  5.00000e-03])
 
 
-distances_min = calculer_distances_min(filepath)
+with span("distance search", cat="extract"):
+    distances_min = calculer_distances_min(filepath)
 
-main("element_coordinates_with_labels.txt", p1, p2)
\ No newline at end of file
+with span("contact length", cat="extract"):
+    main("element_coordinates_with_labels.txt", p1, p2)
\ No newline at end of file
@@ -28,6 +28,17 @@ from datetime import datetime
 from odbAccess import openOdb, OdbError
 from abaqusConstants import *
 
+# main/tracing.py spans, when the loop runs with --trace (no-op otherwise) -- #
+try:
+    from tracing import set_process_name, span
+    set_process_name("force extraction (CutForce.py)")
+except ImportError:
+    from contextlib import contextmanager
+
+    @contextmanager
+    def span(name, **args):
+        yield
+
 # --------------------------------------------------------------------------- #
 #  User‑editable constants
 # --------------------------------------------------------------------------- #
@@ -67,7 +78,8 @@ log("Python inside Abaqus : " + platform.python_version())
 log("Opening ODB          : " + odb_path)
 
 try:
-    odb = openOdb(odb_path)
+    with span("ODB open", cat="extract"):
+        odb = openOdb(odb_path)
 except OdbError as e:
     log("!! Cannot open ODB – " + str(e))
     sys.exit(2)
@@ -102,13 +114,14 @@ step = odb.steps[step_name]
 rf_x = rf_y = 0.0
 count = 0
 
-for fr in step.frames:
-    rf_field = fr.fieldOutputs["RF"]
-    for val in rf_field.values:
-        if val.nodeLabel in node_labels:
-            rf_x += val.data[0]
-            rf_y += val.data[1]
-            count += 1
+with span("RF read", cat="extract", frames=len(step.frames)):
+    for fr in step.frames:
+        rf_field = fr.fieldOutputs["RF"]
+        for val in rf_field.values:
+            if val.nodeLabel in node_labels:
+                rf_x += val.data[0]
+                rf_y += val.data[1]
+                count += 1
 
 if count == 0:
     log("!! No RF data found for the RP node(s)")
@@ -5,14 +5,18 @@ Bound-constrained inverse identification (normalised version)
 Works in the space of *relative* parameters  x̃ = x / x0.
 A Gauss–Newton step is cast as a bound-constrained QP.
 
+The module can be run as a script (one step, written to finals_param.json)
+or imported – `gauss_newton_step` and `run_inverse` are what `pipeline.py`
+calls in-process.  The QP is solved by bounded_lsq.py (NumPy only);
+solver="cvxopt" still goes through qpsolvers for comparison.
+
 Dependencies
 ------------
-    python -m pip install "qpsolvers[cvxopt]"
+    python -m pip install "qpsolvers[cvxopt]"      # only for solver="cvxopt"
 """
 from pathlib import Path
 import json
 import numpy as np
-import qpsolvers as qp
 
 
 # ───────────────────────── helper I/O ─────────────────────────────
@@ -30,58 +34,97 @@ def save_json(obj, p: Path):
 base_dir = Path(r"C:\Users\ougbine")
 chip_dir = base_dir / "Desktop" / "Chip"
 
-# ────────────────────────── load data ─────────────────────────────
-x_old_data        = load_json(chip_dir / "extracted_values.json")
-numerical_vals    = np.array(load_json(base_dir / "sensitivity_param1.json"))
-jacobian_original = np.array(load_json(base_dir / "sensitivity_matrix.json"))
+# ─────────────── experimental reference (chip, Lc, Fc, Fp) ────────
 experimental_vals = np.array([0.396586993740339, 0.314197, 621.397, 192.064])
 
-# ───────────── current physical parameters  x0  (length 6) ───────
-x0 = np.array([
-    x_old_data["Taylor_Quinney"],
-    *x_old_data["JC_Hardening_ABNM"],
-    x_old_data["Strain_Rate_Hardening_Coefficient"][0],
-])
-
 # ─────────────── hard physical bounds (same order as x0) ──────────
 LB_phys = np.array([0.60,  400.00, 100.00, 0.05, 0.2, 0.005])
 UB_phys = np.array([0.95, 1100.00, 800.00, 0.80, 0.9, 0.900])
 
-# ───────────────────── 1) Jacobian in normalised space ────────────
-#   J_norm_ij = (∂F_j / ∂x_i) · x_i0   ––> multiply each column
-J = jacobian_original            # broadcasting (n_out × 6)
-
-# ───────────────────── 2) residual vector  F  (unchanged) ─────────
-F = experimental_vals - numerical_vals
-
-# ───────────────────── 3) bounds on Δx̃ (normalised step) ─────────
-lb_delta = (LB_phys - x0) / x0        # (LB − x0)/x0
-ub_delta = (UB_phys - x0) / x0
-
-# ───────────────────── 4) Gauss–Newton step as QP ─────────────────
-lam = 1e-2                             # Tikhonov parameter
-P = J.T @ J + lam * np.eye(J.shape[1]) # 6 × 6
-q = -J.T @ F                           # 6-vector
-
-try:
-    delta_tilde = qp.solve_qp(
-        P, q, lb=lb_delta, ub=ub_delta, solver="cvxopt"
-    )
-    if delta_tilde is None:
-        raise ValueError("QP solver returned None (infeasible / num. issue)")
-except Exception as err:
-    print(f"[warning] bounded QP step failed → {err}. Using unclipped GN step.")
-    delta_tilde = np.linalg.solve(P, -q)
-    delta_tilde = np.clip(delta_tilde, lb_delta, ub_delta)
-
-# ───────────────────── 5) convert step back to physical space ─────
-delta_phys = delta_tilde * x0          # δx = δx̃ · x0
-x_new      = np.clip(x0 + delta_phys, LB_phys, UB_phys)
-
-# ──────────────────────────── output  ─────────────────────────────
-# JSON on a single line
-print(json.dumps(x_new.tolist()))
-
-out_path = chip_dir / "finals_param.json"
-save_json(x_new.tolist(), out_path)
-print(f"Updated parameters saved to {out_path}")
+LAMBDA = 1e-2                          # Tikhonov parameter
+
+
+# ───────────── current physical parameters  x0  (length 6) ───────
+def current_parameters(x_old_data: dict) -> np.ndarray:
+    """(TQ, A, B, n, m, C) from an extracted_values.json record."""
+    return np.array([
+        x_old_data["Taylor_Quinney"],
+        *x_old_data["JC_Hardening_ABNM"],
+        x_old_data["Strain_Rate_Hardening_Coefficient"][0],
+    ])
+
+
+# ───────────────────── Gauss–Newton step as QP ────────────────────
+def gauss_newton_step(J, F, x0, lb_phys=LB_phys, ub_phys=UB_phys, lam=LAMBDA,
+                      solver="bounded_lsq"):
+    """
+    One bounded Gauss–Newton step in normalised space.
+
+    J  : (n_out × 6) Jacobian with columns already multiplied by x0
+    F  : residual  experimental − numerical
+    x0 : current physical parameters
+    Returns the new physical parameter vector, clipped to the bounds.
+    """
+    J = np.asarray(J, dtype=float)
+    F = np.asarray(F, dtype=float)
+    x0 = np.asarray(x0, dtype=float)
+
+    # bounds on Δx̃ (normalised step)
+    lb_delta = (lb_phys - x0) / x0        # (LB − x0)/x0
+    ub_delta = (ub_phys - x0) / x0
+
+    if solver == "bounded_lsq":
+        from bounded_lsq import solve_batch
+        delta_tilde = solve_batch(J, F, lam, lb_delta, ub_delta)[0]
+    else:
+        import qpsolvers as qp          # heavy (cvxopt) – only load when asked for
+
+        P = J.T @ J + lam * np.eye(J.shape[1]) # 6 × 6
+        q = -J.T @ F                           # 6-vector
+        try:
+            delta_tilde = qp.solve_qp(
+                P, q, lb=lb_delta, ub=ub_delta, solver=solver
+            )
+            if delta_tilde is None:
+                raise ValueError("QP solver returned None (infeasible / num. issue)")
+        except Exception as err:
+            print(f"[warning] bounded QP step failed → {err}. Using unclipped GN step.")
+            delta_tilde = np.linalg.solve(P, -q)
+            delta_tilde = np.clip(delta_tilde, lb_delta, ub_delta)
+
+    # convert step back to physical space:  δx = δx̃ · x0
+    delta_phys = delta_tilde * x0
+    return np.clip(x0 + delta_phys, lb_phys, ub_phys)
+
+
+def run_inverse(base_dir: Path = base_dir, chip_dir: Path = chip_dir) -> np.ndarray:
+    """Load the JSON inputs, take one step and write finals_param.json."""
+    # ────────────────────────── load data ─────────────────────────
+    x_old_data        = load_json(chip_dir / "extracted_values.json")
+    numerical_vals    = np.array(load_json(base_dir / "sensitivity_param1.json"))
+    jacobian_original = np.array(load_json(base_dir / "sensitivity_matrix.json"))
+
+    x0 = current_parameters(x_old_data)
+
+    # 1) Jacobian in normalised space
+    #   J_norm_ij = (∂F_j / ∂x_i) · x_i0   ––> multiply each column
+    J = jacobian_original            # broadcasting (n_out × 6)
+
+    # 2) residual vector  F
+    F = experimental_vals - numerical_vals
+
+    # 3)–5) bounded step, back in physical space
+    x_new = gauss_newton_step(J, F, x0)
+
+    # ──────────────────────────── output  ─────────────────────────
+    # JSON on a single line
+    print(json.dumps(x_new.tolist()))
+
+    out_path = chip_dir / "finals_param.json"
+    save_json(x_new.tolist(), out_path)
+    print(f"Updated parameters saved to {out_path}")
+    return x_new
+
+
+if __name__ == "__main__":
+    run_inverse()
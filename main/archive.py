@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+archive.py  —  a reduced snapshot of every extracted job, and which full ODBs to keep
+======================================================================================
+
+Every perturbation of every iteration leaves its full ODB behind
+(AChipInp.odb … Yil.odb, jobs/<name>/<name>.odb), although the loop only
+ever reads four numbers from it.  Once a job's outputs are extracted,
+scheduler.run_job (ARCHIVE) stores a snapshot.py snapshot with the
+cache entry, result_cache/<key[:2]>/<key>/snapshot.npz:
+
+    evf        float32   last-frame material volume fraction (1 − EVF_VOID)
+                         per Massif element, on the cached mesh (snapshot.MESH_DIR)
+    rf_time, rf          the Tool-1.Set-RP reaction force of every frame
+    meta                 job, x, outputs, deck, cpus, output profile
+
+read back with NumPy alone:  `load(key)` or snapshot.load(npz).  On a
+real ODB `snapshot_job` runs this file under `abaqus python` (the
+`export` below; odbAccess bulk data, no element loop); a fake_abaqus.py
+ODB already is a snapshot.
+
+The job folder then gets <name>.archived.json, and the ODB becomes
+subject to the retention policy, applied by `prune`:
+
+    RETENTION   all        keep every ODB
+                accepted   keep the ODBs of the start point and the accepted
+                           iterates only (identify.py prunes after each
+                           accepted step; the default)
+                none       keep none, not even the accepted ones
+    DISCARD     delete     an ODB not kept is deleted
+                compress   … or gzipped to <name>.odb.gz
+
+Only archived jobs of the identification output profile are pruned
+(validation runs are kept), and identify.py only prunes its own
+scheduler jobs (it00_…, it01_…) archived since it started.
+
+Run:
+    python archive.py export path/to/Yil.odb [Yil.npz]    # through `abaqus python`
+    python archive.py prune [--keep KEY ...] [--retention none] [--discard compress]
+    abaqus python archive.py -odb Yil.odb -out Yil.npz -mesh <key>   # what export runs
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import shutil
+import sys
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from snapshot import Snapshot, load as load_snapshot
+
+# ───────────────────────────── settings ──────────────────────────────
+HERE      = Path(__file__).resolve().parent
+RETENTION = "accepted"               # all | accepted | none
+DISCARD   = "delete"                 # delete | compress
+INSTANCE, ELSET = "MASSIF-1", "SET-MASSIF"
+TOOL, RP_SET    = "TOOL-1", "SET-RP"
+# ───────────────────────────────────────────────────────────────────────
+
+POLICIES = ("all", "accepted", "none")
+
+
+# ─────────────────────────── Abaqus side ──────────────────────────────
+def export(odb_path: Path, out: Path, mesh: str = "", meta: Optional[dict] = None) -> Path:
+    """Snapshot of an ODB (needs odbAccess: run under `abaqus python`)."""
+    from odbAccess import openOdb
+    odb = openOdb(str(odb_path), readOnly=True)
+    try:
+        step = odb.steps["Step-1"] if "Step-1" in odb.steps else odb.steps[list(odb.steps.keys())[0]]
+        region = odb.rootAssembly.instances[INSTANCE].elementSets[ELSET]
+        field = step.frames[-1].fieldOutputs["EVF_VOID"].getSubset(region=region)
+        blocks = field.bulkDataBlocks
+        labels = np.concatenate([np.asarray(b.elementLabels, dtype=np.int64) for b in blocks])
+        void = np.concatenate([np.asarray(b.data, dtype=np.float64).reshape(len(b.elementLabels), -1)[:, 0]
+                               for b in blocks])
+        # one value per element (mean over integration points, if several)
+        elements, inv = np.unique(labels, return_inverse=True)
+        void = np.bincount(inv, void) / np.bincount(inv)
+
+        rp = odb.rootAssembly.instances[TOOL].nodeSets[RP_SET]
+        rf_time, rf = [], []
+        for fr in step.frames:
+            total = np.zeros(3)
+            for v in fr.fieldOutputs["RF"].getSubset(region=rp).values:
+                d = np.asarray(v.data, dtype=float)
+                total[:d.size] += d
+            rf_time.append(fr.frameValue)
+            rf.append(total)
+    finally:
+        odb.close()
+    return Snapshot(1.0 - void, elements, rf_time, rf, mesh, meta).save(out)
+
+
+# ─────────────────────────── driver side ──────────────────────────────
+def snapshot_job(job, outputs: dict) -> Snapshot:
+    """The snapshot of a finished, extracted scheduler.Job."""
+    from snapshot import cache_mesh
+    if zipfile.is_zipfile(job.odb):                    # fake_abaqus.py: the ODB is a snapshot
+        snap = load_snapshot(job.odb)
+    else:
+        from scheduler import ABAQUS_CMD, _stage
+        out = job.workdir / f"{job.name}.snapshot.npz"
+        _stage(job, "archive", f'{ABAQUS_CMD} python "{Path(__file__).resolve()}" -odb "{job.odb}" -out "{out}" '
+               f'-mesh {cache_mesh(job.deck)}', f"archive '{job.name}'")
+        snap = load_snapshot(out)
+        out.unlink()
+    snap.meta.update(job=job.name, x=job.x, outputs=outputs, deck=str(job.deck), cpus=job.cpus,
+                     profile=job.profile, archived=datetime.now().isoformat(timespec="seconds"))
+    return snap
+
+
+def mark(job, key: str) -> Path:
+    """Record that the job's snapshot is in the cache; the ODB may now be pruned."""
+    path = job.workdir / f"{job.name}.archived.json"
+    path.write_text(json.dumps({"job": job.name, "key": key, "profile": job.profile, "time": time.time()}),
+                    encoding="utf-8")
+    if RETENTION == "none" and job.profile == "identification":
+        discard(job.odb)
+    return path
+
+
+def load(key: str, cache=None) -> Optional[Snapshot]:
+    """The archived snapshot of a cache key, or None."""
+    from result_cache import ResultCache
+    z = (cache or ResultCache()).snapshot(key)
+    if z is None:
+        return None
+    with z:
+        return load_snapshot(z)
+
+
+def key_of(x, template: Path = None) -> str:
+    """Cache key of a parameter vector on a template (the scheduler's)."""
+    from scheduler import TEMPLATE, Job
+    return Job("", x, template=template or TEMPLATE).key()
+
+
+# ─────────────────────────────── retention ────────────────────────────
+def discard(odb: Path, how: str = None) -> int:
+    """Delete or gzip one ODB; bytes freed."""
+    how = how or DISCARD
+    odb = Path(odb)
+    if not odb.is_file():
+        return 0
+    size = odb.stat().st_size
+    if how == "compress":
+        gz = odb.with_name(odb.name + ".gz")
+        with odb.open("rb") as src, gzip.open(gz, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        size -= gz.stat().st_size
+    elif how != "delete":
+        raise ValueError(f"DISCARD must be 'delete' or 'compress', not {how!r}")
+    odb.unlink()
+    return size
+
+
+def prune(keep: Iterable[str] = (), jobs_dir: Path = None, retention: str = None,
+          since: Optional[float] = None, how: str = None, pattern: str = "*") -> int:
+    """
+    Apply the retention policy to the archived identification jobs of
+    `jobs_dir` whose folder matches `pattern` (archived after `since`, if
+    given); `keep` are the cache keys of the accepted iterates.  Returns
+    the bytes freed.
+    """
+    retention = retention or RETENTION
+    if retention not in POLICIES:
+        raise ValueError(f"RETENTION must be one of {POLICIES}, not {retention!r}")
+    if retention == "all":
+        return 0
+    if jobs_dir is None:
+        from scheduler import JOBS_DIR as jobs_dir
+    keep = set(keep) if retention == "accepted" else set()
+    freed = n = 0
+    for marker in sorted(Path(jobs_dir).glob(f"{pattern}/*.archived.json")):
+        m = json.loads(marker.read_text(encoding="utf-8"))
+        if m.get("profile") != "identification" or m["key"] in keep or (since and m["time"] < since):
+            continue
+        b = discard(marker.parent / f"{m['job']}.odb", how)
+        freed, n = freed + b, n + bool(b)
+    if n:
+        print(f"  ⊘ {n} ODB(s) pruned ({retention}, {how or DISCARD}): {freed / 2 ** 20:.1f} MB freed")
+    return freed
+
+
+def main(argv: List[str] = None) -> None:
+    import argparse
+    argv = sys.argv[1:] if argv is None else argv
+    if "-odb" in argv:                                 # under `abaqus python`
+        opt = lambda k, d="": argv[argv.index(k) + 1] if k in argv else d
+        odb = Path(opt("-odb"))
+        out = export(odb, Path(opt("-out", str(odb.with_suffix(".npz")))), opt("-mesh"))
+        print("snapshot written to " + str(out))       # plain ASCII: the Abaqus console may not be UTF-8
+        return
+    ap = argparse.ArgumentParser(description="Reduced snapshots of ODBs and the ODB retention policy.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    e = sub.add_parser("export", help="snapshot one ODB through `abaqus python`")
+    e.add_argument("odb", type=Path)
+    e.add_argument("out", type=Path, nargs="?")
+    p = sub.add_parser("prune", help="apply the retention policy to the archived jobs")
+    p.add_argument("--keep", nargs="*", default=[], help="cache keys of ODBs to keep")
+    p.add_argument("--retention", choices=POLICIES, default=RETENTION)
+    p.add_argument("--discard", choices=("delete", "compress"), default=DISCARD)
+    p.add_argument("--jobs", type=Path, default=None, help="jobs folder (default: scheduler.JOBS_DIR)")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "prune":
+        prune(args.keep, args.jobs, args.retention, how=args.discard)
+        return
+    from scheduler import ABAQUS_CMD, _run
+    from snapshot import cache_mesh
+    odb = args.odb.resolve()
+    out = (args.out or odb.with_suffix(".npz")).resolve()
+    deck = odb.with_suffix(".inp")                     # the mesh, when the deck is next to the ODB
+    mesh = f" -mesh {cache_mesh(deck)}" if deck.is_file() else ""
+    _run(f'{ABAQUS_CMD} python "{Path(__file__).resolve()}" -odb "{odb}" -out "{out}"{mesh}', odb.parent,
+         f"archive '{odb.name}'")
+    print(f"✓ {out}")
+
+
+if __name__ == "__main__":
+    main()
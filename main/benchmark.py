@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+benchmark.py  —  shared bits of the benchmark scripts: timing, memory, records
+================================================================================
+
+geometry_bench.py and deck_bench.py append one JSON line per measurement
+to bench/<name>.jsonl, each with the environment it ran in (time, host,
+Python/NumPy versions, git commit), so a regression shows up as a jump
+between two lines of the same file:
+
+    python -c "import benchmark; benchmark.show('bench/geometry.jsonl')"
+
+Run:
+    python benchmark.py bench/geometry.jsonl         # last records as a table
+"""
+
+from __future__ import annotations
+
+import json
+import platform
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, List, Tuple
+
+import numpy as np
+
+HERE      = Path(__file__).resolve().parent
+BENCH_DIR = HERE / "bench"
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=str(HERE), text=True,
+                                capture_output=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {"timestamp": datetime.now().isoformat(timespec="seconds"), "host": socket.gethostname(),
+            "platform": platform.platform(), "python": platform.python_version(),
+            "numpy": np.__version__, "commit": commit}
+
+
+def timed(fn: Callable, *args, repeat: int = 1, **kw) -> Tuple[float, object]:
+    """(best wall time of `repeat` calls, result of the last one)."""
+    best, result = float("inf"), None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        result = fn(*args, **kw)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def peak_memory(fn: Callable, *args, **kw) -> int:
+    """Peak bytes allocated by Python during one call (a separate, slower, traced call)."""
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    try:
+        fn(*args, **kw)
+        return tracemalloc.get_traced_memory()[1] - base
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+
+def append(path: Path, records: Iterable[dict]) -> Path:
+    """Append records (with the environment) to a JSON-lines file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    env = environment()
+    with path.open("a", encoding="utf-8") as fh:
+        for r in records:
+            fh.write(json.dumps({**env, **r}) + "\n")
+    return path
+
+
+def show(path: Path, last: int = 20) -> None:
+    rows = [json.loads(l) for l in Path(path).read_text(encoding="utf-8").splitlines() if l.strip()]
+    for r in rows[-last:]:
+        stages = r.get("stages") or r.get("metrics") or {}
+        print(f"{r['timestamp']} {r.get('commit') or '-':>8}  {r.get('case', ''):<28} "
+              + "  ".join(f"{k} {v:.3g}" for k, v in stages.items() if isinstance(v, (int, float))))
+
+
+def main(argv: List[str] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        sys.exit("usage: python benchmark.py bench/<name>.jsonl")
+    show(Path(argv[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+bounded_lsq.py  —  batched bounded damped least squares for the 6-parameter step
+================================================================================
+
+Every Gauss–Newton step in this project is the same small problem
+
+    min_δ  ½‖J δ − F‖² + ½ λ ‖δ‖²      subject to   lb ≤ δ ≤ ub
+
+(δ the relative step, J the normalised Jacobian, 4 × 6).  Inverse.py used to
+hand it to qpsolvers/cvxopt one (λ, F) at a time, which costs a heavy import
+and an interior-point solve per call — fine for one step, slow for a whole
+damping path or a batch of candidate residuals.
+
+Here the batch is solved at once with a projected Newton method (Bertsekas,
+1982), vectorised over the leading axis:
+
+    g      = P δ + q                     P = JᵀJ + λI,  q = −JᵀF
+    w      = ‖δ − clip(δ − g)‖           (zero exactly at the optimum)
+    active = {i : δ_i ≤ lb_i + ε, g_i > 0}  ∪  {i : δ_i ≥ ub_i − ε, g_i < 0}
+             ε = min(EPS_ACTIVE, w)      (the ε-active set)
+    p      = Newton step on the free variables, −g_i / P_ii on the active ones
+    δ      ← clip(δ + α p)               α = 1, ½, ¼, …  (Armijo, all α at once)
+
+until w vanishes.  P is positive definite for λ > 0, so each pair
+converges in a handful of iterations; once the active set is right the
+α = 1 step lands exactly on the QP solution.  Without the ε margin a
+variable that approaches its bound without reaching it is never released
+or fixed, and the method can stall away from the optimum on the badly
+scaled matrices of this project; so every step is checked: a pair whose
+KKT residual w is still above tolerance is solved again by bounded-
+variable least squares (scipy.optimize.lsq_linear, method="bvls", on
+[J; √λ I] δ ≈ [F; 0]), and one that even that cannot solve raises.
+
+    D = solve_batch(J, F, lams, lb, ub)           # (B × 6) relative steps
+    X = gauss_newton_steps(J, F, x0, lams)        # (B × 6) physical points
+
+The benchmark compares both paths on the stored sensitivity_matrix.json over
+a λ path: where they differ, it is cvxopt stopping at its own tolerance on a
+badly scaled problem (forces in N against geometry in mm) — the KKT
+residual it prints says which answer is the optimum.
+
+Run (speed and agreement against the cvxopt path; --check compares the
+batch with BVLS on random bounded problems and fails on any mismatch):
+    python bounded_lsq.py [--pairs 200] [--repeat 3]
+    python bounded_lsq.py --check 3000
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+# ───────────────────────────── settings ──────────────────────────────
+TOL      = 1e-12           # on the projected gradient, relative to ‖q‖
+MAX_ITER = 50
+ARMIJO   = 1e-4
+N_ALPHA  = 30              # backtracking lengths 1, ½, … tried in one go
+EPS_ACTIVE = 1e-3          # ε of the ε-active set (relative step)
+KKT_TOL  = 1e-8            # KKT residual accepted, relative to 1 + ‖q‖
+# ───────────────────────────────────────────────────────────────────────
+
+
+def _batch(J, F, lam, lb, ub):
+    """Broadcast (F, λ, bounds) to a common batch size B."""
+    J = np.asarray(J, dtype=float)
+    F = np.atleast_2d(np.asarray(F, dtype=float))
+    lam = np.atleast_1d(np.asarray(lam, dtype=float))
+    n = J.shape[1]
+    B = np.broadcast_shapes((F.shape[0],), lam.shape)[0]
+    F = np.broadcast_to(F, (B, J.shape[0]))
+    lam = np.broadcast_to(lam, (B,))
+    lb = np.broadcast_to(np.asarray(lb, dtype=float), (B, n))
+    ub = np.broadcast_to(np.asarray(ub, dtype=float), (B, n))
+    if np.any(lam < 0):
+        raise ValueError("λ must be non-negative")
+    if np.any(lb > ub):
+        raise ValueError("lower bound above upper bound")
+    return J, F, lam, lb, ub
+
+
+def solve_batch(J, F, lam, lb, ub, tol: float = TOL, max_iter: int = MAX_ITER) -> np.ndarray:
+    """
+    Bounded damped least-squares steps for a batch of (λ, F) pairs.
+
+    J      : (n_out × n) Jacobian, shared by the batch
+    F      : (n_out,) or (B × n_out) residuals
+    lam    : scalar or (B,) damping
+    lb, ub : (n,) or (B × n) bounds on the step
+    Returns the (B × n) steps; a single pair still gives a 1 × n array.
+    Pairs the projected Newton loop leaves above KKT_TOL are re-solved by
+    BVLS (`_bvls`); ArithmeticError if a pair is still not optimal.
+    ValueError for λ ≤ 0, where JᵀJ + λI may be singular.
+    """
+    J, F, lam, lb, ub = _batch(J, F, lam, lb, ub)
+    if np.any(lam <= 0):
+        raise ValueError("λ must be positive")
+    B, n = lb.shape
+    eye = np.eye(n)
+    P = (J.T @ J)[None] + lam[:, None, None] * eye
+    q = -F @ J
+    scale = tol * (1.0 + np.linalg.norm(q, axis=1))
+    alphas = 0.5 ** np.arange(N_ALPHA)
+
+    def objective(D):                                   # (..., n) → (...)
+        PD = np.einsum("bij,b...j->b...i", P, D)
+        return 0.5 * np.einsum("b...i,b...i->b...", D, PD) + np.einsum("bi,b...i->b...", q, D)
+
+    diag = np.einsum("bii->bi", P)
+    D = np.clip(np.zeros((B, n)), lb, ub)
+    todo = np.ones(B, dtype=bool)
+    for _ in range(max_iter):
+        g = np.einsum("bij,bj->bi", P, D) + q
+        w = np.linalg.norm(D - np.clip(D - g, lb, ub), axis=1)
+        todo = w > scale
+        if not todo.any():
+            break
+
+        eps = np.minimum(EPS_ACTIVE, w)[:, None]
+        active = ((D <= lb + eps) & (g > 0)) | ((D >= ub - eps) & (g < 0))
+        free = ~active
+        M = np.where(free[:, :, None] & free[:, None, :], P, eye)
+        p = np.linalg.solve(M, np.where(free, -g, 0.0)[..., None])[..., 0]
+        p = np.where(active, -g / np.where(diag > 0, diag, 1.0), p)
+
+        trial = np.clip(D[:, None, :] + alphas[None, :, None] * p[:, None, :],
+                        lb[:, None, :], ub[:, None, :])         # B × N_ALPHA × n
+        f0 = objective(D)
+        ok = objective(trial) <= f0[:, None] + ARMIJO * np.einsum("bi,bki->bk", g, trial - D[:, None, :])
+        first = np.argmax(ok, axis=1)
+        step = ok.any(axis=1) & todo
+        D = np.where(step[:, None], trial[np.arange(B), first], D)
+        if not step.any():                                # stalled at round-off
+            break
+
+    bad = np.flatnonzero(kkt_residual(J, F, lam, lb, ub, D) > KKT_TOL * (1.0 + np.linalg.norm(q, axis=1)))
+    for b in bad:
+        D[b] = _bvls(J, F[b], lam[b], lb[b], ub[b])
+    return D
+
+
+def _bvls(J, f, lam, lb, ub) -> np.ndarray:
+    """One pair by bounded-variable least squares; the fallback of solve_batch."""
+    from scipy.optimize import lsq_linear
+    n = J.shape[1]
+    A = np.vstack([J, np.sqrt(lam) * np.eye(n)])
+    d = lsq_linear(A, np.concatenate([f, np.zeros(n)]), bounds=(lb, ub), method="bvls", tol=1e-14).x
+    d = np.clip(d, lb, ub)
+    q = -f @ J
+    if kkt_residual(J, f, lam, lb, ub, d)[0] > KKT_TOL * (1.0 + np.linalg.norm(q)):
+        raise ArithmeticError(f"bounded least squares did not converge at λ = {lam:g}")
+    return d
+
+
+def gauss_newton_steps(J, F, x0, lam, lb_phys=None, ub_phys=None) -> np.ndarray:
+    """
+    Batched counterpart of Inverse.gauss_newton_step: (B × 6) new physical
+    parameter vectors for the (λ, F) pairs, clipped to the physical bounds.
+    """
+    import Inverse
+    lb_phys = Inverse.LB_phys if lb_phys is None else np.asarray(lb_phys, dtype=float)
+    ub_phys = Inverse.UB_phys if ub_phys is None else np.asarray(ub_phys, dtype=float)
+    x0 = np.asarray(x0, dtype=float)
+    D = solve_batch(J, F, lam, (lb_phys - x0) / x0, (ub_phys - x0) / x0)
+    return np.clip(x0 + D * x0, lb_phys, ub_phys)
+
+
+def kkt_residual(J, F, lam, lb, ub, D) -> np.ndarray:
+    """‖δ − clip(δ − ∇)‖ per pair: zero exactly at the bounded optimum."""
+    J, F, lam, lb, ub = _batch(J, F, lam, lb, ub)
+    D = np.atleast_2d(D)
+    g = D @ (J.T @ J) + lam[:, None] * D - F @ J
+    return np.linalg.norm(D - np.clip(D - g, lb, ub), axis=1)
+
+
+# ─────────────────────────────── benchmark ───────────────────────────
+def _cvxopt_batch(J, F, lam, lb, ub) -> np.ndarray:
+    import qpsolvers as qp
+    J, F, lam, lb, ub = _batch(J, F, lam, lb, ub)
+    out = []
+    for f, l, lo, hi in zip(F, lam, lb, ub):
+        P = J.T @ J + l * np.eye(J.shape[1])
+        out.append(qp.solve_qp(P, -J.T @ f, lb=lo, ub=hi, solver="cvxopt"))
+    return np.array(out)
+
+
+def benchmark(n_pairs: int = 200, repeat: int = 3, seed: int = 0) -> dict:
+    """Time both paths on the stored Jacobian over a λ path × perturbed residuals."""
+    import Inverse
+    here = Path(__file__).resolve().parent
+    J = np.array(Inverse.load_json(here / "sensitivity_matrix.json"))
+    y = np.array(Inverse.load_json(here / "sensitivity_param1.json"))
+    x0 = np.array([0.948820, 1069.572082, 720.362473, 0.561582, 0.828054, 0.041972])
+    lb, ub = (Inverse.LB_phys - x0) / x0, (Inverse.UB_phys - x0) / x0
+
+    rng = np.random.default_rng(seed)
+    lam = np.logspace(-4, 4, n_pairs)
+    F = (Inverse.experimental_vals - y) * (1.0 + 0.5 * rng.standard_normal((n_pairs, y.size)))
+
+    t_vec = min(_timed(solve_batch, J, F, lam, lb, ub) for _ in range(repeat))
+    t_cvx = min(_timed(_cvxopt_batch, J, F, lam, lb, ub) for _ in range(repeat))
+    D_vec, D_cvx = solve_batch(J, F, lam, lb, ub), _cvxopt_batch(J, F, lam, lb, ub)
+
+    return {"pairs": n_pairs, "t_batch_s": t_vec, "t_cvxopt_s": t_cvx,
+            "speedup": t_cvx / t_vec,
+            "max_abs_diff": float(np.max(np.abs(D_vec - D_cvx))),
+            "kkt_batch": float(np.max(kkt_residual(J, F, lam, lb, ub, D_vec))),
+            "kkt_cvxopt": float(np.max(kkt_residual(J, F, lam, lb, ub, D_cvx)))}
+
+
+def check(n_problems: int = 3000, seed: int = 0) -> dict:
+    """
+    solve_batch against BVLS on random bounded 4 × 6 problems (columns
+    scaled over four decades, λ over seven): the pairs where the batch
+    objective is above the reference one, and the largest step difference.
+    """
+    rng = np.random.default_rng(seed)
+    J = rng.standard_normal((n_problems, 4, 6)) * 10.0 ** rng.uniform(-2, 2, (n_problems, 1, 6))
+    F = 3.0 * rng.standard_normal((n_problems, 4))
+    lam = 10.0 ** rng.uniform(-5, 2, n_problems)
+    lb, ub = -rng.uniform(0.05, 1.0, (n_problems, 6)), rng.uniform(0.05, 1.0, (n_problems, 6))
+
+    def objective(j, f, l, d):
+        return 0.5 * np.sum((j @ d - f) ** 2) + 0.5 * l * d @ d
+
+    worse, max_diff = [], 0.0
+    for k in range(n_problems):
+        d = solve_batch(J[k], F[k], lam[k], lb[k], ub[k])[0]
+        ref = _bvls(J[k], F[k], lam[k], lb[k], ub[k])
+        f_d, f_ref = objective(J[k], F[k], lam[k], d), objective(J[k], F[k], lam[k], ref)
+        if f_d > f_ref + 1e-9 * (1.0 + abs(f_ref)):
+            worse.append({"problem": k, "lam": float(lam[k]), "objective": f_d, "optimum": f_ref})
+        max_diff = max(max_diff, float(np.max(np.abs(d - ref))))
+    return {"problems": n_problems, "worse": worse, "max_abs_diff": max_diff}
+
+
+def _timed(fn, *args) -> float:
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+def main(argv: List[str] = None) -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the batched solver against cvxopt.")
+    ap.add_argument("--pairs", type=int, default=200, help="(λ, F) pairs per batch")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--check", type=int, default=None, metavar="N",
+                    help="compare with BVLS on N random bounded problems instead")
+    args = ap.parse_args(argv)
+
+    if args.check is not None:
+        r = check(args.check)
+        for w in r["worse"]:
+            print(f"  ⚠️ problem {w['problem']}: λ = {w['lam']:.2g}, objective {w['objective']:.6g} "
+                  f"> optimum {w['optimum']:.6g}")
+        print(f"{'✓' if not r['worse'] else '⚠️'} {r['problems'] - len(r['worse'])}/{r['problems']} at the "
+              f"BVLS optimum, max |Δδ| = {r['max_abs_diff']:.1e}")
+        sys.exit(1 if r["worse"] else 0)
+
+    r = benchmark(args.pairs, args.repeat)
+    print(f"{r['pairs']} (λ, F) pairs")
+    print(f"  batched projected Newton : {r['t_batch_s'] * 1e3:9.2f} ms")
+    print(f"  cvxopt, one by one       : {r['t_cvxopt_s'] * 1e3:9.2f} ms   (×{r['speedup']:.0f})")
+    print(f"  max |Δδ| = {r['max_abs_diff']:.2e}   "
+          f"KKT residual: batched {r['kkt_batch']:.1e}, cvxopt {r['kkt_cvxopt']:.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+coarsen.py  —  the Massif mesh at twice the element size, sets and surfaces remapped
+=====================================================================================
+
+The Eulerian Massif in Href.inp is a structured 93 × 144 × 1 grid of
+EC3D8RT elements (94 × 145 × 2 nodes, numbered row by row, then layer by
+layer).  `coarsen_deck` writes a copy of a deck with that grid coarsened
+FACTOR times in the cutting plane; the single layer through the thickness
+stays as it is (the model is 2.5-D):
+
+  • every FACTOR-th node line is kept, plus the last one, so the outer
+    boundary and the grading of the fine mesh are preserved exactly
+    (93 columns → 46 of width 2 and one of width 1);
+  • nodes and elements are renumbered in the same row-by-row order;
+  • a node set keeps the coarse nodes whose fine node was in it;
+  • an element set (including the internal elsets behind Surf-In,
+    Surf-Out and Surf-Top) takes a coarse element when at least half of
+    the fine elements it covers were in it.  The face labels S4/S5/S6 of
+    the surfaces are unchanged, as the element orientation is.
+
+Everything else (Tool part, materials, BCs, step, output requests) is
+copied line for line, so the result is a drop-in low-fidelity template
+for multifidelity.py.  Explicit cost goes as (elements) × (1 / stable
+increment).  The stable increment of Href.inp is set by the 0.005 layer
+thickness, not by the in-plane size (stable_time.py), so it does not grow
+with FACTOR: FACTOR 2 gives ≈ 4 times fewer element updates.
+
+Run:
+    python coarsen.py [deck.inp] [out.inp] [--factor 2]
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from inp_deck import TEMPLATE, Block, Deck, format_ids
+
+# ───────────────────────────── settings ──────────────────────────────
+PART     = "Massif"                # structured Eulerian part
+INSTANCE = "Massif-1"              # its instance in the assembly
+FACTOR   = 2                       # element size multiplier in the cutting plane
+# ───────────────────────────────────────────────────────────────────────
+
+
+class Grid:
+    """Node and element numbering of a structured hexahedral grid."""
+
+    def __init__(self, nodes: np.ndarray, elements: np.ndarray):
+        self.node_ids = nodes[:, 0].astype(int)
+        self.elem_ids = elements[:, 0].astype(int)
+        conn = elements[:, 1:9].astype(int)
+        c0 = conn[0]
+        self.ni = c0[3] - c0[0]                     # nodes along a row
+        layer = c0[4] - c0[0]
+        if self.ni <= 1 or layer % self.ni:
+            raise ValueError(f"Part '{PART}' is not a structured row-by-row grid")
+        self.nj = layer // self.ni
+        self.nk = len(self.node_ids) // layer
+        if not (np.array_equal(self.node_ids, np.arange(1, self.nk * layer + 1))
+                and np.array_equal(self.elem_ids, np.arange(1, len(self.elem_ids) + 1))
+                and len(self.elem_ids) == (self.ni - 1) * (self.nj - 1) * (self.nk - 1)
+                and np.array_equal(conn, self.connectivity(self.ni, self.nj, self.nk))):
+            raise ValueError(f"Part '{PART}' is not a structured row-by-row grid")
+        self.nodes = nodes
+
+    @staticmethod
+    def connectivity(ni: int, nj: int, nk: int) -> np.ndarray:
+        """EC3D8RT connectivity of an ni × nj × nk node grid, elements row by row."""
+        k, j, i = np.meshgrid(np.arange(nk - 1), np.arange(nj - 1), np.arange(ni - 1), indexing="ij")
+        n = lambda di, dj, dk: 1 + (i + di) + ni * ((j + dj) + nj * (k + dk))
+        cols = [n(0, 0, 0), n(1, 0, 0), n(1, 1, 0), n(0, 1, 0),
+                n(0, 0, 1), n(1, 0, 1), n(1, 1, 1), n(0, 1, 1)]
+        return np.stack([c.ravel() for c in cols], axis=1)
+
+    def node_index(self, ids) -> tuple:
+        """(i, j, k) of node labels."""
+        z = np.asarray(ids, dtype=int) - 1
+        return z % self.ni, (z // self.ni) % self.nj, z // (self.ni * self.nj)
+
+    def elem_index(self, ids) -> tuple:
+        z = np.asarray(ids, dtype=int) - 1
+        ei, ej = self.ni - 1, self.nj - 1
+        return z % ei, (z // ei) % ej, z // (ei * ej)
+
+
+def kept_lines(n: int, factor: int) -> np.ndarray:
+    """Indices of the node lines kept out of n: every factor-th and the last."""
+    return np.union1d(np.arange(0, n, factor), [n - 1])
+
+
+class Coarsening:
+    """Fine → coarse label maps for one grid and factor."""
+
+    def __init__(self, grid: Grid, factor: int = FACTOR):
+        self.grid = grid
+        self.ki = kept_lines(grid.ni, factor)
+        self.kj = kept_lines(grid.nj, factor)
+        self.ni, self.nj, self.nk = len(self.ki), len(self.kj), grid.nk
+
+        # fine node → coarse label, 0 where its node line is dropped
+        ci = np.zeros(grid.ni, dtype=int) - 1
+        cj = np.zeros(grid.nj, dtype=int) - 1
+        ci[self.ki] = np.arange(self.ni)
+        cj[self.kj] = np.arange(self.nj)
+        i, j, k = grid.node_index(grid.node_ids)
+        keep = (ci[i] >= 0) & (cj[j] >= 0)
+        self.node_map = np.where(keep, 1 + ci[i] + self.ni * (cj[j] + self.nj * k), 0)
+
+        # fine element (i, j, k) → coarse element containing it
+        ei, ej, ek = grid.elem_index(grid.elem_ids)
+        bi = np.searchsorted(self.ki, ei, side="right") - 1
+        bj = np.searchsorted(self.kj, ej, side="right") - 1
+        self.elem_map = 1 + bi + (self.ni - 1) * (bj + (self.nj - 1) * ek)
+        self.n_elements = (self.ni - 1) * (self.nj - 1) * (self.nk - 1)
+        self.block_size = np.bincount(self.elem_map, minlength=self.n_elements + 1)
+
+    def nodes(self, ids) -> np.ndarray:
+        mapped = self.node_map[np.asarray(ids, dtype=int) - 1]
+        return np.unique(mapped[mapped > 0])
+
+    def elements(self, ids) -> np.ndarray:
+        counts = np.bincount(self.elem_map[np.asarray(ids, dtype=int) - 1],
+                             minlength=self.n_elements + 1)
+        return np.flatnonzero((counts > 0) & (2 * counts >= self.block_size))
+
+
+def _set_block(block: Block, ids: np.ndarray) -> None:
+    """Rewrite a set block's data with new labels (generate kept for a full range)."""
+    comments = [l for l in block.data if l.startswith("**")]
+    if "generate" in block.params:
+        if len(ids) and np.array_equal(ids, np.arange(ids[0], ids[-1] + 1)):
+            block.data = [f" {ids[0]}, {ids[-1]}, 1\n"] + comments
+            return
+        block.line = block.line.replace(", generate", "").replace(",generate", "")
+        del block.params["generate"]
+    block.data = format_ids(ids) + comments
+
+
+def coarsen_deck(src: Path = TEMPLATE, dst: Path = None, factor: int = FACTOR,
+                 part: str = PART, instance: str = INSTANCE) -> Dict[str, object]:
+    """Write the coarsened copy of `src` to `dst`; returns a summary."""
+    src = Path(src)
+    dst = Path(dst) if dst is not None else src.with_name(f"{src.stem}_coarse{factor}.inp")
+    deck = Deck.read(src)
+    node_block = deck.first("node", part=part)
+    elem_block = deck.first("element", part=part)
+    if node_block is None or elem_block is None:
+        raise ValueError(f"No *Node / *Element block in part '{part}' of {src}")
+
+    grid = Grid(node_block.table(), elem_block.table())
+    c = Coarsening(grid, factor)
+
+    fine_lines = node_block.data_lines()
+    kept = np.flatnonzero(c.node_map)
+    order = kept[np.argsort(c.node_map[kept])]
+    node_block.data = [f"{c.node_map[z]:7d}," + fine_lines[z].split(",", 1)[1] for z in order]
+    conn = Grid.connectivity(c.ni, c.nj, c.nk)
+    elem_block.data = [f"{e + 1:6d}, " + ", ".join(str(n) for n in row) + "\n"
+                       for e, row in enumerate(conn)]
+
+    empty: List[str] = []
+    for b in deck.blocks:
+        if b.name not in ("nset", "elset"):
+            continue
+        if not (b.part == part or (b.part is None and (b.instance or "").lower() == instance.lower())):
+            continue
+        ids = c.nodes(b.ids()) if b.name == "nset" else c.elements(b.ids())
+        if not len(ids):
+            empty.append(b.params[b.name])
+        _set_block(b, ids)
+    if empty:
+        raise ValueError(f"Sets left empty by the coarsening: {empty}")
+
+    heading = deck.first("heading")
+    if heading is not None:
+        heading.data.append(f"** Massif mesh coarsened {factor}x from {src.name} (coarsen.py)\n")
+    deck.write(dst)
+    return {"deck": dst, "fine": (grid.ni - 1, grid.nj - 1, grid.nk - 1),
+            "coarse": (c.ni - 1, c.nj - 1, c.nk - 1),
+            "nodes": (len(grid.node_ids), len(order)),
+            "elements": (len(grid.elem_ids), c.n_elements)}
+
+
+def main(argv: List[str] = None) -> None:
+    ap = argparse.ArgumentParser(description="Coarsen the structured Massif mesh of a deck.")
+    ap.add_argument("deck", nargs="?", default=str(TEMPLATE))
+    ap.add_argument("out", nargs="?", default=None)
+    ap.add_argument("--factor", type=int, default=FACTOR)
+    args = ap.parse_args(argv)
+
+    s = coarsen_deck(Path(args.deck), args.out and Path(args.out), args.factor)
+    print(f"✓ {s['deck']}: {'×'.join(map(str, s['fine']))} → {'×'.join(map(str, s['coarse']))} "
+          f"elements ({s['elements'][0]} → {s['elements'][1]}, nodes {s['nodes'][0]} → {s['nodes'][1]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,10 +11,9 @@ Outputs
   each label in the same row order.
 
 The script also dumps both structures to the console so you can visually
-confirm the layout.
+confirm the layout.  `combine()` does the same work when imported.
 """
 import json
-import os
 from pathlib import Path
 
 # ---------------------------------------------------------------------------
@@ -32,6 +31,8 @@ BASE_DIRS = {
 SENS_FILE = "sensitivity_results.json"          # raw sensitivities (Parameter 1)
 NORM_FILE = "normalised_sensitivities.json"     # normalised sensitivities (2–7)
 
+PARAM_KEYS = [f"Sensitivity_Parameter_{i}" for i in range(2, 8)]  # 2 → 7
+
 # ---------------------------------------------------------------------------
 # Utility helpers
 # ---------------------------------------------------------------------------
@@ -46,46 +47,62 @@ def load_json(path: Path) -> dict:
 # ---------------------------------------------------------------------------
 # Part 1 – collect Parameter 1 into a flat list
 # ---------------------------------------------------------------------------
-print("\nCollecting Sensitivity_Parameter_1 …")
-param1_values = []  # flat list → length 4
-for label in LABELS:
-    data = load_json(BASE_DIRS[label] / SENS_FILE)
-    try:
-        param1_values.append(float(data["Sensitivity_Parameter_1"]))
-    except KeyError as exc:
-        raise KeyError(f"'Sensitivity_Parameter_1' missing in {label}") from exc
-
-with open("sensitivity_param1.json", "w", encoding="utf-8") as fp:
-    json.dump(param1_values, fp, separators=(',', ':'))  # one‑dim list
+
+def collect_param1(base_dirs: dict = BASE_DIRS) -> list:
+    print("\nCollecting Sensitivity_Parameter_1 …")
+    param1_values = []  # flat list → length 4
+    for label in LABELS:
+        data = load_json(base_dirs[label] / SENS_FILE)
+        try:
+            param1_values.append(float(data["Sensitivity_Parameter_1"]))
+        except KeyError as exc:
+            raise KeyError(f"'Sensitivity_Parameter_1' missing in {label}") from exc
+    return param1_values
 
 # ---------------------------------------------------------------------------
 # Part 2 – build the 4 × 6 matrix for parameters 2–7
 # ---------------------------------------------------------------------------
-print("Collecting Sensitivity_Parameters 2–7 …")
-PARAM_KEYS = [f"Sensitivity_Parameter_{i}" for i in range(2, 8)]  # 2 → 7
-matrix = []
 
-for label in LABELS:
-    data = load_json(BASE_DIRS[label] / NORM_FILE)
-    row = []
-    for key in PARAM_KEYS:
-        try:
-            row.append(float(data[key]))
-        except KeyError as exc:
-            raise KeyError(f"'{key}' missing in {label}") from exc
-    matrix.append(row)
-
-with open("sensitivity_matrix.json", "w", encoding="utf-8") as fp:
-    json.dump(matrix, fp, separators=(',', ':'))
+def collect_matrix(base_dirs: dict = BASE_DIRS) -> list:
+    print("Collecting Sensitivity_Parameters 2–7 …")
+    matrix = []
+    for label in LABELS:
+        data = load_json(base_dirs[label] / NORM_FILE)
+        row = []
+        for key in PARAM_KEYS:
+            try:
+                row.append(float(data[key]))
+            except KeyError as exc:
+                raise KeyError(f"'{key}' missing in {label}") from exc
+        matrix.append(row)
+    return matrix
 
 # ---------------------------------------------------------------------------
-# User‑friendly console output (multi‑line for readability)
+# Write both files + user‑friendly console output
 # ---------------------------------------------------------------------------
-print("\nParameter 1 list (length {n}):".format(n=len(param1_values)))
-print(param1_values)
 
-print("\nSensitivity matrix (shape {r}×{c}):".format(r=len(matrix), c=len(PARAM_KEYS)))
-for row in matrix:
-    print(row)
+def combine(base_dirs: dict = BASE_DIRS, out_dir: Path = None):
+    """Build both structures, write them to *out_dir* (default: cwd)."""
+    out_dir = Path(out_dir) if out_dir is not None else Path.cwd()
+
+    param1_values = collect_param1(base_dirs)
+    with open(out_dir / "sensitivity_param1.json", "w", encoding="utf-8") as fp:
+        json.dump(param1_values, fp, separators=(',', ':'))  # one‑dim list
+
+    matrix = collect_matrix(base_dirs)
+    with open(out_dir / "sensitivity_matrix.json", "w", encoding="utf-8") as fp:
+        json.dump(matrix, fp, separators=(',', ':'))
+
+    print("\nParameter 1 list (length {n}):".format(n=len(param1_values)))
+    print(param1_values)
+
+    print("\nSensitivity matrix (shape {r}×{c}):".format(r=len(matrix), c=len(PARAM_KEYS)))
+    for row in matrix:
+        print(row)
+
+    print("\nDone! › Files written to: " + str(out_dir))
+    return param1_values, matrix
+
 
-print("\nDone! › Files written to: " + os.getcwd())
+if __name__ == "__main__":
+    combine()
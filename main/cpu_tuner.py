@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+cpu_tuner.py  —  how many CPUs per job, given N jobs and C cores
+=================================================================
+
+Function_Script.py submits with cpus=4, memory="4GB", the *Chip.py scripts
+with cpus=1, memory="2GB", and nothing says either is right.  Explicit
+Eulerian jobs scale sublinearly, so for a batch the question is not "how
+fast is one job" but "how fast is the batch":
+
+    T(p)       wall time of one job on p CPUs          (measured speedup curve)
+    k(p)       = min(⌊C / p⌋, max_workers, token limit)  jobs at a time
+    makespan   = ⌈N / k⌉ · T(p)                          (jobs run in waves)
+    throughput = k / T(p)                                 (jobs per second, N → ∞)
+
+`allocate` tries every p ≤ C and keeps the best one for the chosen
+objective (fewer CPUs on ties).  Seven jobs on 28 cores then get 4 CPUs
+each and run side by side, instead of one after the other on 28.  If
+LICENSE_TOKENS is set, jobs also share the Abaqus token pool
+(⌊5 p^0.422⌋ tokens per job).
+
+T(p) comes from `benchmark`: the same deck solved once per CPU count, one
+run at a time so they do not compete, timed around the solver only (with
+fake_abaqus.py as ABAQUS_CMD for a dry run of the tuner itself).  The
+curve is saved to cpu_speedup.json; between measured points, and without
+any measurement, the Amdahl fit of stable_time.py's calibration is used.
+
+scheduler.run_batch(jobs, cores=C) applies the allocation to a batch.
+
+Run:
+    python cpu_tuner.py benchmark [--cpus 1 2 4 8 16]
+    python cpu_tuner.py plan 7 --cores 28 [--objective throughput]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# ───────────────────────────── settings ──────────────────────────────
+HERE           = Path(__file__).resolve().parent
+SPEEDUP_PATH   = HERE / "cpu_speedup.json"
+BENCH_CPUS     = (1, 2, 4, 8)
+LICENSE_TOKENS = None          # Abaqus tokens available to a batch (None: not limiting)
+OBJECTIVES     = ("makespan", "throughput")
+# ───────────────────────────────────────────────────────────────────────
+
+
+def tokens(cpus: int) -> int:
+    """Abaqus analysis tokens checked out by one job on `cpus` CPUs: int(5 · N^0.422)."""
+    return int(5 * max(1, cpus) ** 0.422)
+
+
+class SpeedupCurve:
+    """Wall time T(p) of one job: measured points, Amdahl in between and beyond."""
+
+    def __init__(self, cpus: Sequence[int] = (), wall: Sequence[float] = (),
+                 t1: float = None, serial: float = None):
+        self.cpus = np.asarray(cpus, dtype=float)
+        self.wall = np.asarray(wall, dtype=float)
+        if t1 is None or serial is None:
+            from stable_time import fit_amdahl, load_calibration, predict
+            if self.cpus.size:
+                t1, serial = fit_amdahl(self.cpus, self.wall)
+            else:
+                cal = load_calibration()
+                t1, serial = predict(cal=cal, cpus=(1,))["wall"][1], cal["serial"]
+        self.t1, self.serial = float(t1), float(serial)
+
+    @classmethod
+    def load(cls, path: Path = SPEEDUP_PATH) -> "SpeedupCurve":
+        if not path.is_file():
+            return cls()
+        d = json.loads(path.read_text(encoding="utf-8"))
+        return cls(d["cpus"], d["wall"])
+
+    def save(self, path: Path = SPEEDUP_PATH) -> Path:
+        path.write_text(json.dumps({"cpus": self.cpus.astype(int).tolist(), "wall": self.wall.tolist(),
+                                    "t1": self.t1, "serial": self.serial}, indent=2), encoding="utf-8")
+        return path
+
+    def __call__(self, p) -> np.ndarray:
+        p = np.asarray(p, dtype=float)
+        amdahl = self.t1 * (self.serial + (1 - self.serial) / p)
+        if self.cpus.size < 2:
+            return amdahl
+        # measured points, log-log interpolated; Amdahl outside the measured range
+        order = np.argsort(self.cpus)
+        inside = (p >= self.cpus.min()) & (p <= self.cpus.max())
+        interp = np.exp(np.interp(np.log(p), np.log(self.cpus[order]), np.log(self.wall[order])))
+        return np.where(inside, interp, amdahl)
+
+    def speedup(self, p) -> np.ndarray:
+        return self(1) / self(p)
+
+
+def allocate(n_jobs: int, cores: int, curve: Optional[SpeedupCurve] = None,
+             objective: str = "makespan", max_workers: Optional[int] = None,
+             license_tokens: Optional[int] = LICENSE_TOKENS) -> Dict[str, float]:
+    """Best CPUs per job for n_jobs on `cores` cores: {cpus, workers, makespan, throughput}."""
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {OBJECTIVES}")
+    curve = curve or SpeedupCurve.load()
+    best = None
+    for p in range(1, cores + 1):
+        k = min(cores // p, n_jobs, max_workers or n_jobs)
+        if license_tokens is not None:
+            k = min(k, license_tokens // tokens(p))
+        if k < 1:
+            continue
+        T = float(curve(p))
+        plan = {"cpus": p, "workers": k, "makespan": int(np.ceil(n_jobs / k)) * T, "throughput": k / T}
+        score = plan["makespan"] if objective == "makespan" else -plan["throughput"]
+        if best is None or score < best[0] * (1 - 1e-9):
+            best = (score, plan)
+    if best is None:
+        raise ValueError("Not a single job fits the cores / tokens given")
+    return best[1]
+
+
+def benchmark(cpus: Sequence[int] = BENCH_CPUS, x=None, name: str = "tune") -> SpeedupCurve:
+    """Solve the template once per CPU count (no cache, no extraction) and time it."""
+    from scheduler import Job, submit, write_deck
+    if x is None:
+        from result_cache import deck_params
+        from scheduler import TEMPLATE
+        x = deck_params(TEMPLATE)
+    walls = []
+    for p in cpus:
+        job = Job(f"{name}_p{p}", x, cpus=p)
+        write_deck(job)
+        t0 = time.perf_counter()
+        submit(job)
+        walls.append(time.perf_counter() - t0)
+        print(f"  ⚡ {p:>3} CPU(s): {walls[-1]:8.1f} s  (speedup {walls[0] / walls[-1]:.2f})")
+    return SpeedupCurve(cpus, walls)
+
+
+def main(argv: List[str] = None) -> None:
+    ap = argparse.ArgumentParser(description="CPU allocation for batches of Abaqus jobs.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("benchmark", help="measure the speedup curve on this node")
+    b.add_argument("--cpus", type=int, nargs="+", default=list(BENCH_CPUS))
+    pl = sub.add_parser("plan", help="CPUs per job for a batch")
+    pl.add_argument("n", type=int, help="number of pending jobs")
+    pl.add_argument("--cores", type=int, required=True)
+    pl.add_argument("--objective", choices=OBJECTIVES, default="makespan")
+    pl.add_argument("--workers", type=int, default=None, help="cap on concurrent jobs")
+    pl.add_argument("--tokens", type=int, default=LICENSE_TOKENS, help="license tokens available")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "benchmark":
+        curve = benchmark(args.cpus)
+        print(f"✓ Speedup curve saved to {curve.save()} (Amdahl serial fraction {curve.serial:.2f})")
+        return
+
+    curve = SpeedupCurve.load()
+    best = allocate(args.n, args.cores, curve, args.objective, args.workers, args.tokens)
+    print(f"{args.n} jobs on {args.cores} cores ({args.objective}): {best['cpus']} CPU(s) × "
+          f"{best['workers']} concurrent → makespan {best['makespan'] / 3600:.2f} h, "
+          f"{best['throughput'] * 3600:.2f} jobs/h")
+    for p in sorted({1, 2, 4, 8, args.cores} & set(range(1, args.cores + 1))):
+        k = min(args.cores // p, args.n)
+        print(f"    {p:>3} CPU(s): T = {float(curve(p)) / 3600:6.2f} h, speedup {float(curve.speedup(p)):5.2f}, "
+              f"{k} at a time → makespan {np.ceil(args.n / k) * float(curve(p)) / 3600:6.2f} h")
+
+
+if __name__ == "__main__":
+    main()
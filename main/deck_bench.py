@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+deck_bench.py  —  time, peak memory and bytes written of the deck writers
+==========================================================================
+
+Every deck the loop runs is written by one of these, each reading the
+whole template with readlines() and writing it back line by line:
+
+    process_inp_file              Function_Script.py   (all three JC blocks)
+    modify_first_plastic_value    AChip.py             (A)
+    modify_second_plastic_value   BChip.py             (B)
+    modify_third_plastic_value    NChip.py             (n)
+    modify_fourth_plastic_value   MChip.py             (m)
+    modify_rate_first_value       rchip.py             (C)
+    process_inelastic_only        TQChip.py            (TQ)
+
+Each is measured on Href.inp (43k lines) and on synthetic decks of
+--lines lines: Href.inp with the Massif *Node block padded by relabelled
+copies of its own lines, so the material blocks stay at the end of a
+realistic deck.  A batch of N variants (a finite-difference stencil, a
+DoE) is measured too, as N process_inp_file calls against the
+one-read DeckTemplate of scheduler.write_decks.
+
+Per case: wall time (best of --repeat), peak Python memory of one
+separate traced call (tracemalloc) and the bytes written.  One line per
+case goes to bench/deck.jsonl (benchmark.py); any new deck engine has to
+beat these lines with the same output bytes.
+
+Run:
+    python deck_bench.py                          # Href + 250k + 1M lines, batches 7 13 64
+    python deck_bench.py --lines 2000000 --batch 128 --repeat 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import re
+import tempfile
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import benchmark
+from inp_deck import Deck
+
+# ───────────────────────────── settings ──────────────────────────────
+HERE    = Path(__file__).resolve().parent
+OUT     = benchmark.BENCH_DIR / "deck.jsonl"
+LINES   = (250_000, 1_000_000)
+BATCH   = (7, 13, 64)
+FACTOR  = 1.2                   # what the *Chip.py scripts multiply by
+# ───────────────────────────────────────────────────────────────────────
+
+P_LABEL = re.compile(r"^(\s*)(\d+)")
+
+
+def writers() -> Dict[str, Callable[[str, str, list], None]]:
+    """Name → writer(inp, out, x), each one of the repo's functions."""
+    from AChip import modify_first_plastic_value
+    from BChip import modify_second_plastic_value
+    from Function_Script import process_inp_file
+    from MChip import modify_fourth_plastic_value
+    from NChip import modify_third_plastic_value
+    from TQChip import process_inelastic_only
+    from rchip import modify_rate_first_value
+    from scheduler import format_params
+
+    def full(inp, out, x):
+        inelastic, plastic, rate = format_params(x)
+        process_inp_file(inp, out, new_inelastic_params=inelastic, new_plastic_params=plastic,
+                         new_rate_params=rate)
+
+    single = {f.__name__: f for f in (modify_first_plastic_value, modify_second_plastic_value,
+                                      modify_third_plastic_value, modify_fourth_plastic_value,
+                                      modify_rate_first_value, process_inelastic_only)}
+    out = {"process_inp_file": full}
+    out.update({name: (lambda f: lambda inp, o, x: f(inp, o, FACTOR))(f) for name, f in single.items()})
+    return out
+
+
+def synthetic_deck(lines: int, out: Path, template: Path = None) -> Path:
+    """The template with its Massif *Node block padded to `lines` lines in total."""
+    from scheduler import TEMPLATE
+    deck = Deck.read(template or TEMPLATE)
+    total = sum(len(b.data) + bool(b.line) for b in deck.blocks)
+    nodes = deck.first("node", part="Massif")
+    source = nodes.data_lines()
+    offset = max(int(P_LABEL.match(l).group(2)) for l in source)
+    extra = []
+    for n in range(max(0, lines - total)):
+        l = source[n % len(source)]
+        m = P_LABEL.match(l)
+        label = str(offset + n + 1)
+        extra.append(label.rjust(m.end()) + l[m.end():])              # same column widths
+    nodes.data.extend(extra)
+    deck.write(out)
+    return out
+
+
+def _quiet(fn, *args):
+    with redirect_stdout(io.StringIO()):
+        return fn(*args)
+
+
+def measure(fn: Callable, outputs: List[Path], repeat: int = 1) -> dict:
+    """Time, traced peak memory and bytes written of fn()."""
+    seconds, _ = benchmark.timed(_quiet, fn, repeat=repeat)
+    peak = benchmark.peak_memory(_quiet, fn)
+    written = sum(p.stat().st_size for p in outputs if p.is_file())
+    return {"time": seconds, "peak_mb": peak / 2 ** 20, "written_mb": written / 2 ** 20}
+
+
+def bench(lines=LINES, batch=BATCH, repeat: int = 1, x=None) -> List[dict]:
+    from scheduler import TEMPLATE, DeckTemplate, Job
+    from result_cache import deck_params
+    x = x if x is not None else deck_params(TEMPLATE)
+    href_lines = sum(1 for _ in TEMPLATE.open("r"))
+    records = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        decks = [("Href", TEMPLATE)] + [(f"synthetic {n}", synthetic_deck(n, tmp / f"deck_{n}.inp")) for n in lines]
+        for label, deck in decks:
+            n_lines = sum(1 for _ in deck.open("r"))
+            for name, write in writers().items():
+                out = tmp / "out.inp"
+                m = measure(lambda: write(str(deck), str(out), x), [out], repeat)
+                records.append({"case": f"{name} @ {label}", "function": name, "deck": label,
+                                "lines": n_lines, "deck_mb": deck.stat().st_size / 2 ** 20, "variants": 1,
+                                "metrics": m})
+                print(f"  {name:<30} {label:<18} {n_lines:>9} lines  {m['time']:8.3f} s  "
+                      f"{m['peak_mb']:8.1f} MB peak  {m['written_mb']:8.1f} MB written")
+
+        # batches of variants: N independent calls vs one DeckTemplate
+        import scheduler
+        jobs_dir = scheduler.JOBS_DIR
+        scheduler.JOBS_DIR = tmp / "jobs"
+        try:
+            for n in batch:
+                jobs = [Job(f"v{k}", [v * (1 + 0.01 * k) for v in x]) for k in range(n)]
+                outs = [j.deck for j in jobs]
+
+                def each():
+                    from Function_Script import process_inp_file
+                    for j in jobs:
+                        j.workdir.mkdir(parents=True, exist_ok=True)
+                        inelastic, plastic, rate = scheduler.format_params(j.x)
+                        process_inp_file(str(TEMPLATE), str(j.deck), new_inelastic_params=inelastic,
+                                         new_plastic_params=plastic, new_rate_params=rate)
+
+                def once():
+                    tpl = DeckTemplate(TEMPLATE)
+                    for j in jobs:
+                        tpl.write(j)
+
+                for name, fn in (("process_inp_file ×N", each), ("DeckTemplate", once)):
+                    m = measure(fn, outs, repeat)
+                    m["per_deck"] = m["time"] / n
+                    records.append({"case": f"{name} @ Href, N={n}", "function": name, "deck": "Href",
+                                    "lines": href_lines, "variants": n, "metrics": m})
+                    print(f"  {name:<30} N={n:<16} {m['per_deck'] * 1e3:9.1f} ms/deck  {m['time']:8.3f} s  "
+                          f"{m['peak_mb']:8.1f} MB peak  {m['written_mb']:8.1f} MB written")
+        finally:
+            scheduler.JOBS_DIR = jobs_dir
+    return records
+
+
+def main(argv: List[str] = None) -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the deck writers on Href.inp, large decks and batches.")
+    ap.add_argument("--lines", type=int, nargs="*", default=list(LINES), help="synthetic deck sizes")
+    ap.add_argument("--batch", type=int, nargs="*", default=list(BATCH), help="variants per batch")
+    ap.add_argument("--repeat", type=int, default=1, help="best of N")
+    ap.add_argument("--out", type=Path, default=OUT)
+    args = ap.parse_args(argv)
+    records = bench(args.lines, args.batch, args.repeat)
+    print(f"✓ {len(records)} record(s) appended to {benchmark.append(args.out, records)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+doe.py  —  space-filling design of experiments inside the physical bounds
+=========================================================================
+
+Instead of hand-editing SCALE_FACTOR in AChip.py, BChip.py, … one factor at
+a time, sample the whole box  LB_phys ≤ x ≤ UB_phys  of Inverse.py:
+
+    lhs     Latin hypercube (every parameter stratified into n bins)
+    sobol   scrambled Sobol sequence (best with n a power of two)
+
+All decks are written in one pass over the template (scheduler.write_decks),
+then submitted as one throttled batch through scheduler.run_batch, at most
+`--workers` Abaqus jobs at a time.  Every job puts its outputs into the
+result cache and runs.jsonl the moment it finishes, so a half-finished
+DoE already feeds surrogate.py and local_jacobian.py; re-running the same
+design only submits what is still missing.
+
+The design is saved as doe/<name>.json (method, seed, template, points)
+so `--status` can report progress and a crashed campaign can be resumed on
+the template it started on.  Runs on a scaled template (`--scaled`) are
+tagged with it in runs.jsonl and kept out of the default
+RunDatabase.arrays(), so they never mix with the fine samples.
+
+Run:
+    python doe.py 32 --method sobol --workers 4 --name sobol32
+    python doe.py 32 --method sobol --cores 28      # CPUs per job chosen by cpu_tuner.py
+    python doe.py 20 --method lhs --seed 7 --dry-run
+    python doe.py 64 --method sobol --scaled       # on the accepted mass/time-scaled deck
+    python doe.py --status sobol32
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import warnings
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from result_cache import PARAM_DECIMALS, ResultCache
+
+HERE    = Path(__file__).resolve().parent
+DOE_DIR = HERE / "doe"
+
+METHODS = ("lhs", "sobol")
+
+
+def sample(n: int, method: str = "lhs", lb=None, ub=None, seed=None) -> np.ndarray:
+    """n × 6 points inside [lb, ub] (default: Inverse.LB_phys / UB_phys)."""
+    from scipy.stats import qmc
+
+    if lb is None or ub is None:
+        from Inverse import LB_phys, UB_phys
+        lb = LB_phys if lb is None else lb
+        ub = UB_phys if ub is None else ub
+    lb, ub = np.asarray(lb, dtype=float), np.asarray(ub, dtype=float)
+
+    if method == "lhs":
+        sampler = qmc.LatinHypercube(d=lb.size, seed=seed)
+    elif method == "sobol":
+        sampler = qmc.Sobol(d=lb.size, scramble=True, seed=seed)
+    else:
+        raise ValueError(f"method must be one of {METHODS}")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)       # Sobol balance warning for n ≠ 2^k
+        U = sampler.random(n)
+    return np.round(qmc.scale(U, lb, ub), PARAM_DECIMALS)
+
+
+def design_path(name: str) -> Path:
+    return DOE_DIR / f"{name}.json"
+
+
+def save_design(name: str, X, method: str, seed, template: Path = None) -> Path:
+    if template is None:
+        from scheduler import TEMPLATE as template
+    DOE_DIR.mkdir(parents=True, exist_ok=True)
+    path = design_path(name)
+    path.write_text(json.dumps({"name": name, "method": method, "seed": seed, "template": str(template),
+                                "points": np.asarray(X).tolist()}, indent=2), encoding="utf-8")
+    return path
+
+
+def load_design(name: str) -> dict:
+    path = design_path(name)
+    if not path.is_file():
+        raise FileNotFoundError(f"No design '{name}' in {DOE_DIR}")
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def jobs_for(name: str, X, **job_kw) -> list:
+    from scheduler import Job
+    return [Job(f"{name}_{i:03d}", x, **job_kw) for i, x in enumerate(X)]
+
+
+def design_template(design: dict) -> Path:
+    """The template a saved design runs on (designs saved before it was stored: the default)."""
+    if design.get("template"):
+        return Path(design["template"])
+    from scheduler import TEMPLATE
+    return TEMPLATE
+
+
+def status(name: str, cache: ResultCache = None) -> dict:
+    """How many points of a saved design are already in the cache."""
+    cache = cache if cache is not None else ResultCache()
+    d = load_design(name)
+    jobs = jobs_for(name, d["points"], template=design_template(d))
+    done = [j.name for j in jobs if j.key() in cache]
+    return {"total": len(jobs), "done": len(done),
+            "missing": [j.name for j in jobs if j.name not in done]}
+
+
+def run_doe(name: str, X, max_workers: int = None, cores: int = None, **job_kw) -> dict:
+    """Submit the design as one throttled batch; returns run_batch's results."""
+    from scheduler import MAX_WORKERS, run_batch
+    jobs = jobs_for(name, X, **job_kw)
+    return run_batch(jobs, max_workers=max_workers or MAX_WORKERS, cores=cores)
+
+
+def main(argv: List[str] = None) -> None:
+    ap = argparse.ArgumentParser(description="Space-filling DoE through the job scheduler.")
+    ap.add_argument("n", nargs="?", type=int, help="number of points")
+    ap.add_argument("--method", choices=METHODS, default="lhs")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--name", default=None, help="design name (default: <method><n>)")
+    ap.add_argument("--workers", type=int, default=None, help="concurrent Abaqus jobs")
+    ap.add_argument("--cores", type=int, default=None, help="cores to share (CPUs per job from cpu_tuner)")
+    ap.add_argument("--scaled", action="store_true",
+                    help="run on the mass/time-scaled template accepted by mass_scaling.py")
+    ap.add_argument("--dry-run", action="store_true", help="only sample and save the design")
+    ap.add_argument("--status", metavar="NAME", help="progress of a saved design")
+    args = ap.parse_args(argv)
+
+    if args.status:
+        st = status(args.status)
+        print(f"{args.status}: {st['done']}/{st['total']} points in the cache")
+        for n in st["missing"]:
+            print(f"  missing  {n}")
+        return
+    if not args.n:
+        ap.error("n is required unless --status is given")
+
+    name = args.name or f"{args.method}{args.n}"
+    if design_path(name).is_file():
+        d = load_design(name)
+        X, template = np.array(d["points"]), design_template(d)
+        print(f"Resuming design '{name}' ({d['method']}, {len(X)} points on {template.name})")
+        if args.scaled:
+            print("⚠️ --scaled ignored: a saved design keeps its template")
+    else:
+        template = None
+        if args.scaled:
+            from mass_scaling import accepted_template
+            template = accepted_template()
+        X = sample(args.n, args.method, seed=args.seed)
+        print(f"✓ Design saved to {save_design(name, X, args.method, args.seed, template)}")
+    if args.dry_run:
+        for i, x in enumerate(X):
+            print(f"  {name}_{i:03d}  {x.tolist()}")
+        return
+
+    job_kw = {} if template is None else {"template": template}
+    results = run_doe(name, X, args.workers, args.cores, **job_kw)
+    failed = [n for n, r in results.items() if isinstance(r, Exception)]
+    print(f"✓ {len(results) - len(failed)}/{len(results)} DoE runs done"
+          + (f", failed: {failed}" if failed else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+fd_planner.py  —  finite-difference stencils for the Jacobian, run as one batch
+===============================================================================
+
+The old chain perturbed each parameter by a hand-set factor (×1.2 in
+AChip.py, ×1.05 in TQChip.py, …) while Gradient.py divided by  eps = 0.2·x,
+so the step used in the difference did not match the step applied.  Here
+the planner decides the steps, rounds every stencil point to what the deck
+actually carries (6 decimals), and sensitivity.py differences against the
+parameter vectors that were really simulated.
+
+Per parameter j the scheme is
+    forward   x0,  x0 + h_j x0_j e_j                      (n + 1 runs)
+    central   x0,  x0 ± h_j x0_j e_j                      (2n + 1 runs)
+and h_j (relative) is either given, or sized adaptively from the output
+noise σ_i and the curvature c_ij = ∂²F_i/∂x̃_j² of a previous stencil:
+
+    forward   h_ij = 2 √(σ_i / |c_ij|)        (truncation ≈ noise error)
+    central   h_ij = (3 σ_i / |c_ij|)^(1/3)   (c_ij standing in for F''')
+
+taking, per parameter, the median over outputs, clipped to [H_MIN, H_MAX].
+σ_i is observed rather than assumed where runs.jsonl allows
+(`estimate_noise`): the pooled spread of runs repeated at the same
+parameters, else the residual scatter of the local affine fit around x0
+(local_jacobian.fit, which curvature inflates, so steps err long);
+DEFAULT_NOISE only when neither has NOISE_DOF degrees of freedom.
+Central differences double the run count, which only pays off because the
+whole stencil goes to scheduler.run_batch as one concurrent batch.  Every
+central stencil leaves its curvature in curvature.json for the next plan.
+
+Points stay inside the physical bounds (Inverse.LB_phys/UB_phys): a
+forward point that would leave the box is taken backward instead, a
+central one is shortened (or moved to the other side when x0 is on the
+bound), and the differences use the steps actually taken.
+
+Run:
+    python fd_planner.py x0.json [--scheme central] [--step 0.05] [--workers 7]
+    python fd_planner.py x0.json --curvature curvature.json [--noise db | noise.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from result_cache import PARAM_DECIMALS
+from sensitivity import PARAM_NAMES, ResultsTable
+
+HERE = Path(__file__).resolve().parent
+CURVATURE_PATH = HERE / "curvature.json"     # from the last central stencil
+
+# ───────────────────────────── defaults ────────────────────────────────
+DEFAULT_STEP = 0.05                         # relative step when nothing is known
+H_MIN, H_MAX = 0.005, 0.25
+# output noise: about one element for the geometry (mesh size 0.005),
+# a few newtons for the frame-averaged forces
+DEFAULT_NOISE = np.array([0.005, 0.005, 5.0, 5.0])
+NOISE_FLOOR   = 0.1 * DEFAULT_NOISE      # a deterministic solver still rounds its outputs
+NOISE_DOF     = 3                        # degrees of freedom an estimate needs
+NOISE_RADIUS  = 0.10                     # relative radius of the local-fit estimate
+# ───────────────────────────────────────────────────────────────────────
+
+SCHEMES = ("forward", "central")
+
+
+def adaptive_steps(noise, curvature, scheme: str = "forward") -> np.ndarray:
+    """
+    Relative step per parameter from noise σ (n_out) and curvature c
+    (n_out × n_par, relative parameters).  Parameters with no measurable
+    curvature get H_MAX.
+    """
+    noise = np.asarray(noise, dtype=float)[:, None]
+    c = np.abs(np.asarray(curvature, dtype=float))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if scheme == "forward":
+            h = 2.0 * np.sqrt(noise / c)
+        else:
+            h = np.cbrt(3.0 * noise / c)
+    h[~np.isfinite(h)] = np.nan
+    h_j = np.nanmedian(np.where(np.isnan(h).all(axis=0), H_MAX, h), axis=0)
+    return np.clip(h_j, H_MIN, H_MAX)
+
+
+def curvature_from_central(table: ResultsTable) -> np.ndarray:
+    """
+    c_ij from a central stencil laid out by `plan` (x0, then two points per
+    parameter at relative offsets a, b – normally +h, −h, shorter or on one
+    side near a bound):  2 [(Fᵃ − F⁰)/a − (Fᵇ − F⁰)/b] / (a − b),
+    which is (F⁺ − 2F⁰ + F⁻) / h̃² for a symmetric pair.
+    """
+    x0, y0 = table.x0, table.y0
+    n = x0.size
+    X, Y = table.X[1:], table.Y[1:]
+    if X.shape[0] != 2 * n:
+        raise ValueError("Expected a central stencil (2·n_par perturbed runs)")
+    a = np.diag((X[0::2] - x0) / x0)[:, None]
+    b = np.diag((X[1::2] - x0) / x0)[:, None]
+    return (2.0 * ((Y[0::2] - y0) / a - (Y[1::2] - y0) / b) / (a - b)).T
+
+
+def estimate_noise(db=None, x0=None, radius: float = NOISE_RADIUS):
+    """
+    (σ per output, source) observed in a RunDatabase: "repeats" (pooled
+    spread of runs at the same rounded parameters), "local fit" (residuals
+    of the affine fit within `radius` of x0) or "default".
+    """
+    from run_database import RunDatabase
+    X, Y, _ = (db or RunDatabase()).arrays(n_out=DEFAULT_NOISE.size)
+    if len(X) == 0:
+        return DEFAULT_NOISE.copy(), "default"
+
+    groups: dict = {}
+    for x, y in zip(np.round(X, PARAM_DECIMALS), Y):
+        groups.setdefault(tuple(x), []).append(y)
+    ss, dof = np.zeros(DEFAULT_NOISE.size), 0
+    for ys in groups.values():
+        if len(ys) > 1:
+            ys = np.asarray(ys)
+            ss += ((ys - ys.mean(axis=0)) ** 2).sum(axis=0)
+            dof += len(ys) - 1
+    if dof >= NOISE_DOF:
+        return np.maximum(np.sqrt(ss / dof), NOISE_FLOOR), "repeats"
+
+    if x0 is not None:
+        from local_jacobian import fit
+        x0 = np.asarray(x0, dtype=float)
+        Xl, Yl = np.asarray(list(groups), dtype=float), np.array([np.mean(g, axis=0) for g in groups.values()])
+        J_norm, y0, _, _ = fit(Xl, Yl, x0, radius)
+        inside = np.linalg.norm((Xl - x0) / x0, axis=1) <= radius
+        dof = int(inside.sum()) - x0.size - 1
+        if J_norm is not None and dof >= NOISE_DOF:
+            r = Yl[inside] - y0 - ((Xl[inside] - x0) / x0) @ J_norm.T
+            return np.maximum(np.sqrt((r ** 2).sum(axis=0) / dof), NOISE_FLOOR), "local fit"
+    return DEFAULT_NOISE.copy(), "default"
+
+
+class Stencil:
+    """
+    Parameter vectors to simulate; row 0 is the baseline.  `steps` are the
+    relative steps per parameter actually taken (the shortest one where a
+    bound cut a point short).
+    """
+
+    def __init__(self, x0, X, names: List[str], scheme: str, steps: np.ndarray):
+        self.x0 = np.asarray(x0, dtype=float)
+        self.X = np.asarray(X, dtype=float)
+        self.names = names
+        self.scheme = scheme
+        self.steps = steps
+
+    def jobs(self, prefix: str = "fd", **job_kw) -> list:
+        from scheduler import Job
+        return [Job(f"{prefix}_{n}", x, **job_kw) for n, x in zip(self.names, self.X)]
+
+    def table(self, outputs: Sequence[Sequence[float]]) -> ResultsTable:
+        return ResultsTable(self.X, outputs, names=self.names)
+
+
+def _offsets(h: float, up: float, down: float, scheme: str) -> tuple:
+    """
+    Relative offsets of one parameter's points given the room to the upper
+    and lower bound:  forward steps backward when x0 + h leaves the box and
+    is cut short where neither side fits; central shortens the side that
+    hits a bound, or puts both points on the other side when x0 sits on it.
+    """
+    if scheme == "forward":
+        if h <= up:
+            return (h,)
+        if h <= down:
+            return (-h,)
+        return (up,) if up >= down else (-down,)
+    if up > 0 and down > 0:
+        return (min(h, up), -min(h, down))
+    r = min(h, max(up, down))
+    sgn = 1.0 if up > down else -1.0
+    return (sgn * r, 0.5 * sgn * r)
+
+
+def plan(x0, scheme: str = "forward", steps=None, noise=None, curvature=None,
+         baseline_name: str = "base", lb=None, ub=None) -> Stencil:
+    """
+    Stencil around x0 inside [lb, ub] (default: Inverse.LB_phys/UB_phys).
+    `steps` (scalar or per parameter, relative) wins; otherwise adaptive
+    steps are used when a curvature estimate is given, else DEFAULT_STEP.
+    A point that would leave the box is moved (`_offsets`); sensitivity.
+    raw_jacobian differences against the rows as simulated, so the
+    Jacobian uses the steps really taken.
+    """
+    if scheme not in SCHEMES:
+        raise ValueError(f"scheme must be one of {SCHEMES}")
+    if lb is None or ub is None:
+        import Inverse
+        lb = Inverse.LB_phys if lb is None else lb
+        ub = Inverse.UB_phys if ub is None else ub
+    x0 = np.round(np.asarray(x0, dtype=float), PARAM_DECIMALS)
+    n = x0.size
+    up = np.maximum(np.asarray(ub, dtype=float) / x0 - 1.0, 0.0)
+    down = np.maximum(1.0 - np.asarray(lb, dtype=float) / x0, 0.0)
+
+    if steps is not None:
+        h = np.broadcast_to(np.asarray(steps, dtype=float), (n,)).copy()
+    elif curvature is not None:
+        h = adaptive_steps(DEFAULT_NOISE if noise is None else noise, curvature, scheme)
+    else:
+        h = np.full(n, DEFAULT_STEP)
+
+    names = [baseline_name]
+    rows = [x0]
+    taken = np.empty(n)
+    for j in range(n):
+        offsets = _offsets(h[j], up[j], down[j], scheme)
+        for k, d in enumerate(offsets):
+            x = x0.copy()
+            x[j] = round(x0[j] * (1.0 + d), PARAM_DECIMALS)
+            if x[j] == x0[j]:
+                raise ValueError(f"Step for {PARAM_NAMES[j]} vanishes at {PARAM_DECIMALS} decimals")
+            rows.append(x)
+            names.append(f"{PARAM_NAMES[j]}{'p' if d > 0 else 'm'}{'2' if k and d * offsets[0] > 0 else ''}")
+        taken[j] = min(abs(d) for d in offsets)
+    return Stencil(x0, np.vstack(rows), names, scheme, taken)
+
+
+def run_stencil(stencil: Stencil, max_workers: Optional[int] = None, **job_kw) -> ResultsTable:
+    """Dispatch the whole stencil as one batch and return the results table."""
+    from scheduler import run_batch, MAX_WORKERS
+    from sensitivity import OUTPUT_NAMES
+
+    jobs = stencil.jobs(**job_kw)
+    results = run_batch(jobs, max_workers=max_workers or MAX_WORKERS)
+    failed = [n for n, r in results.items() if isinstance(r, Exception)]
+    if failed:
+        raise RuntimeError(f"Stencil runs failed: {failed}")
+    Y = [[results[j.name][k] for k in OUTPUT_NAMES] for j in jobs]
+    return stencil.table(Y)
+
+
+def main(argv: List[str] = None) -> None:
+    ap = argparse.ArgumentParser(description="Plan and run a finite-difference stencil.")
+    ap.add_argument("x0", help="JSON file with the 6 current parameters")
+    ap.add_argument("--scheme", choices=SCHEMES, default="forward")
+    ap.add_argument("--step", type=float, default=None, help="relative step (default: adaptive/0.05)")
+    ap.add_argument("--curvature", default=None, help="JSON n_out × n_par curvature for adaptive steps")
+    ap.add_argument("--noise", default="db",
+                    help="output noise σ for adaptive steps: JSON file of 4 values, 'db' (estimated "
+                         "from runs.jsonl, the default) or 'default'")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--dry-run", action="store_true", help="only print the stencil")
+    args = ap.parse_args(argv)
+
+    x0 = json.loads(Path(args.x0).read_text(encoding="utf-8"))
+    curv = json.loads(Path(args.curvature).read_text(encoding="utf-8")) if args.curvature else None
+    noise = None
+    if curv is not None and args.step is None:
+        if args.noise == "db":
+            noise, source = estimate_noise(x0=x0)
+        elif args.noise == "default":
+            noise, source = DEFAULT_NOISE, "default"
+        else:
+            noise, source = np.asarray(json.loads(Path(args.noise).read_text(encoding="utf-8"))), args.noise
+        print(f"output noise σ = {np.round(noise, 6).tolist()}  ({source})")
+    st = plan(x0, args.scheme, steps=args.step, noise=noise, curvature=curv)
+
+    print(f"{args.scheme} stencil, {len(st.names)} runs, steps = {np.round(st.steps, 4).tolist()}")
+    for name, x in zip(st.names, st.X):
+        print(f"  {name:<6} {x.tolist()}")
+    if args.dry_run:
+        return
+
+    import sensitivity
+    from Inverse import base_dir
+    table = run_stencil(st, args.workers)
+    table.save(Path("results_table.json"))
+    sensitivity.write_outputs(table, base_dir)
+    if args.scheme == "central":
+        CURVATURE_PATH.write_text(json.dumps(curvature_from_central(table).tolist()))
+    print(f"✓ Jacobian written to {base_dir}")
+
+
+if __name__ == "__main__":
+    main()
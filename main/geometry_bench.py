@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+geometry_bench.py  —  how the chip-geometry extraction scales with the mesh
+============================================================================
+
+final_code_for_Fegor.py walks the Massif element by element in pure
+Python, twice over (EVF field, then coordinates), and compares contour
+points pairwise.  Whether a refined mesh makes post-processing the
+bottleneck is measured here on synthetic results:
+
+  1. the Massif grid of Href.inp (93 × 144 elements, graded) with every
+     interval split in r, so 13 392·r² elements (r = 12: 1.9 M);
+  2. a chip of given thickness and contact length drawn on it with
+     fake_abaqus.chip_evf (interfaces smeared over one cell);
+  3. the extractor's own functions, loaded from the script without its
+     Abaqus imports, run against an in-memory ODB of that field.
+
+Stages, each one function of the script:
+
+    evf_read         extraction_evf_void       → evf_void_by_element.txt
+    detection        detect_elements_isolated  → isolated_elements.txt
+    coordinates      get_node_coordinates      (element → node lookups)
+    classification   extraire_coordonnees_odb  (lookups again, rake-line
+                                                distance, labelled file)
+    min_distance     calculer_distances_min    (chip thickness)
+    contact_length   main                      (contact length)
+
+The in-memory ODB answers in microseconds where Abaqus' does not, so
+evf_read and the lookups are a lower bound; the other stages are the
+real cost.
+
+The drawn values are not what the script measures: its definitions
+(isolated interface elements in label order, the 0.08 curvature split,
+rake-line points within 0.005) converge on the drawn chip thickness as
+the mesh is refined (0.380 → 0.401 for 0.403, r = 1 → 16) but on a
+contact length of their own (0.212 → 0.286 for 0.314).  So each record
+carries three values per output: `drawn`, `extracted`, and `reference`,
+the legacy script's answer on the finest meshes (REF_REFINE, computed
+once per x and kept in bench/geometry_reference.json; `spread` is its
+change between the two finest, the uncertainty of the r → ∞ value).
+A faster replacement (--script) is checked against the reference, not
+against the drawn chip.  One line per mesh size goes to
+bench/geometry.jsonl (benchmark.py).
+
+Run:
+    python geometry_bench.py                       # r = 1 2 4 8 12
+    python geometry_bench.py --refine 1 2 --repeat 3 [--script other_extractor.py]
+    python geometry_bench.py --refine 1 --reference     # recompute the reference (r = 12, 16)
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import io
+import json
+import os
+import re
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import benchmark
+from fake_abaqus import RAKE, X0, chip_evf, response
+
+# ───────────────────────────── settings ──────────────────────────────
+HERE     = Path(__file__).resolve().parent
+SCRIPT   = HERE / "Chip Geometry" / "final_code_for_Fegor.py"
+OUT      = benchmark.BENCH_DIR / "geometry.jsonl"
+REFINE   = (1, 2, 4, 8, 12)
+REF_REFINE = (12, 16)                # the reference: the legacy script on the finest meshes
+REFERENCE  = benchmark.BENCH_DIR / "geometry_reference.json"
+ABAQUS_MODULES = ("odbAccess", "abaqus", "abaqusConstants")
+# ───────────────────────────────────────────────────────────────────────
+
+STAGES = ("evf_read", "detection", "coordinates", "classification", "min_distance", "contact_length")
+
+
+# ─────────────────────────────── the mesh ─────────────────────────────
+def refine_lines(v: np.ndarray, r: int) -> np.ndarray:
+    """Every interval of the sorted node lines v split into r equal ones."""
+    t = np.arange(r) / r
+    return np.append((v[:-1, None] + np.diff(v)[:, None] * t[None, :]).ravel(), v[-1])
+
+
+class SyntheticMesh:
+    """The Massif grid refined r times in the cutting plane, numbered like Href.inp."""
+
+    def __init__(self, r: int = 1, template: Path = None):
+        from snapshot import mesh_arrays
+        from scheduler import TEMPLATE
+        xyz = mesh_arrays(template or TEMPLATE)["xyz"].astype(float)
+        self.x = refine_lines(np.unique(xyz[:, 0]), r)
+        self.y = refine_lines(np.unique(xyz[:, 1]), r)
+        self.z = np.unique(xyz[:, 2])
+        self.ni, self.nj, self.nk = len(self.x), len(self.y), len(self.z)
+        self.n_elements = (self.ni - 1) * (self.nj - 1) * (self.nk - 1)
+
+    def connectivity(self, label: int) -> tuple:
+        z = label - 1
+        i, j, k = z % (self.ni - 1), (z // (self.ni - 1)) % (self.nj - 1), z // ((self.ni - 1) * (self.nj - 1))
+        n = lambda di, dj, dk: 1 + (i + di) + self.ni * ((j + dj) + self.nj * (k + dk))
+        return (n(0, 0, 0), n(1, 0, 0), n(1, 1, 0), n(0, 1, 0),
+                n(0, 0, 1), n(1, 0, 1), n(1, 1, 1), n(0, 1, 1))
+
+    def coordinates(self, label: int) -> np.ndarray:
+        z = label - 1
+        return np.array([self.x[z % self.ni], self.y[(z // self.ni) % self.nj],
+                         self.z[z // (self.ni * self.nj)]], dtype=np.float32)
+
+    def centres(self):
+        """In-plane element centres and cell sizes, element label order (first layer)."""
+        xc, yc = 0.5 * (self.x[1:] + self.x[:-1]), 0.5 * (self.y[1:] + self.y[:-1])
+        X, Y = np.meshgrid(xc, yc)
+        DX, DY = np.meshgrid(np.diff(self.x), np.diff(self.y))
+        return np.stack([X.ravel(), Y.ravel()], axis=1), np.sqrt(DX * DY).ravel()
+
+
+class DeckMesh:
+    """
+    A deck's mesh (snapshot.mesh_arrays) behind the same interface, elements
+    and nodes renumbered 1…n in label order (fake_abaqus.py's extractor).
+    """
+
+    def __init__(self, mesh: dict):
+        self.order = np.argsort(mesh["elements"])
+        lookup = np.zeros(int(mesh["nodes"].max()) + 1, dtype=np.int64)
+        lookup[mesh["nodes"]] = np.arange(len(mesh["nodes"]))
+        self.conn = lookup[mesh["connectivity"][self.order]] + 1
+        self.xyz = np.asarray(mesh["xyz"], dtype=np.float32)
+        self.n_elements = len(self.order)
+
+    def connectivity(self, label: int) -> tuple:
+        return tuple(int(n) for n in self.conn[label - 1])
+
+    def coordinates(self, label: int) -> np.ndarray:
+        return self.xyz[label - 1]
+
+
+# ─────────────────────────── the in-memory ODB ────────────────────────
+class _Obj:
+    def __init__(self, **kw):
+        self.__dict__.update(kw)
+
+
+class _Elements:
+    """elementSets[...].elements, built on demand (millions of them)."""
+
+    def __init__(self, mesh: SyntheticMesh):
+        self.mesh = mesh
+
+    def __len__(self):
+        return self.mesh.n_elements
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return _Obj(label=i + 1, connectivity=self.mesh.connectivity(i + 1))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class SyntheticOdb:
+    """The parts of the odbAccess API the chip extractor touches, over a synthetic field."""
+
+    def __init__(self, mesh, evf_void: np.ndarray):
+        self.mesh, self.void = mesh, evf_void
+        elements = _Elements(mesh)
+        instance = _Obj(elementSets={"SET-MASSIF": _Obj(elements=elements)},
+                        getElementFromLabel=self._element, getNodeFromLabel=self._node)
+        self.rootAssembly = _Obj(instances={"MASSIF-1": instance})
+        field = _Obj(getSubset=self._subset)
+        self.steps = {"Step-1": _Obj(frames=[_Obj(fieldOutputs={"EVF_VOID": field})])}
+
+    def _element(self, label: int):
+        if not 1 <= label <= self.mesh.n_elements:
+            raise KeyError(label)
+        return _Obj(label=label, connectivity=self.mesh.connectivity(label))
+
+    def _node(self, label: int):
+        return _Obj(label=label, coordinates=self.mesh.coordinates(label))
+
+    def _subset(self, region):
+        value = float(self.void[region.label - 1])
+        return _Obj(values=[_Obj(integrationPoint=1, data=value)])
+
+    def close(self):
+        pass
+
+
+def load_script(path: Path, odb: SyntheticOdb) -> dict:
+    """
+    The function definitions of an extractor script, without its Abaqus
+    imports or top-level calls; `openOdb` returns the synthetic ODB, `re`
+    is provided as the Abaqus star imports do and `span` is tracing.span.
+    """
+    tree = ast.parse(Path(path).read_text(encoding="utf-8"))
+    keep = []
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef):
+            keep.append(node)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            mods = [node.module] if isinstance(node, ast.ImportFrom) else [a.name for a in node.names]
+            if not any(m and m.split(".")[0] in ABAQUS_MODULES for m in mods):
+                keep.append(node)
+    from tracing import span
+    ns = {"__name__": "extractor", "re": re, "openOdb": lambda *a, **k: odb, "span": span}
+    exec(compile(ast.Module(body=keep, type_ignores=[]), str(path), "exec"), ns)
+    return ns
+
+
+# ─────────────────────────────── the run ──────────────────────────────
+def run_chain(ns: dict, odb: SyntheticOdb, repeat: int = 1) -> dict:
+    """Time every stage in a scratch folder; outputs parsed from what the script prints."""
+    from scheduler import P_CHIP, P_CONTACT
+    p1 = np.array([*RAKE[1], 0.005])
+    p2 = np.array([*RAKE[0], 0.005])
+    coords_file = "element_coordinates_with_labels.txt"
+    steps = [
+        ("evf_read", lambda: ns["extraction_evf_void"]("synthetic.odb")),
+        ("detection", lambda: ns["detect_elements_isolated"]("evf_void_by_element.txt", "isolated_elements.txt")),
+        ("coordinates", lambda: ns["get_node_coordinates"](odb, ns["lire_elements"]("isolated_elements.txt"))),
+        ("classification", lambda: ns["extraire_coordonnees_odb"]("synthetic.odb", "isolated_elements.txt",
+                                                                  coords_file)),
+        ("min_distance", lambda: ns["calculer_distances_min"](coords_file)),
+        ("contact_length", lambda: ns["main"](coords_file, p1, p2)),
+    ]
+    stages: Dict[str, float] = {}
+    error: Optional[str] = None
+    out = io.StringIO()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            with redirect_stdout(out):
+                for name, fn in steps:
+                    stages[name] = benchmark.timed(fn, repeat=repeat)[0]
+            isolated = sum(1 for l in open("isolated_elements.txt") if l.strip().isdigit())
+        except Exception as exc:                      # a stage that breaks is a result too
+            error, isolated = f"{name}: {type(exc).__name__}: {exc}", None
+        finally:
+            os.chdir(cwd)
+    text = out.getvalue()
+    chip, contact = P_CHIP.findall(text), P_CONTACT.findall(text)
+    return {"stages": stages, "error": error, "isolated": isolated,
+            "chip": float(chip[-1]) if chip else None, "contact_length": float(contact[-1]) if contact else None}
+
+
+def reference(x=None, refine=REF_REFINE, path: Path = REFERENCE, recompute: bool = False) -> dict:
+    """
+    What the legacy script (SCRIPT) extracts at x on the finest meshes:
+    {"chip", "contact_length"} at refine[-1], each with its spread from
+    refine[-2]; cached per x in `path`.
+    """
+    x = np.asarray(X0 if x is None else x, dtype=float)
+    key = json.dumps(np.round(x, 6).tolist())
+    refs = json.loads(path.read_text(encoding="utf-8")) if path.is_file() else {}
+    if not recompute and refs.get(key, {}).get("refine") == list(refine):
+        return refs[key]
+    print(f"  ◆ reference: {SCRIPT.name} at refine {list(refine)} …")
+    runs = [bench(r, x, SCRIPT, ref=None) for r in refine]
+    ref = {"refine": list(refine), "script": SCRIPT.name}
+    for out in ("chip", "contact_length"):
+        values = [run[out]["extracted"] for run in runs]
+        ref[out] = values[-1]
+        ref[f"{out}_spread"] = (abs(values[-1] - values[-2]) if len(values) > 1 and None not in values
+                                else None)
+    refs[key] = ref
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(refs, indent=2), encoding="utf-8")
+    return ref
+
+
+def bench(r: int, x=None, script: Path = SCRIPT, repeat: int = 1, ref: Optional[dict] = None) -> dict:
+    """
+    One mesh size: build, draw the chip, run the chain; the record for
+    geometry.jsonl, compared with `ref` (a `reference`) when given.
+    """
+    t0 = time.perf_counter()
+    mesh = SyntheticMesh(r)
+    drawn = response(X0 if x is None else x)
+    xy, cell = mesh.centres()
+    void = (1.0 - chip_evf(xy, cell, drawn["chip"], drawn["contact_length"])).astype(np.float32)
+    setup = time.perf_counter() - t0
+
+    odb = SyntheticOdb(mesh, void)
+    res = run_chain(load_script(script, odb), odb, repeat)
+    rec = {"case": f"refine {r} ({mesh.n_elements} el)", "refine": r, "elements": mesh.n_elements,
+           "script": Path(script).name, "repeat": repeat, "setup": setup,
+           "interface_elements": int(np.sum((void > 0) & (void < 1))), "isolated": res["isolated"],
+           "stages": res["stages"], "total": sum(res["stages"].values()), "error": res["error"]}
+    for out in ("chip", "contact_length"):
+        rec[out] = {"drawn": drawn[out], "extracted": res[out]}
+        if ref is not None:
+            rec[out].update(reference=ref[out], spread=ref[f"{out}_spread"], reference_refine=ref["refine"][-1])
+    return rec
+
+
+def main(argv: List[str] = None) -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the chip-geometry extraction on synthetic meshes.")
+    ap.add_argument("--refine", type=int, nargs="+", default=list(REFINE), help="in-plane refinement factors")
+    ap.add_argument("--repeat", type=int, default=1, help="best of N per stage")
+    ap.add_argument("--script", type=Path, default=SCRIPT, help="extractor to benchmark")
+    ap.add_argument("--out", type=Path, default=OUT)
+    ap.add_argument("--reference", action="store_true", help="recompute the reference values (slow)")
+    args = ap.parse_args(argv)
+
+    fmt = lambda v: "—" if v is None else f"{v:.4f}"
+    ref = reference(recompute=args.reference)
+    print(f"reference ({ref['script']}, refine {ref['refine'][-1]}): chip {fmt(ref['chip'])} ± "
+          f"{fmt(ref['chip_spread'])}, Lc {fmt(ref['contact_length'])} ± {fmt(ref['contact_length_spread'])}")
+    print(f"{'elements':>10} " + " ".join(f"{s:>14}" for s in STAGES) + f" {'total':>9}   chip (ref.)    Lc (ref.)")
+    records = []
+    for r in args.refine:
+        rec = bench(r, script=args.script, repeat=args.repeat, ref=ref)
+        records.append(rec)
+        print(f"{rec['elements']:>10} " + " ".join(f"{rec['stages'].get(s, float('nan')):>13.3f}s" for s in STAGES)
+              + f" {rec['total']:>8.2f}s   {fmt(rec['chip']['extracted'])} ({fmt(ref['chip'])})"
+              f"   {fmt(rec['contact_length']['extracted'])} ({fmt(ref['contact_length'])})")
+        if rec["error"]:
+            print(f"  ⚠️ {rec['error']}")
+    print(f"✓ {len(records)} record(s) appended to {benchmark.append(args.out, records)}")
+
+
+if __name__ == "__main__":
+    main()
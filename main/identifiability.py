@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+identifiability.py  —  which parameter directions the four outputs can actually see
+==================================================================================
+
+Four outputs cannot pin down six parameters: at least two directions of
+the normalised Jacobian are always unobservable, and the stored
+sensitivity_matrix.json shows which ones:
+
+  • the contact-length row is exactly zero for B, n and m,
+  • TQ and C move the outputs almost identically (column cosine 0.997),
+  • so do B and m (0.996).
+
+Perturbing all six parameters every iteration therefore pays for runs the
+step cannot use.  `analyse` works on the elasticities E = J̃ / |y| (so chip
+in mm and forces in N weigh alike) and builds a reduction: a set of k ≤ n_out
+unit directions V (n_par × k) in relative parameter space.
+
+    freeze   columns with ‖E_j‖ < FREEZE_TOL · max ‖E‖        (no effect)
+    merge    columns with |cos(E_i, E_j)| > COS_MAX        (same effect) →
+             one direction moving them together, v_j ∝ sign(cos)·‖E_j‖
+    select   if E·V still has fewer singular values above SV_TOL·σ_max than
+             columns, V is replaced by its row-space directions (the top
+             right singular vectors); QR with column pivoting names the
+             columns that fall into the null space
+
+Only the k directions are perturbed (k runs instead of 6 for a forward
+stencil), and the Jacobian is lifted back as  J̃ = J̃_V Vᵀ : zero along
+frozen and null directions, so the bounded Gauss–Newton step leaves them
+alone and moves merged parameters in their fixed ratio.  `ReducedJacobian` plugs this
+into identify.py (--reduce) and re-checks with a full stencil every
+RECHECK Jacobians, and whenever the step stalls in the reduced space.
+
+Run:
+    python identifiability.py [dir]     # dir with sensitivity_matrix.json and
+                                        # sensitivity_param1.json (default: Inverse.base_dir)
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from fd_planner import DEFAULT_STEP
+from result_cache import PARAM_DECIMALS
+from sensitivity import PARAM_NAMES
+
+# ───────────────────────────── settings ──────────────────────────────
+FREEZE_TOL = 1e-3          # relative column norm below which a parameter is frozen
+COS_MAX    = 0.99          # column cosine above which two parameters are merged
+SV_TOL     = 1e-3          # σ / σ_max below which a direction is not identifiable
+RECHECK    = 3             # full stencil + new analysis every RECHECK Jacobians
+# ───────────────────────────────────────────────────────────────────────
+
+
+class Reduction:
+    """k identifiable directions V (n_par × k) and what was frozen or merged."""
+
+    def __init__(self, V, labels: List[str], frozen: List[str], merged: List[tuple],
+                 singular_values=None):
+        self.V = np.asarray(V, dtype=float)
+        self.labels = labels
+        self.frozen = frozen
+        self.merged = merged
+        self.singular_values = singular_values
+
+    @property
+    def k(self) -> int:
+        return self.V.shape[1]
+
+    def stencil(self, x0, scheme: str = "forward", step: float = DEFAULT_STEP):
+        """(X, names) of the perturbed runs along V (baseline not included)."""
+        x0 = np.round(np.asarray(x0, dtype=float), PARAM_DECIMALS)
+        signs = (+1,) if scheme == "forward" else (+1, -1)
+        X, names = [], []
+        for c, label in enumerate(self.labels):
+            for sgn in signs:
+                X.append(np.round(x0 * (1.0 + sgn * step * self.V[:, c]), PARAM_DECIMALS))
+                names.append(f"{label.replace('+', '')}{'p' if sgn > 0 else 'm'}")
+        return np.array(X), names
+
+    def jacobian(self, x0, y0, X, Y) -> np.ndarray:
+        """Full raw Jacobian (n_out × n_par), zero along the frozen directions."""
+        x0 = np.asarray(x0, dtype=float)
+        dXt = (np.asarray(X, dtype=float) - x0) / x0            # runs × n_par
+        dY = np.asarray(Y, dtype=float) - np.asarray(y0, dtype=float)
+        a = dXt @ self.V                                        # runs × k coordinates
+        J_V, *_ = np.linalg.lstsq(a, dY, rcond=None)            # k × n_out
+        return (J_V.T @ self.V.T) / x0[None, :]
+
+    def describe(self) -> str:
+        parts = [f"{self.k} direction(s): {', '.join(self.labels)}"]
+        if self.merged:
+            parts.append("merged " + ", ".join("+".join(g) for g in self.merged))
+        if self.frozen:
+            parts.append("frozen " + ", ".join(self.frozen))
+        return "; ".join(parts)
+
+
+def analyse(J_norm, y, names: List[str] = PARAM_NAMES, freeze_tol: float = FREEZE_TOL,
+            cos_max: float = COS_MAX, sv_tol: float = SV_TOL) -> Reduction:
+    """Reduction of the normalised Jacobian J_norm (n_out × n_par) at outputs y."""
+    from scipy.linalg import qr
+
+    E = np.asarray(J_norm, dtype=float) / np.abs(np.asarray(y, dtype=float))[:, None]
+    n_par = E.shape[1]
+    norms = np.linalg.norm(E, axis=0)
+    live = [j for j in range(n_par) if norms[j] >= freeze_tol * norms.max()]
+    frozen = [names[j] for j in range(n_par) if j not in live]
+
+    # merge: greedy groups around the strongest column
+    cos = (E.T @ E) / np.outer(np.where(norms > 0, norms, 1.0), np.where(norms > 0, norms, 1.0))
+    groups, left = [], sorted(live, key=lambda j: -norms[j])
+    while left:
+        lead = left.pop(0)
+        group = [lead] + [j for j in left if abs(cos[lead, j]) > cos_max]
+        left = [j for j in left if j not in group]
+        groups.append(group)
+
+    V, labels, merged = [], [], []
+    for group in groups:
+        v = np.zeros(n_par)
+        for j in group:
+            v[j] = np.sign(cos[group[0], j]) * norms[j]
+        V.append(v / np.linalg.norm(v))
+        labels.append("+".join(names[j] for j in sorted(group)))
+        if len(group) > 1:
+            merged.append(tuple(names[j] for j in sorted(group)))
+    V = np.array(V).T
+
+    # select: more directions than the outputs resolve → keep the row space
+    _, s, Wt = np.linalg.svd(E @ V, full_matrices=False)
+    rank = int(np.sum(s > sv_tol * s.max()))
+    if rank < V.shape[1]:
+        _, _, piv = qr(E @ V, pivoting=True, mode="economic")
+        frozen.append(f"null space of {{{', '.join(labels[c] for c in sorted(piv[rank:]))}}}")
+        V = V @ Wt[:rank].T
+        labels = [f"sv{i + 1}" for i in range(rank)]
+    return Reduction(V, labels, frozen, merged, s)
+
+
+# ─────────────────────── Jacobian for identify.py ─────────────────────
+class ReducedJacobian:
+    """
+    Drop-in `jacobian_fn` for identify.identify: a full stencil (`fallback`)
+    and a new `analyse` every `recheck` calls, only the reduced directions
+    in between.  `last_runs` is what the last call cost.
+    """
+
+    def __init__(self, recheck: int = RECHECK, simulate_batch_fn: Optional[Callable] = None,
+                 fallback: Optional[Callable] = None):
+        self.recheck = recheck
+        self.simulate_batch_fn = simulate_batch_fn
+        self.fallback = fallback
+        self.reduction: Optional[Reduction] = None
+        self.calls = 0
+        self.last_runs = 0
+        self.reduced = False            # did the last call freeze anything?
+        self._full = False
+
+    def full_next(self) -> None:
+        """Make the next call a full stencil (identify.py does this when the step stalls)."""
+        self._full = True
+
+    def __call__(self, x, scheme: str = "forward", prefix: str = "fd", **kw):
+        import identify
+        fallback = self.fallback or identify.fd_jacobian
+        simulate_batch_fn = self.simulate_batch_fn or identify.simulate_batch
+        full = (self._full or self.reduction is None or self.calls % self.recheck == 0
+                or scheme == "spsa")
+        self._full = False
+        self.calls += 1
+
+        if full:
+            y, J_raw = fallback(x, scheme, prefix, **kw)
+            self.last_runs = identify.jacobian_runs(scheme, np.size(x))
+            if scheme != "spsa":
+                self.reduction = analyse(J_raw * np.asarray(x, dtype=float)[None, :], y)
+                print(f"  ⊘ identifiability: {self.reduction.describe()}")
+            self.reduced = False
+            return y, J_raw
+
+        X, names = self.reduction.stencil(x, scheme)
+        x = np.round(np.asarray(x, dtype=float), PARAM_DECIMALS)
+        out = simulate_batch_fn([x] + list(X), [f"{prefix}_base"] + [f"{prefix}_{n}" for n in names])
+        Y = np.asarray(out, dtype=float)
+        if not np.all(np.isfinite(Y)):
+            raise RuntimeError(f"Reduced stencil runs failed at {prefix}")
+        self.last_runs = len(X)
+        self.reduced = self.reduction.k < np.size(x)
+        return Y[0], self.reduction.jacobian(x, Y[0], X, Y[1:])
+
+
+def main(argv: List[str] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    from Inverse import base_dir, load_json
+    d = Path(argv[0]) if argv else base_dir
+    J = np.array(load_json(d / "sensitivity_matrix.json"))
+    y = np.array(load_json(d / "sensitivity_param1.json"))
+
+    red = analyse(J, y)
+    print(f"singular values of the merged elasticities: {np.round(red.singular_values, 4).tolist()}")
+    print(red.describe())
+    for label, v in zip(red.labels, red.V.T):
+        print(f"  {label:<8} " + "  ".join(f"{n}={c:+.3f}" for n, c in zip(PARAM_NAMES, v) if c))
+    print(f"→ {red.k} perturbation runs per forward stencil instead of {J.shape[1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+identify.py  —  automatic Levenberg–Marquardt loop for the whole identification
+===============================================================================
+
+Inverse.py takes one bounded Gauss–Newton step with a fixed λ and stops;
+somebody then runs update.py, Function_Script.py and the perturbation
+chain by hand.  This driver closes the loop:
+
+    repeat
+        J   ← finite-difference stencil around x   (fd_planner, one batch)
+              or 2k simultaneous perturbations      (--scheme spsa,
+              correcting the previous J; the first one is a stencil)
+              or a Broyden update if it is still trusted (--broyden)
+        δ   ← bounded damped GN step  (Inverse.gauss_newton_step, λ)
+        y⁺  ← simulate x + δ                        (scheduler, 1 job)
+        ρ   ← actual / predicted reduction of ‖F‖²
+              (--candidates N: N trial points along the damping path /
+               at scaled lengths, one parallel batch; of those with
+               ρ > ETA the one with the lowest ‖F‖ is kept)
+              (--speculate: the perturbations around x + δ start at the same
+               time, and become the next J if the step is accepted)
+        ρ > ETA   → accept, λ ← λ·max(1/3, 1 − (2ρ − 1)³)
+        otherwise → reject, λ ← λ·ν, ν ← 2ν, retry with the SAME J
+                    (no new perturbation runs; with SPSA, one more pair
+                    of directions corrects J first)
+    until max |F_i / y_exp,i| < RTOL, or the step is below XTOL,
+          or λ > LAM_MAX, or MAX_ITER iterations.
+
+Every simulation goes through the result cache, so restarting the driver
+after a crash re-uses everything that already finished.  The accepted
+point is written to finals_param.json after each iteration and the
+history to identification_log.json.  After every accepted step the ODBs
+of this run's other jobs are pruned (archive.py retention policy, set
+with --retention / --discard; their snapshots stay in the cache); the
+start point and the accepted iterates keep theirs.  Only the scheduler
+back-end is pruned: test or surrogate back-ends leave jobs/ alone.  With --trace every iteration also
+leaves a Chrome trace of all its processes in traces/<run>/itNN.json
+(tracing.py).
+
+Run:
+    python identify.py                    # start from extracted_values.json
+    python identify.py x0.json --broyden --scheme central
+    python identify.py x0.json --candidates 5
+    python identify.py x0.json --speculate
+    python identify.py x0.json --scheme spsa --directions 2
+    python identify.py x0.json --surrogate gp
+    python identify.py x0.json --reduce      # perturb identifiable directions only
+    python identify.py x0.json --multifidelity   # perturbations on the coarse mesh
+    python identify.py x0.json --scaled          # … on the accepted mass/time-scaled deck
+    python identify.py x0.json --trace           # where the minutes of each iteration go
+    python identify.py x0.json --retention all   # keep every ODB (or --discard compress)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+
+import Inverse
+import archive
+import tracing
+from jacobian_update import MAX_AGE, JacobianState, step_quality
+from sensitivity import OUTPUT_NAMES, raw_jacobian
+
+# ───────────────────────────── settings ──────────────────────────────
+LAM0     = Inverse.LAMBDA
+LAM_MAX  = 1e6
+ETA      = 1e-3            # minimum ρ for accepting a step
+RTOL     = 0.01            # converged when every output is within 1 %
+XTOL     = 1e-4            # … or the relative step is this small
+MAX_ITER = 15
+
+# speculative candidates (--candidates N): damping path first, then step lengths
+LAM_FACTORS = (0.1, 10.0, 100.0, 0.01)
+STEP_SCALES = (0.5, 1.5, 0.25)
+LOG_PATH = Path(__file__).resolve().parent / "identification_log.json"
+# ───────────────────────────────────────────────────────────────────────
+
+
+# ────────────────────── simulation back-ends ──────────────────────────
+def simulate(x, name: str) -> np.ndarray:
+    """Outputs [chip, Lc, Fc, Fp] at x (cache → Abaqus → extraction)."""
+    from scheduler import Job, run_job
+    out = run_job(Job(name, x))
+    return np.array([out[k] for k in OUTPUT_NAMES], dtype=float)
+
+
+def simulate_batch(xs, names) -> list:
+    """Several points as ONE concurrent batch; a failed job gives NaNs."""
+    from scheduler import Job, run_batch
+    jobs = [Job(n, x) for n, x in zip(names, xs)]
+    res = run_batch(jobs)
+    return [np.full(len(OUTPUT_NAMES), np.nan) if isinstance(res[j.name], Exception)
+            else np.array([res[j.name][k] for k in OUTPUT_NAMES], dtype=float) for j in jobs]
+
+
+def fd_jacobian(x, scheme: str = "forward", prefix: str = "fd", J_prior=None):
+    """
+    (y at x, raw Jacobian) from one finite-difference batch, or from one
+    SPSA batch correcting `J_prior` along random directions.  Once a
+    central stencil has measured the curvature (fd_planner.CURVATURE_PATH)
+    the steps are sized adaptively against the noise seen in runs.jsonl.
+    """
+    if scheme == "spsa":
+        import spsa
+        return spsa.spsa_jacobian(x, prefix=prefix, k=spsa.DIRECTIONS, J_prior=J_prior)
+    from fd_planner import CURVATURE_PATH, curvature_from_central, estimate_noise, plan, run_stencil
+    curv = noise = None
+    if CURVATURE_PATH.is_file():
+        curv = json.loads(CURVATURE_PATH.read_text(encoding="utf-8"))
+        noise, _ = estimate_noise(x0=x)
+    stencil = plan(x, scheme, noise=noise, curvature=curv)
+    table = run_stencil(stencil, prefix=prefix)
+    if scheme == "central":
+        CURVATURE_PATH.write_text(json.dumps(curvature_from_central(table).tolist()))
+    return table.y0, raw_jacobian(table)
+
+
+def jacobian_runs(scheme: str, n_par: int) -> int:
+    """Perturbed runs behind one Jacobian (the baseline not counted)."""
+    if scheme == "spsa":
+        import spsa
+        return 2 * spsa.DIRECTIONS
+    return 2 * n_par if scheme == "central" else n_par
+
+
+# ─────────────────────────────── helpers ─────────────────────────────
+def candidate_points(J_norm, F, x, lb, ub, lam: float, n_candidates: int = 1) -> list:
+    """
+    (λ, x_new) trial points from one Jacobian: the damping path
+    λ·LAM_FACTORS, then the λ step at STEP_SCALES lengths, up to
+    `n_candidates` points (duplicates after bound clipping dropped).
+    """
+    if n_candidates <= 1:
+        return [(lam, Inverse.gauss_newton_step(J_norm, F, x, lb, ub, lam=lam))]
+
+    from bounded_lsq import gauss_newton_steps
+
+    lams = [lam] + [lam * f for f in LAM_FACTORS if f != 1.0]
+    path = gauss_newton_steps(J_norm, F, x, lams, lb, ub)     # one batched solve
+    base = path[0]
+    points = list(zip(lams, path)) + [(lam, np.clip(x + s * (base - x), lb, ub)) for s in STEP_SCALES]
+
+    out, seen = [], set()
+    for l, xc in points:
+        key = tuple(np.round(xc, 6))
+        if key not in seen and len(out) < n_candidates:
+            seen.add(key)
+            out.append((l, xc))
+    return out
+
+
+def converged(F, y_exp, rtol: float = RTOL) -> bool:
+    return bool(np.max(np.abs(F / y_exp)) < rtol)
+
+
+def update_lambda(lam: float, rho: float) -> float:
+    """Nielsen's rule for an accepted step."""
+    return lam * max(1.0 / 3.0, 1.0 - (2.0 * rho - 1.0) ** 3)
+
+
+def _save_log(history: list, path: Path) -> None:
+    path.write_text(json.dumps(history, indent=2), encoding="utf-8")
+
+
+# ─────────────────────────────── driver ──────────────────────────────
+def identify(x0, y_exp=None, *, lam: float = LAM0, max_iter: int = MAX_ITER,
+             rtol: float = RTOL, xtol: float = XTOL, use_broyden: bool = False,
+             scheme: str = "forward", n_candidates: int = 1, speculate: bool = False,
+             simulate_fn: Callable = simulate, jacobian_fn: Callable = fd_jacobian,
+             simulate_batch_fn: Callable = simulate_batch,
+             lb=Inverse.LB_phys, ub=Inverse.UB_phys,
+             log_path: Optional[Path] = LOG_PATH) -> dict:
+    """
+    Run the loop from x0.  With `n_candidates` > 1 every trial is a batch
+    of candidate steps from the same Jacobian (see `candidate_points`),
+    simulated concurrently; of those with ρ > ETA the one with the lowest
+    residual ‖F‖ is accepted (the best ρ is reported when none passes), so
+    a batch that contains the sequential loop's step never ends at a
+    larger residual than it.
+    With `speculate` the stencil around the first trial point is started
+    alongside the trial runs (speculative.Speculation) whenever the next
+    Jacobian would come from finite differences and the trial batch
+    leaves a worker free (speculative.spare_workers).
+    `simulate_fn(x, name)`, `simulate_batch_fn(xs, names)` and
+    `jacobian_fn(x, scheme, prefix)` can be swapped for tests or surrogates
+    (surrogate.AssistedJacobian; a `last_runs` attribute, when present, is
+    what one call cost).
+    Returns {"x", "y", "F", "iterations", "reason", "history", "n_sim",
+    "n_discarded"}; n_sim counts speculative runs, n_discarded those wasted.
+    """
+    y_exp = np.asarray(Inverse.experimental_vals if y_exp is None else y_exp, dtype=float)
+    x = np.asarray(x0, dtype=float)
+    history: list = []
+    n_sim = n_discarded = 0
+    nu = 2.0
+    spec = None
+    # the scheduler back-end can cancel queued speculative runs; others are used as given
+    spec_batch_fn = None if simulate_batch_fn is simulate_batch else simulate_batch_fn
+    if speculate:
+        from speculative import Speculation, spare_workers
+
+    # ODBs kept by the retention policy: the start point's and the accepted iterates'
+    started, kept = time.time(), [archive.key_of(x)]
+    prune = simulate_fn is simulate and simulate_batch_fn is simulate_batch
+
+    try:
+        # SPSA only corrects a Jacobian: the first one is a forward stencil
+        first = "forward" if scheme == "spsa" else scheme
+        tracing.start_iteration("it00")
+        with tracing.span("Jacobian", scheme=first):
+            y, J_raw = jacobian_fn(x, first, "it00")
+        n_sim += getattr(jacobian_fn, "last_runs", jacobian_runs(first, x.size)) + 1
+        state = JacobianState.from_fd(x, y, J_raw)
+        reason = None
+
+        for it in range(1, max_iter + 1):
+            tracing.start_iteration(f"it{it:02d}")
+            F = y_exp - state.y
+            if converged(F, y_exp, rtol):
+                reason = f"all outputs within {rtol:.1%}"
+                break
+
+            # ── inner loop: damp until a step is accepted (same Jacobian) ──
+            J_norm = state.normalised()
+            accepted = False
+            while lam <= LAM_MAX:
+                with tracing.span("QP solve", lam=lam, candidates=n_candidates):
+                    trials = [(l, xc) for l, xc in candidate_points(J_norm, F, state.x, lb, ub, lam, n_candidates)
+                              if np.max(np.abs((xc - state.x) / state.x)) >= xtol]
+                if not trials and getattr(jacobian_fn, "reduced", False):
+                    # stalled in the reduced directions: look at all six before stopping
+                    jacobian_fn.full_next()
+                    with tracing.span("Jacobian", scheme=scheme, full=True):
+                        _, J_raw = jacobian_fn(state.x, scheme, f"it{it:02d}c")
+                    n_sim += jacobian_fn.last_runs
+                    state = JacobianState.from_fd(state.x, state.y, J_raw)
+                    J_norm = state.normalised()
+                    continue
+                if not trials:
+                    reason = f"step below XTOL = {xtol}"
+                    break
+                names = [f"it{it:02d}_l{len(history) + k:03d}" for k in range(len(trials))]
+                if (speculate and scheme != "spsa" and (not use_broyden or state.age + 1 >= MAX_AGE)
+                        and (spec_batch_fn is not None or spare_workers(len(trials)) > 0)):
+                    spec = Speculation(trials[0][1], spec_batch_fn, scheme, prefix=f"{names[0]}s",
+                                       trial_jobs=len(trials))
+                    n_sim += spec.n_runs
+                with tracing.span("trial", jobs=names):
+                    if len(trials) == 1:
+                        ys = [simulate_fn(trials[0][1], names[0])]
+                    else:
+                        ys = simulate_batch_fn([xc for _, xc in trials], names)
+                n_sim += len(trials)
+
+                # grade every trial; of those that pass, the lowest residual wins,
+                # so the batch never ends above the sequential loop's ‖F‖
+                Fs = [y_exp - yc for yc in ys]
+                dxs = [(xc - state.x) / state.x for _, xc in trials]
+                rhos = [step_quality(F, Fc, J_norm, d) if np.all(np.isfinite(Fc)) else -np.inf
+                        for Fc, d in zip(Fs, dxs)]
+                resid = [np.linalg.norm(Fc) if np.isfinite(r) else np.inf for Fc, r in zip(Fs, rhos)]
+                ok = [k for k, r in enumerate(rhos) if r > ETA]
+                best = min(ok, key=lambda k: resid[k]) if ok else int(np.argmax(rhos))
+                lam_used, x_new = trials[best]
+                y_new = ys[best]
+                rho = rhos[best]
+                accepted = bool(ok)
+                for k, ((l, xc), yc) in enumerate(zip(trials, ys)):
+                    history.append({"iter": it, "lam": l, "rho": float(rhos[k]) if np.isfinite(rhos[k]) else None,
+                                    "accepted": accepted and k == best,
+                                    "x": xc.tolist(), "y": np.asarray(yc).tolist(),
+                                    "residual": float(resid[k])})
+                print(f"[it {it:02d}] λ = {lam_used:.3g}  ρ = {rho:+.3f}  "
+                      f"{'accepted' if accepted else 'rejected'}  ‖F‖ = {resid[best]:.4g}"
+                      + (f"  (best of {len(trials)})" if len(trials) > 1 else ""))
+                if accepted:
+                    lam = update_lambda(lam_used, rho)
+                    nu = 2.0
+                    break
+                if spec is not None:
+                    spec.discard()
+                    n_discarded += spec.n_runs
+                    spec = None
+                lam = max(lam, lam_used) * nu
+                nu *= 2.0
+                if scheme == "spsa":                # a noisy J: sharpen it before damping further
+                    with tracing.span("Jacobian", scheme=scheme, correction=True):
+                        _, J_raw = jacobian_fn(state.x, scheme, f"it{it:02d}r{len(history):03d}",
+                                               J_prior=state.J_raw)
+                    n_sim += getattr(jacobian_fn, "last_runs", jacobian_runs(scheme, x.size))
+                    state = JacobianState.from_fd(state.x, state.y, J_raw)
+                    J_norm = state.normalised()
+            else:
+                reason = f"λ exceeded LAM_MAX = {LAM_MAX:g}"
+
+            if log_path is not None:
+                _save_log(history, log_path)
+            if not accepted:
+                break
+            kept.append(archive.key_of(x_new))
+            if prune:
+                archive.prune(kept, since=started, pattern="it[0-9][0-9]*")
+
+            # ── new Jacobian at the accepted point ──
+            if Inverse.chip_dir.is_dir():
+                with tracing.span("deck update"):
+                    Inverse.save_json(x_new.tolist(), Inverse.chip_dir / "finals_param.json")
+            if converged(y_exp - y_new, y_exp, rtol):          # no Jacobian needed
+                state = JacobianState(x_new, y_new, state.J_raw, state.age)
+                reason = f"all outputs within {rtol:.1%}"
+                break
+            if use_broyden:
+                state = state.update(x_new, y_new, y_exp)
+                why = state.needs_refresh()
+                if why is None:
+                    continue
+                print(f"  ↻ FD refresh: {why}")
+            J_raw = spec.jacobian(x_new, y_new) if spec is not None else None
+            if J_raw is not None:
+                print(f"  ⚡ speculative stencil reused ({spec.n_runs} runs)")
+                state = JacobianState.from_fd(x_new, y_new, J_raw)
+                spec = None
+                continue
+            if spec is not None:
+                n_discarded += spec.n_runs
+                spec = None
+            prior = {"J_prior": state.J_raw} if scheme == "spsa" else {}
+            with tracing.span("Jacobian", scheme=scheme):
+                y_fd, J_raw = jacobian_fn(x_new, scheme, f"it{it:02d}", **prior)
+            n_sim += getattr(jacobian_fn, "last_runs", jacobian_runs(scheme, x.size))  # baseline cached
+            state = JacobianState.from_fd(x_new, y_fd, J_raw)
+
+        if spec is not None:
+            spec.discard()
+            n_discarded += spec.n_runs
+        if prune:
+            archive.prune(kept, since=started, pattern="it[0-9][0-9]*")
+    finally:
+        tracing.finish()                 # also when an iteration raises (failed solve, Ctrl-C)
+    reason = reason or f"reached MAX_ITER = {max_iter}"
+    F = y_exp - state.y
+    print(f"Stopped: {reason}.  {n_sim} simulations.")
+    return {"x": state.x, "y": state.y, "F": F,
+            "iterations": sum(h["accepted"] for h in history),
+            "reason": reason, "history": history, "n_sim": n_sim, "n_discarded": n_discarded}
+
+
+def main(argv: List[str] = None) -> None:
+    ap = argparse.ArgumentParser(description="Automatic LM identification loop.")
+    ap.add_argument("x0", nargs="?", help="JSON with 6 start parameters (default: extracted_values.json)")
+    ap.add_argument("--broyden", action="store_true", help="Broyden updates between FD refreshes")
+    ap.add_argument("--scheme", choices=("forward", "central", "spsa"), default="forward")
+    ap.add_argument("--directions", type=int, default=None, help="SPSA directions per Jacobian")
+    ap.add_argument("--max-iter", type=int, default=MAX_ITER)
+    ap.add_argument("--candidates", type=int, default=1, help="trial steps per batch")
+    ap.add_argument("--surrogate", choices=("gp", "quadratic"), default=None,
+                    help="Jacobian from a surrogate of runs.jsonl where it is trusted")
+    ap.add_argument("--reduce", action="store_true",
+                    help="skip perturbations of unidentifiable parameters between re-checks")
+    ap.add_argument("--speculate", action="store_true",
+                    help="start the next stencil while the trial step runs")
+    ap.add_argument("--multifidelity", action="store_true",
+                    help="perturbations on the coarsened mesh, calibrated against the fine one")
+    ap.add_argument("--scaled", action="store_true",
+                    help="perturbations on the mass/time-scaled deck accepted by mass_scaling.py")
+    ap.add_argument("--trace", action="store_true",
+                    help="one Chrome trace per iteration in traces/<run>/ (tracing.py)")
+    ap.add_argument("--retention", choices=archive.POLICIES, default=archive.RETENTION,
+                    help="ODBs kept: all, accepted (start point and accepted iterates) or none")
+    ap.add_argument("--discard", choices=("delete", "compress"), default=archive.DISCARD,
+                    help="what happens to an ODB not kept")
+    args = ap.parse_args(argv)
+    archive.RETENTION, archive.DISCARD = args.retention, args.discard
+
+    if args.x0:
+        x0 = json.loads(Path(args.x0).read_text(encoding="utf-8"))
+    else:
+        x0 = Inverse.current_parameters(Inverse.load_json(Inverse.chip_dir / "extracted_values.json"))
+
+    if args.trace:
+        print(f"◆ Tracing to {tracing.enable()}")
+    if args.directions is not None:
+        import spsa
+        spsa.DIRECTIONS = args.directions
+    jac = fd_jacobian
+    if args.multifidelity or args.scaled:
+        from multifidelity import MultiFidelityJacobian
+        lo = None
+        if args.scaled:
+            from mass_scaling import simulate_batch_scaled as lo
+        jac = MultiFidelityJacobian(simulate_batch_lo_fn=lo, fallback=jac)
+    if args.reduce:
+        from identifiability import ReducedJacobian
+        jac = ReducedJacobian(fallback=jac)
+    if args.surrogate:
+        from surrogate import AssistedJacobian
+        jac = AssistedJacobian(args.surrogate, fallback=jac)
+    res = identify(x0, use_broyden=args.broyden, scheme=args.scheme, max_iter=args.max_iter,
+                   n_candidates=args.candidates, speculate=args.speculate, jacobian_fn=jac)
+    print(json.dumps(res["x"].tolist()))
+
+
+if __name__ == "__main__":
+    main()
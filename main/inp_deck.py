@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+inp_deck.py  —  an Abaqus input deck as a list of keyword blocks
+=================================================================
+
+Function_Script.py and update.py patch three data lines by text search,
+which is all they need.  Anything that has to understand the mesh, the
+sets or the step works on blocks instead:
+
+    deck = Deck.read("Href.inp")
+    for b in deck.find("nset", part="Massif"): ...
+    deck.write("out.inp")                 # byte-identical if nothing changed
+
+A block is one keyword line plus every line up to the next keyword
+(data lines and the `**` comments between them, so a round trip keeps the
+file as it was).  `part` is the *Part the block sits in (None in the
+assembly, model and step data); `instance` is the instance= parameter of
+assembly-level sets.
+
+Run:
+    python inp_deck.py [deck.inp]          # keyword summary (default: Href.inp)
+"""
+
+from __future__ import annotations
+
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+HERE     = Path(__file__).resolve().parent
+TEMPLATE = HERE / "Href.inp"
+
+
+def parse_keyword(line: str):
+    """('nset', {'nset': 'Set-In', 'instance': 'Massif-1', 'generate': None}) from a keyword line."""
+    fields = [f.strip() for f in line.strip()[1:].split(",")]
+    name = " ".join(fields[0].lower().split())
+    params: Dict[str, Optional[str]] = {}
+    for f in fields[1:]:
+        if not f:
+            continue
+        key, _, value = f.partition("=")
+        params[" ".join(key.lower().split())] = value.strip() if value else None
+    return name, params
+
+
+def is_keyword(line: str) -> bool:
+    return line.startswith("*") and not line.startswith("**")
+
+
+class Block:
+    """One keyword line and the lines that follow it."""
+
+    def __init__(self, line: str, data: List[str], start: int, part: Optional[str] = None):
+        self.line = line
+        self.data = data
+        self.start = start                       # 0-based line index of the keyword
+        self.part = part
+        self.name, self.params = parse_keyword(line) if is_keyword(line) else ("", {})
+
+    @property
+    def instance(self) -> Optional[str]:
+        return self.params.get("instance")
+
+    def data_lines(self) -> List[str]:
+        """Data lines without the comments."""
+        return [l for l in self.data if l.strip() and not l.startswith("**")]
+
+    def ids(self) -> np.ndarray:
+        """Labels of a set block, `generate` ranges expanded."""
+        values = [int(float(v)) for l in self.data_lines() for v in l.split(",") if v.strip()]
+        if "generate" in self.params:
+            out = [np.arange(a, b + 1, s) for a, b, s in zip(values[0::3], values[1::3], values[2::3])]
+            return np.concatenate(out) if out else np.empty(0, dtype=int)
+        return np.array(values, dtype=int)
+
+    def table(self) -> np.ndarray:
+        """Numeric data lines as a 2-D array (*Node, *Element, material tables)."""
+        rows = [[float(v) for v in l.split(",") if v.strip()] for l in self.data_lines()]
+        return np.array(rows, dtype=float)
+
+    def text(self) -> str:
+        return self.line + "".join(self.data)
+
+    def __repr__(self) -> str:
+        return f"Block({self.line.strip()!r}, {len(self.data)} lines, part={self.part!r})"
+
+
+class Deck:
+    def __init__(self, blocks: List[Block], path: Optional[Path] = None):
+        self.blocks = blocks
+        self.path = path
+
+    @classmethod
+    def parse(cls, lines: List[str], path: Optional[Path] = None) -> "Deck":
+        blocks: List[Block] = []
+        part = block_part = None
+        head, data, start = "", [], 0
+        for i, line in enumerate(lines):
+            if is_keyword(line):
+                if head or data:
+                    blocks.append(Block(head, data, start, block_part))
+                name, params = parse_keyword(line)
+                if name == "part":
+                    part = params.get("name")
+                block_part = part                # *End Part still belongs to its part
+                if name == "end part":
+                    part = None
+                head, data, start = line, [], i
+            else:
+                data.append(line)
+        if head or data:
+            blocks.append(Block(head, data, start, block_part))
+        return cls(blocks, path)
+
+    @classmethod
+    def read(cls, path: Path = TEMPLATE) -> "Deck":
+        with Path(path).open("r") as fh:
+            return cls.parse(fh.readlines(), Path(path))
+
+    def find(self, name: str, part: Optional[str] = "*", **params) -> Iterator[Block]:
+        """Blocks of keyword `name` (in `part`, unless "*"), matching params case-insensitively."""
+        for b in self.blocks:
+            if b.name != name or (part != "*" and b.part != part):
+                continue
+            if all((b.params.get(k) or "").lower() == str(v).lower() for k, v in params.items()):
+                yield b
+
+    def first(self, name: str, part: Optional[str] = "*", **params) -> Optional[Block]:
+        return next(self.find(name, part, **params), None)
+
+    def lines(self) -> List[str]:
+        out = []
+        for b in self.blocks:
+            if b.line:
+                out.append(b.line)
+            out.extend(b.data)
+        return out
+
+    def write(self, path: Path) -> Path:
+        path = Path(path)
+        with path.open("w") as fh:
+            fh.writelines(self.lines())
+        return path
+
+
+def format_ids(ids, per_line: int = 15) -> List[str]:
+    """Set labels the way Abaqus/CAE writes them: 15 per line, comma-separated."""
+    ids = [int(i) for i in ids]
+    rows = [ids[k:k + per_line] for k in range(0, len(ids), per_line)]
+    return [", ".join(str(i) for i in row) + (",\n" if k < len(rows) - 1 else "\n")
+            for k, row in enumerate(rows)]
+
+
+def main(argv: List[str] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    deck = Deck.read(Path(argv[0]) if argv else TEMPLATE)
+    counts = Counter((b.part, b.name) for b in deck.blocks if b.name)
+    print(f"{deck.path}: {len(deck.blocks)} blocks, {len(deck.lines())} lines")
+    for (part, name), n in sorted(counts.items(), key=lambda kv: (kv[0][0] or "", kv[0][1])):
+        print(f"  {part or '-':<8} *{name:<40} ×{n}")
+
+
+if __name__ == "__main__":
+    main()
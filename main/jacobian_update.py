@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+jacobian_update.py  —  Broyden rank-1 Jacobian updates between FD refreshes
+===========================================================================
+
+A finite-difference Jacobian costs six perturbation jobs (TQ, A, B, n, m, C).
+After an accepted Gauss–Newton step we already know how the four outputs
+moved between x_old and x_new, so the Jacobian can be corrected with a
+rank-1 (Broyden) update instead of being rebuilt:
+
+            (ΔF − J·Δx̃) Δx̃ᵀ
+    J⁺ = J + ───────────────          Δx̃ = (x_new − x_old) / x_old
+                 Δx̃ᵀ Δx̃
+
+The update is done in normalised (relative) parameters, the same space
+Inverse.py works in – in physical units the minimal-change correction would
+land almost entirely on A and B (values ~10³) and ignore n, m, C.
+(A Powell-symmetric update needs a square, symmetric matrix; our Jacobian
+is 4 × 6, so the plain "good Broyden" form is what applies here.)
+
+A full finite-difference refresh is requested when
+    • `max_age` Broyden updates have been applied since the last refresh,
+    • the last step's quality ratio  ρ = actual / predicted reduction of
+      ‖F‖² is below `rho_min`, or
+    • the correction changed J by more than `max_rel_change` (Frobenius).
+
+State lives in jacobian_state.json beside this script.
+
+Run (after the new baseline has been extracted):
+    python jacobian_update.py  x_new.json  y_new.json
+      x_new.json : the 6 parameters that were simulated (finals_param.json)
+      y_new.json : the 4 outputs  [chip, Lc, Fc, Fp]  of that run
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+HERE       = Path(__file__).resolve().parent
+STATE_PATH = HERE / "jacobian_state.json"
+
+# ───────────────────────── refresh criteria ───────────────────────────
+MAX_AGE        = 3       # Broyden updates before a forced FD refresh
+RHO_MIN        = 0.25    # step-quality ratio below which J is not trusted
+MAX_REL_CHANGE = 0.5     # ‖J⁺ − J‖_F / ‖J‖_F above which J is not trusted
+# ───────────────────────────────────────────────────────────────────────
+
+
+def broyden_update(J_norm, dx_tilde, dF) -> np.ndarray:
+    """Good-Broyden rank-1 correction of a normalised Jacobian (n_out × n_par)."""
+    J_norm = np.asarray(J_norm, dtype=float)
+    dx_tilde = np.asarray(dx_tilde, dtype=float)
+    dF = np.asarray(dF, dtype=float)
+    denom = float(dx_tilde @ dx_tilde)
+    if denom == 0.0:
+        return J_norm.copy()
+    return J_norm + np.outer(dF - J_norm @ dx_tilde, dx_tilde) / denom
+
+
+def step_quality(F_old, F_new, J_norm, dx_tilde) -> float:
+    """ρ = (‖F_old‖² − ‖F_new‖²) / (‖F_old‖² − ‖F_old − J·Δx̃‖²)."""
+    F_old = np.asarray(F_old, dtype=float)
+    F_new = np.asarray(F_new, dtype=float)
+    actual = F_old @ F_old - F_new @ F_new
+    F_pred = F_old - np.asarray(J_norm) @ np.asarray(dx_tilde)
+    predicted = F_old @ F_old - F_pred @ F_pred
+    if predicted <= 0.0:
+        return -np.inf if actual < 0 else 0.0
+    return float(actual / predicted)
+
+
+class JacobianState:
+    """
+    The Jacobian currently in use, where it was linearised and how stale it is.
+    J_raw is ∂F/∂x in physical units; `normalised()` gives what Inverse.py uses.
+    """
+
+    def __init__(self, x, y, J_raw, age: int = 0, rho: Optional[float] = None,
+                 rel_change: float = 0.0):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.J_raw = np.asarray(J_raw, dtype=float)
+        self.age = int(age)
+        self.rho = rho
+        self.rel_change = float(rel_change)
+
+    @classmethod
+    def from_fd(cls, x0, y0, J_raw) -> "JacobianState":
+        """Fresh state right after a finite-difference build."""
+        return cls(x0, y0, J_raw)
+
+    def normalised(self) -> np.ndarray:
+        return self.J_raw * self.x[None, :]
+
+    # -- the update ------------------------------------------------------
+    def update(self, x_new, y_new, y_target) -> "JacobianState":
+        """
+        Apply one Broyden correction for the move (x, y) → (x_new, y_new)
+        and re-anchor the state at x_new.  `y_target` (experimental values)
+        is only used to grade the step.
+        """
+        x_new = np.asarray(x_new, dtype=float)
+        y_new = np.asarray(y_new, dtype=float)
+        y_target = np.asarray(y_target, dtype=float)
+
+        J_norm = self.normalised()
+        dx_tilde = (x_new - self.x) / self.x
+        dF = y_new - self.y
+
+        rho = step_quality(y_target - self.y, y_target - y_new, J_norm, dx_tilde)
+        J_plus = broyden_update(J_norm, dx_tilde, dF)
+        rel_change = float(np.linalg.norm(J_plus - J_norm) / max(np.linalg.norm(J_norm), 1e-300))
+
+        # back to physical units, then it is normalised at x_new when used
+        J_raw_new = J_plus / self.x[None, :]
+        return JacobianState(x_new, y_new, J_raw_new, self.age + 1, rho, rel_change)
+
+    def needs_refresh(self, max_age: int = MAX_AGE, rho_min: float = RHO_MIN,
+                      max_rel_change: float = MAX_REL_CHANGE) -> Optional[str]:
+        """Reason a finite-difference refresh is due, or None."""
+        if self.age >= max_age:
+            return f"{self.age} Broyden updates since the last FD Jacobian"
+        if self.rho is not None and self.rho < rho_min:
+            return f"poor step quality ρ = {self.rho:.3f} < {rho_min}"
+        if self.rel_change > max_rel_change:
+            return f"Jacobian changed by {self.rel_change:.0%} in one update"
+        return None
+
+    # -- persistence -----------------------------------------------------
+    def save(self, path: Path = STATE_PATH) -> None:
+        data = {"x": self.x.tolist(), "y": self.y.tolist(), "J_raw": self.J_raw.tolist(),
+                "age": self.age, "rho": self.rho, "rel_change": self.rel_change}
+        with Path(path).open("w", encoding="utf-8") as fh:
+            json.dump(data, fh, indent=4)
+
+    @classmethod
+    def load(cls, path: Path = STATE_PATH) -> "JacobianState":
+        with Path(path).open("r", encoding="utf-8") as fh:
+            d = json.load(fh)
+        return cls(d["x"], d["y"], d["J_raw"], d.get("age", 0), d.get("rho"),
+                   d.get("rel_change", 0.0))
+
+
+def write_sensitivity_files(state: JacobianState, out_dir: Path) -> None:
+    """Same two files sensitivity.py / combine.py produce, from the state."""
+    with open(Path(out_dir) / "sensitivity_param1.json", "w", encoding="utf-8") as fp:
+        json.dump(state.y.tolist(), fp, separators=(',', ':'))
+    with open(Path(out_dir) / "sensitivity_matrix.json", "w", encoding="utf-8") as fp:
+        json.dump(state.normalised().tolist(), fp, separators=(',', ':'))
+
+
+def main(argv=None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        sys.exit("usage: python jacobian_update.py x_new.json y_new.json")
+    import Inverse                                   # experimental_vals, base_dir
+
+    x_new = json.loads(Path(argv[0]).read_text(encoding="utf-8"))
+    y_new = json.loads(Path(argv[1]).read_text(encoding="utf-8"))
+
+    if not STATE_PATH.is_file():
+        sys.exit(f"[ERROR] {STATE_PATH} not found – build an FD Jacobian first")
+    state = JacobianState.load(STATE_PATH).update(x_new, y_new, Inverse.experimental_vals)
+    state.save(STATE_PATH)
+
+    reason = state.needs_refresh()
+    print(f"Broyden update #{state.age}:  ρ = {state.rho:.3f},  ΔJ = {state.rel_change:.1%}")
+    if reason:
+        print(f"⚠️  Finite-difference refresh required: {reason}")
+        print("    Run the six perturbation jobs and rebuild with sensitivity.py.")
+        sys.exit(2)
+
+    write_sensitivity_files(state, Inverse.base_dir)
+    print(f"✅ Updated Jacobian written to {Inverse.base_dir} – no perturbation runs needed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+local_jacobian.py  —  Jacobian at x0 from all cached runs inside a trust radius
+==============================================================================
+
+Every run in runs.jsonl (run_database.py) is a sample (x, y).  Around the
+current iterate x0 the outputs are fitted by weighted least squares with an
+affine model in relative parameters
+
+    y ≈ c + J · x̃,        x̃ = (x − x0) / x0,       ‖x̃‖ ≤ radius
+
+with weights  w = (1 − (d/radius)²)²  so nearby runs dominate.  J is the
+normalised Jacobian Inverse.py expects (∂F/∂x · x0).
+
+If the local design is ill-conditioned – too few runs, or all of them
+along the same few directions – `estimate()` proposes the *only* extra
+perturbation points needed: one step along each weak right-singular
+direction of the weighted design.  As the campaign accumulates runs the
+list of proposals shrinks towards empty.
+
+Run:
+    python local_jacobian.py x0.json          # x0.json: the 6 current parameters
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from sensitivity import OUTPUT_NAMES
+
+# ───────────────────────────── defaults ────────────────────────────────
+RADIUS   = 0.25      # trust radius in relative parameters
+COND_MAX = 1e3       # max. condition number of the weighted design
+STEP     = 0.10      # relative length of a proposed perturbation
+# ───────────────────────────────────────────────────────────────────────
+
+
+def _weak_directions(D: np.ndarray, n_par: int, cond_max: float) -> np.ndarray:
+    """Rows = unit directions the (weighted) design D does not resolve."""
+    if D.shape[0] == 0:
+        return np.eye(n_par)
+    _, s, Vt = np.linalg.svd(D, full_matrices=True)
+    s_full = np.zeros(n_par)
+    s_full[:s.size] = s
+    s_ref = s_full.max()
+    if s_ref == 0.0:
+        return Vt
+    return Vt[s_full < s_ref / cond_max]
+
+
+def _proposal(x0, v, step, lb, ub) -> np.ndarray:
+    """x0·(1 + step·v), flipped if that leaves the bounds, then clipped."""
+    x = x0 * (1.0 + step * v)
+    if lb is not None and ub is not None and (np.any(x < lb) or np.any(x > ub)):
+        x = x0 * (1.0 - step * v)
+        x = np.clip(x, lb, ub)
+    return x
+
+
+def fit(X, Y, x0, radius: float = RADIUS):
+    """
+    Weighted affine fit of the samples (X, Y) around x0.
+    Returns (J_norm, y_at_x0, design, weights) – J_norm is None when the
+    samples cannot determine every column.
+    """
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    x0 = np.asarray(x0, dtype=float)
+
+    Xt = (X - x0) / x0
+    d = np.linalg.norm(Xt, axis=1)
+    inside = d <= radius
+    Xt, Y, d = Xt[inside], Y[inside], d[inside]
+    w = (1.0 - (d / radius) ** 2) ** 2
+
+    sw = np.sqrt(w)[:, None]
+    # centre on the weighted mean so the intercept does not mask the slope
+    D = sw * (Xt - (w @ Xt) / max(w.sum(), 1e-300))
+    if Xt.shape[0] < x0.size + 1 or np.linalg.matrix_rank(D) < x0.size:
+        return None, None, D, w
+
+    A = np.hstack([np.ones((Xt.shape[0], 1)), Xt]) * sw
+    beta, *_ = np.linalg.lstsq(A, Y * sw, rcond=None)
+    return beta[1:].T, beta[0], D, w
+
+
+def estimate(db, x0, radius: float = RADIUS, cond_max: float = COND_MAX,
+             step: float = STEP, lb=None, ub=None) -> dict:
+    """
+    Local Jacobian at x0 from a RunDatabase.
+
+    Returns a dict with
+        J_norm     n_out × n_par normalised Jacobian (None if undetermined)
+        y0         fitted outputs at x0
+        n_samples  runs inside the trust radius
+        cond       condition number of the weighted design
+        proposals  parameter vectors still to simulate (may be empty)
+    """
+    x0 = np.asarray(x0, dtype=float)
+    X, Y, _ = db.near(x0, radius, n_out=len(OUTPUT_NAMES))
+    J_norm, y0, D, _ = fit(X, Y, x0, radius) if len(X) else (None, None, np.empty((0, x0.size)), None)
+
+    # m centred runs span at most m − 1 directions, so too few runs show
+    # up here as zero singular values as well
+    weak = _weak_directions(D, x0.size, cond_max)
+
+    s = np.linalg.svd(D, compute_uv=False) if D.shape[0] else np.zeros(1)
+    cond = float(s.max() / s.min()) if s.size == x0.size and s.min() > 0 else np.inf
+
+    return {
+        "J_norm": J_norm,
+        "y0": y0,
+        "n_samples": int(len(X)),
+        "cond": cond,
+        "proposals": [_proposal(x0, v, step, lb, ub) for v in weak],
+    }
+
+
+def main(argv: List[str] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        sys.exit("usage: python local_jacobian.py x0.json")
+    from run_database import RunDatabase
+    from Inverse import LB_phys, UB_phys
+
+    x0 = np.array(json.loads(Path(argv[0]).read_text(encoding="utf-8")), dtype=float)
+    res = estimate(RunDatabase(), x0, lb=LB_phys, ub=UB_phys)
+
+    print(f"{res['n_samples']} cached runs within radius {RADIUS}  (cond = {res['cond']:.3g})")
+    if res["J_norm"] is not None:
+        print("\nLocal normalised Jacobian:")
+        for row in res["J_norm"]:
+            print("  " + "".join(f"{v:14.6f}" for v in row))
+    if res["proposals"]:
+        print(f"\n{len(res['proposals'])} extra perturbation run(s) needed:")
+        for x in res["proposals"]:
+            print("  " + json.dumps(np.round(x, 6).tolist()))
+    else:
+        print("\n✅ No new perturbation runs needed.")
+
+
+if __name__ == "__main__":
+    main()
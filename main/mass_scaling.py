@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+mass_scaling.py  —  cheaper perturbation and DoE decks, accepted only if the outputs hold
+=========================================================================================
+
+Three ways to make an explicit run cheaper without touching the mesh:
+
+    fixed      *Fixed Mass Scaling, dt=f·Δt, type=BELOW MIN      (at step start)
+    variable   *Variable Mass Scaling, dt=f·Δt, type=BELOW MIN, frequency=FREQUENCY
+    time       step time / f, every prescribed and initial velocity × f
+               (BC-Vitesse, PF-Vitesse): same cut length, f times fewer increments
+
+Δt is the deck's stable increment from stable_time.py, so f is the
+speed-up asked for.  None of them is free: inertia, strain rate (the C
+term of Johnson-Cook) and heat conduction all see the change, and whether
+the solver honours mass scaling on Eulerian elements at all is part of
+what has to be checked.  So a scaled deck is only used after `calibrate`
+has run it against the unscaled baseline at the current point and every
+one of the four outputs moved less than TOL (relative).  Among the options
+that pass, the one with the shortest predicted runtime is accepted.  The
+verdict is kept in scaling_calibration.json per template hash, and
+`accepted_template` falls back to the unscaled template when nothing has
+passed or the template has changed since.
+
+Scaled decks are templates of their own (Href_time2.inp, …): separate
+cache keys, runs.jsonl records tagged with that template (which the
+default RunDatabase.arrays/near leave out), and identify.py --scaled uses
+them for the perturbations only, through multifidelity.MultiFidelityJacobian
+(the baseline stays unscaled).
+
+Run:
+    python mass_scaling.py calibrate x0.json [--fixed 2 4] [--variable 2] [--time 2 4] [--tol 0.02]
+    python mass_scaling.py write time 2           # only write Href_time2.inp
+    python doe.py 32 --scaled
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from inp_deck import Block, Deck
+from sensitivity import OUTPUT_NAMES
+
+# ───────────────────────────── settings ──────────────────────────────
+HERE             = Path(__file__).resolve().parent
+CALIBRATION_PATH = HERE / "scaling_calibration.json"
+TOL              = 0.02            # max relative change of any output
+FREQUENCY        = 100             # increments between variable mass scaling updates
+MODES            = ("fixed", "variable", "time")
+# ───────────────────────────────────────────────────────────────────────
+
+
+def _fmt(v: float) -> str:
+    return f"{v:.6g}"
+
+
+def scale_deck(deck: Deck, mode: str, factor: float, dt: Optional[float] = None) -> Deck:
+    """Apply one scaling to a parsed deck in place (dt: its stable increment, for mass scaling)."""
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}")
+    step = deck.first("step")
+    dyn = next((b for b in deck.blocks if b.name.startswith("dynamic") and "explicit" in b.params), None)
+    if step is None or dyn is None:
+        raise ValueError("No explicit dynamic step in the deck")
+
+    if mode in ("fixed", "variable"):
+        if dt is None:
+            raise ValueError("Mass scaling needs the deck's stable increment")
+        line = f"*{mode.capitalize()} Mass Scaling, dt={_fmt(factor * dt)}, type=BELOW MIN"
+        if mode == "variable":
+            line += f", frequency={FREQUENCY}"
+        deck.blocks.insert(deck.blocks.index(dyn) + 1, Block(line + "\n", [], -1, None))
+        return deck
+
+    # time scaling: step time / f, velocities × f
+    fields = dyn.data[0].split(",")
+    fields[1] = f" {_fmt(float(fields[1]) / factor)}"
+    dyn.data[0] = ",".join(fields).rstrip() + "\n"
+    for b in deck.blocks:
+        if b.name == "boundary" and (b.params.get("type") or "").lower() == "velocity":
+            col = 3                                       # set, first dof, last dof, magnitude
+        elif b.name == "initial conditions" and (b.params.get("type") or "").lower() == "velocity":
+            col = 2                                       # set, dof, magnitude
+        else:
+            continue
+        for i, l in enumerate(b.data):
+            if l.startswith("**") or not l.strip():
+                continue
+            f = l.rstrip("\n").split(",")
+            if len(f) > col and f[col].strip() and float(f[col]) != 0.0:
+                f[col] = f" {_fmt(float(f[col]) * factor)}"
+                b.data[i] = ",".join(f) + "\n"
+    return deck
+
+
+def scaled_template(mode: str, factor: float, template: Path = None) -> Path:
+    """The scaled copy of the template, (re)written when older than it."""
+    from stable_time import analyse_cached
+    if template is None:
+        from scheduler import TEMPLATE as template
+    template = Path(template)
+    out = template.with_name(f"{template.stem}_{mode}{factor:g}.inp")
+    if not out.is_file() or out.stat().st_mtime < template.stat().st_mtime:
+        dt = float(analyse_cached(str(template))["dt"].min())
+        scale_deck(Deck.read(template), mode, factor, dt).write(out)
+    return out
+
+
+# ─────────────────────────────── guardrail ────────────────────────────
+def _load() -> dict:
+    if CALIBRATION_PATH.is_file():
+        return json.loads(CALIBRATION_PATH.read_text(encoding="utf-8"))
+    return {}
+
+
+def run_decks(x, decks: Sequence[Path]) -> list:
+    """Outputs at x on each template, as one scheduler batch (NaNs for failures)."""
+    from scheduler import Job, run_batch
+    jobs = [Job(f"scal_{d.stem}", x, template=d) for d in decks]
+    res = run_batch(jobs)
+    return [np.full(len(OUTPUT_NAMES), np.nan) if isinstance(res[j.name], Exception)
+            else np.array([res[j.name][k] for k in OUTPUT_NAMES], dtype=float) for j in jobs]
+
+
+def calibrate(x, options: Sequence[Tuple[str, float]], template: Path = None, tol: float = TOL,
+              run_decks_fn: Optional[Callable] = None) -> dict:
+    """
+    Run the unscaled template and every scaled option at x as one batch;
+    accept the fastest option whose outputs all change less than `tol`.
+    """
+    from result_cache import deck_hash
+    from scheduler import DEFAULT_CPUS, TEMPLATE
+    from stable_time import predict
+    template = Path(template or TEMPLATE)
+    decks = [template] + [scaled_template(m, f, template) for m, f in options]
+    Y = [np.asarray(y, dtype=float) for y in (run_decks_fn or run_decks)(x, decks)]
+
+    base, wall0 = Y[0], predict(template, (DEFAULT_CPUS,))["wall"][DEFAULT_CPUS]
+    trials = []
+    for (mode, factor), deck, y in zip(options, decks[1:], Y[1:]):
+        change = np.abs(y - base) / np.abs(base)
+        wall = predict(deck, (DEFAULT_CPUS,))["wall"][DEFAULT_CPUS]
+        ok = bool(np.all(np.isfinite(change)) and np.max(change) < tol)
+        trials.append({"mode": mode, "factor": factor, "deck": deck.name, "y": y.tolist(),
+                       "change": change.tolist(), "speedup": wall0 / wall, "ok": ok})
+        print(f"  {'✓' if ok else '✗'} {mode} ×{factor:g}: predicted speed-up {wall0 / wall:4.1f}, "
+              + ", ".join(f"{o} {c:+.2%}" for o, c in zip(OUTPUT_NAMES, (y - base) / base)))
+
+    passed = [t for t in trials if t["ok"]]
+    accepted = max(passed, key=lambda t: t["speedup"]) if passed else None
+    record = {"template": str(template), "x": [float(v) for v in x], "y": base.tolist(),
+              "tol": tol, "trials": trials, "accepted": accepted}
+    data = _load()
+    data[deck_hash(template)] = record
+    CALIBRATION_PATH.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    return record
+
+
+def accepted_template(template: Path = None) -> Path:
+    """The accepted scaled template, or the unscaled one if none has passed for this template."""
+    from result_cache import deck_hash
+    from scheduler import TEMPLATE
+    template = Path(template or TEMPLATE)
+    record = _load().get(deck_hash(template))
+    if not record or not record.get("accepted"):
+        print(f"⚠️ No accepted scaling for {template.name} – running unscaled")
+        return template
+    a = record["accepted"]
+    return scaled_template(a["mode"], a["factor"], template)
+
+
+def simulate_batch_scaled(xs, names) -> list:
+    """identify.simulate_batch on the accepted scaled template."""
+    from multifidelity import simulate_batch_lo
+    return simulate_batch_lo(xs, names, accepted_template())
+
+
+def main(argv: List[str] = None) -> None:
+    ap = argparse.ArgumentParser(description="Mass / time scaling with an accuracy guardrail.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("calibrate", help="compare scaled and unscaled runs at x0")
+    c.add_argument("x0", help="JSON file with the 6 parameters")
+    for m in MODES:
+        c.add_argument(f"--{m}", type=float, nargs="*", default=[], help=f"{m} scaling factors")
+    c.add_argument("--tol", type=float, default=TOL)
+    w = sub.add_parser("write", help="write one scaled template")
+    w.add_argument("mode", choices=MODES)
+    w.add_argument("factor", type=float)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "write":
+        print(f"✓ {scaled_template(args.mode, args.factor)}")
+        return
+    options = [(m, f) for m in MODES for f in getattr(args, m)] or [("time", 2.0), ("fixed", 2.0)]
+    x0 = json.loads(Path(args.x0).read_text(encoding="utf-8"))
+    rec = calibrate(x0, options, tol=args.tol)
+    a = rec["accepted"]
+    print(f"✓ Accepted {a['mode']} ×{a['factor']:g} ({a['deck']})" if a
+          else f"⊘ No scaling within {args.tol:.0%} – perturbation runs stay unscaled")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+multifidelity.py  —  perturbation runs on the coarsened mesh, calibrated against the fine one
+=============================================================================================
+
+The perturbation runs only feed a Jacobian, and the Gauss–Newton step
+tolerates a Jacobian that is off by a few per cent far better than a
+biased residual.  So the baseline stays on Href.inp while the stencil
+runs on the deck coarsen.py derives from it (2× element size in the
+cutting plane, ≈ 4× cheaper per run):
+
+    J_lo  ← stencil on the coarse deck                      (n + 1 cheap runs)
+    J̃     ← g ⊙ J̃_lo       (row i scaled by the gain g_i of output i)
+
+The gains come from a high/low calibration: every CALIBRATE Jacobians
+both stencils run around the same point, and per output
+
+    g_i   = ⟨J̃_hi,i, J̃_lo,i⟩ / ‖J̃_lo,i‖²        (least-squares row gain)
+    cos_i = cos(J̃_hi,i, J̃_lo,i)                   (does the coarse mesh see
+                                                    the same directions?)
+
+in normalised units J̃ = J·x, so the gains carry over to the next points.
+A calibration Jacobian is the fine one itself.  When some cos_i is below
+COS_MIN the coarse mesh does not resolve that output's sensitivities, and
+the next Jacobian is a calibration again instead of a corrected one.
+
+Coarse jobs use their own template, so they get their own cache keys, and
+their runs.jsonl records carry it (template Href_coarse2.inp and its
+hash): RunDatabase.arrays/near, and so the surrogate, local_jacobian.py
+and the noise estimate, only see fine runs unless asked for this template.
+
+Run:
+    python identify.py x0.json --multifidelity
+    python multifidelity.py                  # (re)write Href_coarse2.inp
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from coarsen import FACTOR, coarsen_deck
+from fd_planner import plan
+from sensitivity import OUTPUT_NAMES, raw_jacobian
+
+# ───────────────────────────── settings ──────────────────────────────
+CALIBRATE = 3              # high/low calibration every CALIBRATE Jacobians
+COS_MIN   = 0.9            # row agreement below which the next one is a calibration too
+# ───────────────────────────────────────────────────────────────────────
+
+
+def coarse_template(template: Path = None, factor: int = FACTOR) -> Path:
+    """The coarsened copy of the template, (re)written when older than it."""
+    if template is None:
+        from scheduler import TEMPLATE as template
+    template = Path(template)
+    coarse = template.with_name(f"{template.stem}_coarse{factor}.inp")
+    if not coarse.is_file() or coarse.stat().st_mtime < template.stat().st_mtime:
+        coarsen_deck(template, coarse, factor)
+        print(f"✓ Coarse template written to {coarse}")
+    return coarse
+
+
+def simulate_batch_lo(xs, names, template: Path = None) -> list:
+    """identify.simulate_batch on a low-fidelity template (default: the coarse one)."""
+    from scheduler import Job, run_batch
+    template = template or coarse_template()
+    jobs = [Job(n, x, template=template) for n, x in zip(names, xs)]
+    res = run_batch(jobs)
+    return [np.full(len(OUTPUT_NAMES), np.nan) if isinstance(res[j.name], Exception)
+            else np.array([res[j.name][k] for k in OUTPUT_NAMES], dtype=float) for j in jobs]
+
+
+def row_calibration(J_hi, J_lo, x):
+    """(gain, cosine) per output between the fine and coarse raw Jacobians at x."""
+    x = np.asarray(x, dtype=float)[None, :]
+    hi, lo = np.asarray(J_hi, dtype=float) * x, np.asarray(J_lo, dtype=float) * x
+    dot = np.sum(hi * lo, axis=1)
+    n_hi, n_lo = np.linalg.norm(hi, axis=1), np.linalg.norm(lo, axis=1)
+    gain = np.where(n_lo > 0, dot / np.where(n_lo > 0, n_lo ** 2, 1.0), 1.0)
+    cos = np.where(n_hi * n_lo > 0, dot / np.where(n_hi * n_lo > 0, n_hi * n_lo, 1.0), 1.0)
+    return gain, cos
+
+
+class MultiFidelityJacobian:
+    """
+    Drop-in `jacobian_fn` for identify.identify: coarse stencils corrected
+    by row gains, with a fine/coarse calibration pair every `calibrate`
+    calls.  `last_runs` counts the runs of the last call (fine and coarse).
+    """
+
+    def __init__(self, calibrate: int = CALIBRATE, cos_min: float = COS_MIN,
+                 simulate_batch_lo_fn: Optional[Callable] = None,
+                 simulate_fn: Optional[Callable] = None, fallback: Optional[Callable] = None):
+        self.calibrate = calibrate
+        self.cos_min = cos_min
+        self.simulate_batch_lo_fn = simulate_batch_lo_fn or simulate_batch_lo
+        self.simulate_fn = simulate_fn
+        self.fallback = fallback
+        self.gain = None
+        self.cos = None
+        self.calls = 0
+        self.last_runs = 0
+        self.lo_runs = 0
+        self._recalibrate = False
+
+    def _low(self, x, scheme: str, prefix: str):
+        stencil = plan(x, scheme)
+        Y = np.asarray(self.simulate_batch_lo_fn(stencil.X, [f"{prefix}_lo_{n}" for n in stencil.names]),
+                       dtype=float)
+        self.lo_runs += len(Y)
+        if not np.all(np.isfinite(Y)):
+            return len(Y), None
+        return len(Y), raw_jacobian(stencil.table(Y))
+
+    def __call__(self, x, scheme: str = "forward", prefix: str = "fd", **kw):
+        import identify
+        fallback = self.fallback or identify.fd_jacobian
+        if scheme == "spsa":                    # the pairs correct a fine J, keep them fine
+            self.last_runs = identify.jacobian_runs(scheme, np.size(x))
+            return fallback(x, scheme, prefix, **kw)
+
+        calibrate = (self.gain is None or self._recalibrate or self.calls % self.calibrate == 0)
+        self.calls += 1
+        n_lo, J_lo = self._low(x, scheme, prefix)
+
+        if calibrate or J_lo is None:
+            y, J_hi = fallback(x, scheme, prefix, **kw)
+            self.last_runs = identify.jacobian_runs(scheme, np.size(x)) + n_lo
+            if J_lo is None:
+                print("  ⚠️ coarse stencil failed – fine Jacobian used")
+                self._recalibrate = True
+                return y, J_hi
+            self.gain, self.cos = row_calibration(J_hi, J_lo, x)
+            self._recalibrate = bool(np.min(self.cos) < self.cos_min)
+            print("  ◆ multi-fidelity calibration: "
+                  + ", ".join(f"{o} g={g:.3f} cos={c:.3f}" for o, g, c in zip(OUTPUT_NAMES, self.gain, self.cos))
+                  + (" – coarse mesh not trusted yet" if self._recalibrate else ""))
+            return y, J_hi
+
+        simulate_fn = self.simulate_fn or identify.simulate
+        y = simulate_fn(x, f"{prefix}_base")        # the accepted trial point: a cache hit
+        self.last_runs = n_lo
+        return np.asarray(y, dtype=float), self.gain[:, None] * J_lo
+
+
+def main(argv: List[str] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    from scheduler import TEMPLATE
+    template = Path(argv[0]) if argv else TEMPLATE
+    coarse = template.with_name(f"{template.stem}_coarse{FACTOR}.inp")
+    if coarse.is_file():
+        coarse.unlink()
+    coarse_template(template)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+output_profiles.py  —  what a deck writes besides the results: restart output per kind of run
+==============================================================================================
+
+Href.inp asks for `*Restart, write, number interval=1`, so every job of
+every stencil, trial and DoE writes restart data nobody ever restarts
+from, one of the largest shares of its disk I/O (resources.py:
+restart_mb).  The scheduler writes each deck with its job's profile:
+
+    identification    restart output off                (the default: perturbations,
+                                                          trial steps, DoE, scaling checks)
+    validation        *Restart, write every VALIDATION_INTERVAL intervals
+    validation:N      … every N intervals               (long runs worth restarting)
+    template          the template's own request, untouched
+
+Restart output does not change the results, so the profile is not part
+of the cache key: a job run under one profile is a cache hit for all.
+
+Abaqus/Explicit also leaves .abq/.pac/.sel/.mdl/.stt behind, needed to
+continue or restart the analysis and not by the extractors.  With
+scheduler.CLEAN_RESTART (or `python scheduler.py … --clean`) `cleanup`
+deletes them, and the .res, once a job's outputs have been extracted.
+
+Run:
+    python output_profiles.py write validation:20 [deck.inp]     # → <deck>_validation20.inp
+    python output_profiles.py clean jobs/                         # restart files of finished jobs
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+from inp_deck import is_keyword, parse_keyword
+from resources import RESTART_EXT
+
+# ───────────────────────────── settings ──────────────────────────────
+DEFAULT_PROFILE     = "identification"
+VALIDATION_INTERVAL = 10            # restart writes over the step of a validation run
+PROFILES            = ("identification", "validation", "template")
+# ───────────────────────────────────────────────────────────────────────
+
+
+def restart_interval(profile: str) -> Optional[int]:
+    """Restart writes a profile asks for: 0 = none, None = as in the template."""
+    name, _, n = profile.partition(":")
+    if name not in PROFILES:
+        raise ValueError(f"Unknown output profile '{profile}' (one of {PROFILES}, validation:N)")
+    if name == "template":
+        return None
+    if name == "identification":
+        return 0
+    return int(n) if n else VALIDATION_INTERVAL
+
+
+def restart_line(interval: int) -> str:
+    return f"*Restart, write, number interval={interval}, time marks=NO\n"
+
+
+def restart_slots(lines: List[str]) -> List[int]:
+    """Indices of the *Restart keyword lines."""
+    return [i for i, l in enumerate(lines) if is_keyword(l) and parse_keyword(l)[0] == "restart"]
+
+
+def apply_lines(lines: List[str], profile: str, slots: Optional[List[int]] = None) -> List[str]:
+    """A copy of the deck lines with the profile's restart request (lines before *End Step keep their index)."""
+    interval = restart_interval(profile)
+    if interval is None:
+        return list(lines)
+    slots = restart_slots(lines) if slots is None else slots
+    lines = list(lines)
+    if not slots:
+        if interval:                     # a validation run of a deck without a request
+            end = next((i for i, l in enumerate(lines) if l.lower().startswith("*end step")), len(lines))
+            lines.insert(end, restart_line(interval))
+        return lines
+    for i in slots:
+        # a comment keeps the line count, and shows what the profile did
+        lines[i] = restart_line(interval) if interval else f"** {lines[i].rstrip()}   (output profile: {profile})\n"
+    return lines
+
+
+def apply(deck: Path, profile: str) -> Path:
+    """Rewrite a deck file in place with the profile's restart request."""
+    deck = Path(deck)
+    if restart_interval(profile) is None:
+        return deck
+    with deck.open("r", encoding="latin-1") as fh:
+        lines = fh.readlines()
+    new = apply_lines(lines, profile)
+    if new != lines:
+        with deck.open("w", encoding="latin-1") as fh:
+            fh.writelines(new)
+    return deck
+
+
+def cleanup(workdir: Path, job: str) -> int:
+    """Delete the restart / continuation files of a finished job; bytes freed."""
+    freed = 0
+    for ext in RESTART_EXT:
+        f = Path(workdir) / f"{job}{ext}"
+        if f.is_file():
+            freed += f.stat().st_size
+            f.unlink()
+    return freed
+
+
+def main(argv: List[str] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["write"] and len(argv) in (2, 3):
+        import shutil
+        from inp_deck import TEMPLATE
+        src = Path(argv[2]) if len(argv) == 3 else TEMPLATE
+        out = src.with_name(f"{src.stem}_{argv[1].replace(':', '')}.inp")
+        shutil.copyfile(src, out)
+        print(f"✓ {apply(out, argv[1])}")
+    elif argv[:1] == ["clean"] and len(argv) == 2:
+        freed = n = 0
+        for d in sorted(p for p in Path(argv[1]).iterdir() if p.is_dir()):
+            if (d / f"{d.name}.lck").exists():
+                print(f"  ⊘ {d.name}: running – skipped")
+                continue
+            b = cleanup(d, d.name)
+            freed, n = freed + b, n + bool(b)
+        print(f"✓ {freed / 2 ** 20:.1f} MB of restart files removed from {n} job(s)")
+    else:
+        sys.exit("usage: python output_profiles.py write <profile> [deck.inp] | clean <jobs dir>")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+pipeline.py  —  run the non-Abaqus stages of one iteration in ONE interpreter
+=============================================================================
+
+`Sequential.py` used to start a fresh `python` for every script, so NumPy,
+SciPy and qpsolvers/cvxopt were re-imported by each stage.  Here every stage
+is a plain function; the script it wraps is loaded from its file path the
+first time a stage needs it and kept in a module cache, so each heavy import
+happens at most once per process (and not at all if the stage never runs).
+
+Stages (default order)
+----------------------
+    function_script   Function_Script.py        patch Href.inp + baseline job
+    batnorms          Chip Geometry/batnorms.py launch the extraction batch
+    processing        Chip Geometry/Processing.py  replay → Gradient/Error
+    gradients         */Gradient.py, CF/PFGradient.py   raw sensitivities
+    normalise         */Normal.py, CF/PFNormal.py       normalised rows
+    combine           combine.py                 sensitivity_*.json
+    sensitivity       sensitivity.py             results_table.json → the same
+                                                 two files in one call (use it
+                                                 instead of gradients/normalise/
+                                                 combine)
+    inverse           Inverse.py                 bounded GN step
+    update            update.py                  finals_param → Function_Script
+
+Run:
+    python pipeline.py                              # the legacy chain
+    python pipeline.py gradients normalise combine inverse
+    python pipeline.py sensitivity inverse update
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import runpy
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# ───────────────────── script locations (repo-relative) ─────────────────────
+HERE     = Path(__file__).resolve().parent
+CHIP_DIR = HERE / "Chip Geometry"
+FORCE_DIR = HERE / "Force"
+
+FUNCTION_SCRIPT = HERE / "Function_Script.py"
+BATNORMS_PY     = CHIP_DIR / "batnorms.py"
+PROCESSING_PY   = CHIP_DIR / "Processing.py"
+
+GRADIENT_SCRIPTS = [
+    CHIP_DIR / "Chip Thickness" / "Gradient.py",
+    CHIP_DIR / "Contact Length" / "Gradient.py",
+    FORCE_DIR / "Cutting Force" / "CFGradient.py",
+    FORCE_DIR / "Penetration Force" / "PFGradient.py",
+]
+NORMAL_SCRIPTS = [
+    CHIP_DIR / "Chip Thickness" / "Normal.py",
+    CHIP_DIR / "Contact Length" / "Normal.py",
+    FORCE_DIR / "Cutting Force" / "CFNormal.py",
+    FORCE_DIR / "Penetration Force" / "PFNormal.py",
+]
+
+RESULTS_TABLE = HERE / "results_table.json"   # baseline + perturbed runs
+
+PROCESSING_WAIT_S = 10          # batnorms launches Abaqus asynchronously
+# ─────────────────────────────────────────────────────────────────────────────
+
+_modules: Dict[Path, object] = {}
+
+
+def load_module(path: Path):
+    """
+    Import a script by file path (folders have spaces, so no package import).
+    Cached: a second call for the same path returns the same module object.
+    """
+    path = Path(path).resolve()
+    if path not in _modules:
+        if not path.is_file():
+            raise FileNotFoundError(f"Stage script not found: {path}")
+        name = "_stage_" + "_".join(path.relative_to(HERE).with_suffix("").parts)
+        name = name.replace(" ", "_").replace("-", "_")
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+        _modules[path] = module
+    return _modules[path]
+
+
+def run_as_main(path: Path) -> None:
+    """Execute a top-level script in this interpreter (like `python path`,
+    including the script's folder at the front of sys.path)."""
+    if not Path(path).is_file():
+        raise FileNotFoundError(f"Stage script not found: {path}")
+    folder = str(Path(path).resolve().parent)
+    sys.path.insert(0, folder)
+    try:
+        runpy.run_path(str(path), run_name="__main__")
+    finally:
+        if folder in sys.path:
+            sys.path.remove(folder)
+
+
+# ──────────────────────────────── stages ─────────────────────────────────────
+def run_function_script() -> None:
+    # the JC strings live in Function_Script's __main__ block (patched by update.py)
+    run_as_main(FUNCTION_SCRIPT)
+
+
+def run_batnorms() -> None:
+    mod = load_module(BATNORMS_PY)
+    mod.run_batch(mod.BAT_PATH)
+
+
+def run_processing(wait_s: float = PROCESSING_WAIT_S) -> None:
+    if wait_s > 0:
+        print(f"⏳ Waiting {wait_s:g} seconds before running Processing.py...")
+        time.sleep(wait_s)
+    load_module(PROCESSING_PY).main()
+
+
+def run_gradients() -> None:
+    for path in GRADIENT_SCRIPTS:
+        load_module(path).main()
+
+
+def run_normalise() -> None:
+    # Normal.py scripts are written as straight-line scripts
+    for path in NORMAL_SCRIPTS:
+        run_as_main(path)
+
+
+def run_combine() -> None:
+    load_module(HERE / "combine.py").combine()
+
+
+def run_sensitivity() -> None:
+    sens = load_module(HERE / "sensitivity.py")
+    out_dir = load_module(HERE / "Inverse.py").base_dir   # where Inverse reads them
+    table = sens.ResultsTable.load(RESULTS_TABLE)
+    sens.write_outputs(table, out_dir)
+
+    # a fresh FD Jacobian restarts the Broyden chain (jacobian_update.py)
+    ju = load_module(HERE / "jacobian_update.py")
+    ju.JacobianState.from_fd(table.x0, table.y0, sens.raw_jacobian(table)).save(ju.STATE_PATH)
+
+
+def run_inverse() -> None:
+    load_module(HERE / "Inverse.py").run_inverse()
+
+
+def run_update() -> None:
+    load_module(HERE / "update.py").main()
+
+
+STAGES: Dict[str, Callable[[], None]] = {
+    "function_script": run_function_script,
+    "batnorms":        run_batnorms,
+    "processing":      run_processing,
+    "gradients":       run_gradients,
+    "normalise":       run_normalise,
+    "combine":         run_combine,
+    "sensitivity":     run_sensitivity,
+    "inverse":         run_inverse,
+    "update":          run_update,
+}
+
+DEFAULT_STAGES = [s for s in STAGES if s != "sensitivity"]
+
+
+# ──────────────────────────────── driver ─────────────────────────────────────
+def run_pipeline(stage_names: List[str] = None, keep_going: bool = True) -> Dict[str, float]:
+    """
+    Run the named stages (default: the legacy chain, in order) and return
+    their wall times.
+    Like Sequential.run_script, a failing stage is reported and – unless
+    `keep_going` is False – the following stages still run.
+    """
+    stage_names = list(stage_names or DEFAULT_STAGES)
+    unknown = [s for s in stage_names if s not in STAGES]
+    if unknown:
+        raise KeyError(f"Unknown stage(s) {unknown}; choose from {list(STAGES)}")
+
+    timings: Dict[str, float] = {}
+    for name in stage_names:
+        print(f"🔄 Starting {name}...")
+        t0 = time.perf_counter()
+        try:
+            STAGES[name]()
+            print(f"✅ Finished {name}.\n")
+        except SystemExit as e:              # the scripts use sys.exit(msg)
+            if e.code not in (None, 0):
+                print(f"❌ {name} exited: {e.code}\n")
+                if not keep_going:
+                    raise
+        except Exception as e:
+            print(f"❌ Error in {name}: {e}\n")
+            if not keep_going:
+                raise
+        finally:
+            timings[name] = time.perf_counter() - t0
+
+    print("Stage timings:")
+    for name, dt in timings.items():
+        print(f"  {name:<16} {dt:8.2f} s")
+    return timings
+
+
+if __name__ == "__main__":
+    run_pipeline(sys.argv[1:] or None)
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+resources.py  —  CPU, memory, disk and license use of every solver and extraction process
+==========================================================================================
+
+`run(cmd, cwd)` is subprocess.run(shell=True, capture_output=True) that
+also measures what the command cost, its whole process tree included
+(the Abaqus launcher starts pre, explicit and the MPI ranks):
+
+    wall          s      from start to exit
+    cpu, cpu_user, cpu_system
+                  s      rusage of the reaped tree (os.wait4), or the
+                         /proc samples where that is not available
+    peak_rss_mb   MB     largest sum of the tree's RSS over the /proc
+                         samples (every INTERVAL s), at least ru_maxrss
+    write_mb, read_mb    bytes the tree sent to / got from the disk
+                         (/proc/<pid>/io, rusage block counts)
+
+and puts it on the result as `.usage`.  On a system without /proc or
+os.wait4 (Windows) only `wall` is measured.
+
+`job_files` and `job_logs` add what the job left behind: the size of the
+ODB, of the restart files written for `*Restart, write` (.res, .abq,
+.pac, .sel, .mdl, .stt) and of the .sta, the license tokens checked out
+(from the .log; Abaqus' token formula for the CPU count when the log
+does not say) and the solver's own JOB TIME SUMMARY from the .msg/.dat.
+
+scheduler.py stores all of it with the job's record in runs.jsonl:
+
+    "resources": {"solver": {...}, "chip extraction": {...}, "force extraction": {...}}
+
+failed jobs included (y null, "error", the stages that ran), so
+disk-bound jobs (write_mb / wall high, cpu / wall low) and the memory a
+node needs per job can be read off the database.
+
+Run:
+    python resources.py                  # the last records of runs.jsonl
+    python resources.py -- <command>     # measure any command
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from cpu_tuner import tokens
+
+# ───────────────────────────── settings ──────────────────────────────
+INTERVAL    = 0.5                    # s between /proc samples
+PROC        = Path("/proc")
+RESTART_EXT = (".res", ".abq", ".pac", ".sel", ".mdl", ".stt")
+# ───────────────────────────────────────────────────────────────────────
+
+MB = 2 ** 20
+NUM = r"[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?"
+P_TOKENS = re.compile(r"checked\s+out\s+(\d+)\s+tokens?", re.I)
+P_SUMMARY = {"solver_cpu": re.compile(rf"TOTAL CPU TIME \(SEC\)\s*=\s*({NUM})"),
+             "solver_wall": re.compile(rf"WALLCLOCK TIME \(SEC\)\s*=\s*({NUM})")}
+
+
+# ─────────────────────────────── /proc ────────────────────────────────
+def _stat(pid: int) -> Optional[tuple]:
+    """(ppid, cpu seconds, rss bytes) of a live process."""
+    try:
+        text = (PROC / str(pid) / "stat").read_text()
+    except OSError:
+        return None
+    f = text[text.rindex(")") + 2:].split()          # fields from 3 (state) on
+    return int(f[1]), (int(f[11]) + int(f[12])) / _CLK, int(f[21]) * _PAGE
+
+
+def _io(pid: int) -> Optional[tuple]:
+    """(read_bytes, write_bytes) of a live process (same user only)."""
+    try:
+        rows = dict(l.split(": ") for l in (PROC / str(pid) / "io").read_text().splitlines())
+    except (OSError, ValueError):
+        return None
+    return int(rows["read_bytes"]), int(rows["write_bytes"])
+
+
+def _tree(root: int) -> List[int]:
+    """root and all its live descendants."""
+    children: Dict[int, List[int]] = {}
+    for d in PROC.iterdir():
+        if d.name.isdigit():
+            st = _stat(int(d.name))
+            if st is not None:
+                children.setdefault(st[0], []).append(int(d.name))
+    out, todo = [], [root]
+    while todo:
+        pid = todo.pop()
+        out.append(pid)
+        todo.extend(children.get(pid, ()))
+    return out
+
+
+if PROC.is_dir() and hasattr(os, "sysconf"):
+    _CLK, _PAGE = os.sysconf("SC_CLK_TCK"), os.sysconf("SC_PAGE_SIZE")
+else:
+    _CLK = _PAGE = None
+
+
+class Sampler(threading.Thread):
+    """Peak RSS of a process tree, and the last CPU/IO counters of each of its processes."""
+
+    def __init__(self, pid: int, interval: float = INTERVAL):
+        super().__init__(daemon=True, name=f"resources-{pid}")
+        self.pid, self.interval = pid, interval
+        self.peak_rss = 0
+        self.cpu: Dict[int, float] = {}
+        self.io: Dict[int, tuple] = {}
+        self.samples = 0
+        self._done = threading.Event()
+
+    def sample(self) -> None:
+        rss = 0
+        for pid in _tree(self.pid):
+            st = _stat(pid)
+            if st is None:
+                continue
+            rss += st[2]
+            self.cpu[pid] = st[1]
+            io = _io(pid)
+            if io is not None:
+                self.io[pid] = io
+        self.peak_rss = max(self.peak_rss, rss)
+        self.samples += 1
+
+    def run(self) -> None:
+        while True:
+            self.sample()
+            if self._done.wait(self.interval):
+                return
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+
+def _exit_code(status: int) -> int:
+    return os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+
+
+# ─────────────────────────────── run ──────────────────────────────────
+def run(cmd: str, cwd: Path, env: Optional[dict] = None, interval: float = INTERVAL) -> subprocess.CompletedProcess:
+    """subprocess.run(cmd, shell=True, capture_output=True, text=True) with `.usage` on the result."""
+    t0 = time.perf_counter()
+    if not hasattr(os, "wait4"):
+        result = subprocess.run(cmd, shell=True, cwd=str(cwd), text=True, capture_output=True, env=env)
+        result.usage = {"wall": time.perf_counter() - t0}
+        return result
+
+    proc = subprocess.Popen(cmd, shell=True, cwd=str(cwd), text=True, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    sampler = Sampler(proc.pid, interval) if _CLK else None
+    if sampler is not None:
+        sampler.start()
+    streams = {}
+    readers = [threading.Thread(target=lambda k, fh: streams.__setitem__(k, fh.read()), args=(k, fh), daemon=True)
+               for k, fh in (("stdout", proc.stdout), ("stderr", proc.stderr))]
+    for r in readers:
+        r.start()
+    # waited for here rather than by Popen: the rusage covers every reaped descendant
+    _, status, ru = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - t0
+    proc.returncode = _exit_code(status)
+    for r in readers:
+        r.join()
+    proc.stdout.close()
+    proc.stderr.close()
+
+    usage = {"wall": wall, "cpu_user": ru.ru_utime, "cpu_system": ru.ru_stime,
+             "cpu": ru.ru_utime + ru.ru_stime,
+             # ru_maxrss: kB on Linux, bytes on macOS; largest single process of the tree
+             "peak_rss_mb": ru.ru_maxrss * (1 if sys.platform == "darwin" else 1024) / MB,
+             "read_mb": ru.ru_inblock * 512 / MB, "write_mb": ru.ru_oublock * 512 / MB}
+    if sampler is not None:
+        sampler.stop()
+        usage["cpu"] = max(usage["cpu"], sum(sampler.cpu.values()))
+        usage["peak_rss_mb"] = max(usage["peak_rss_mb"], sampler.peak_rss / MB)
+        usage["read_mb"] = max(usage["read_mb"], sum(r for r, _ in sampler.io.values()) / MB)
+        usage["write_mb"] = max(usage["write_mb"], sum(w for _, w in sampler.io.values()) / MB)
+        usage["samples"] = sampler.samples
+    result = subprocess.CompletedProcess(proc.args, proc.returncode, streams.get("stdout", ""),
+                                         streams.get("stderr", ""))
+    result.usage = usage
+    return result
+
+
+# ─────────────────────────────── job files ────────────────────────────
+def job_files(workdir: Path, job: str) -> dict:
+    """MB on disk of the ODB, the .sta and the restart files of a job."""
+    sizes = {}
+    for ext in (".odb", ".sta") + RESTART_EXT:
+        f = Path(workdir) / f"{job}{ext}"
+        if f.is_file():
+            sizes[ext[1:]] = f.stat().st_size / MB
+    restart = sum(sizes.get(e[1:], 0.0) for e in RESTART_EXT)
+    return {"files_mb": sizes, "restart_mb": restart, "output_mb": sum(sizes.values())}
+
+
+def job_logs(workdir: Path, job: str, cpus: Optional[int] = None) -> dict:
+    """License tokens from the .log, the JOB TIME SUMMARY from the .msg / .dat."""
+    out: dict = {}
+    texts = {ext: (Path(workdir) / f"{job}{ext}") for ext in (".log", ".msg", ".dat")}
+    texts = {ext: f.read_text(encoding="latin-1", errors="ignore") for ext, f in texts.items() if f.is_file()}
+    found = [int(t) for t in P_TOKENS.findall(texts.get(".log", ""))]
+    if found:
+        out["license_tokens"] = max(found)
+    elif cpus:
+        out["license_tokens"] = tokens(cpus)
+        out["license_tokens_estimated"] = True
+    for key, pattern in P_SUMMARY.items():
+        for ext in (".msg", ".dat"):
+            m = pattern.findall(texts.get(ext, ""))
+            if m:
+                out[key] = float(m[-1])
+                break
+    return out
+
+
+def main(argv: List[str] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--"]:
+        result = run(" ".join(argv[1:]), Path.cwd())
+        sys.stdout.write(result.stdout)
+        sys.stderr.write(result.stderr)
+        print({k: round(v, 3) for k, v in result.usage.items()})
+        sys.exit(result.returncode)
+
+    from run_database import RunDatabase
+    rows = [r for r in RunDatabase().records() if r.get("resources")][-20:]
+    print(f"{'job':<20} {'stage':<17} {'wall s':>8} {'cpu s':>8} {'cpu/wall':>8} {'RSS MB':>8} "
+          f"{'write MB':>9} {'ODB MB':>8} {'res MB':>8} {'tokens':>6}")
+    for r in rows:
+        for stage, u in r["resources"].items():
+            files = u.get("files_mb", {})
+            cpu_wall = u.get("cpu", 0.0) / u["wall"] if u.get("wall") else float("nan")
+            print(f"{r['name']:<20} {stage:<17} {u.get('wall', float('nan')):8.1f} {u.get('cpu', float('nan')):8.1f} "
+                  f"{cpu_wall:8.2f} {u.get('peak_rss_mb', float('nan')):8.0f} {u.get('write_mb', float('nan')):9.1f} "
+                  f"{files.get('odb', 0.0):8.1f} {u.get('restart_mb', 0.0):8.1f} {u.get('license_tokens', ''):>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+result_cache.py  —  content-addressed cache of simulation results
+=================================================================
+
+A finished simulation is fully determined by
+    • the six material parameters (TQ, A, B, n, m, C),
+    • everything else in the deck (mesh, sets, BCs, step, outputs), and
+    • the solver version,
+so the cache key is a SHA-256 over exactly those three things:
+
+    key = sha256({"params": canonical(x), "deck": deck_hash, "solver": version})
+
+`deck_hash` hashes the deck with the Johnson-Cook / Taylor-Quinney data
+lines blanked out, so every perturbation of the same template shares one
+deck hash and only the parameters tell them apart.  Parameters are rounded
+to the precision the deck writers print (6 decimals, see update.py) so a
+vector that produces a byte-identical deck produces the same key.
+
+Layout on disk
+--------------
+    result_cache/<key[:2]>/<key>/metrics.json     outputs + metadata
+    result_cache/<key[:2]>/<key>/snapshot.npz     optional reduced fields
+
+Run:
+    python result_cache.py                       # list entries
+    python result_cache.py deck.inp              # look a deck up
+"""
+
+from __future__ import annotations
+
+import datetime
+import hashlib
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+HERE       = Path(__file__).resolve().parent
+CACHE_ROOT = HERE / "result_cache"
+
+SOLVER_VERSION = "Abaqus 2023"      # bump when the solver is upgraded
+PARAM_DECIMALS = 6                  # what the deck writers print
+
+# keyword line → how many parameters its data line carries (TQ | A B n m | C)
+MATERIAL_KEYWORDS = {
+    "*inelastic heat fraction": 1,
+    "*plastic, hardening=johnson cook": 4,
+    "*rate dependent, type=johnson cook": 1,
+}
+
+
+# ───────────────────────────── hashing ────────────────────────────────
+def canonical_params(x) -> List[str]:
+    """Fixed-precision text of the parameter vector (−0 folded into 0)."""
+    return [f"{round(float(v), PARAM_DECIMALS) + 0.0:.{PARAM_DECIMALS}f}" for v in x]
+
+
+def _material_keyword(line: str) -> Optional[str]:
+    low = " ".join(line.strip().lower().split())
+    for kw in MATERIAL_KEYWORDS:
+        if low.startswith(kw):
+            return kw
+    return None
+
+
+def deck_hash(inp_path: Path) -> str:
+    """SHA-256 of the deck with the material parameter lines masked."""
+    h = hashlib.sha256()
+    mask_next = False
+    with Path(inp_path).open("r", encoding="latin-1") as fh:
+        for line in fh:
+            if mask_next:
+                h.update(b"<material>\n")
+                mask_next = False
+                continue
+            mask_next = _material_keyword(line) is not None
+            h.update(line.rstrip().encode("latin-1") + b"\n")
+    return h.hexdigest()
+
+
+def deck_params(inp_path: Path) -> List[float]:
+    """(TQ, A, B, n, m, C) as written in a deck."""
+    found = {}
+    with Path(inp_path).open("r", encoding="latin-1") as fh:
+        lines = iter(fh)
+        for line in lines:
+            kw = _material_keyword(line)
+            if kw is not None:
+                data = next(lines, "")
+                vals = [float(p) for p in data.split(",") if p.strip()]
+                found[kw] = vals[:MATERIAL_KEYWORDS[kw]]
+    missing = [kw for kw in MATERIAL_KEYWORDS if kw not in found]
+    if missing:
+        raise ValueError(f"{inp_path}: no data line for {missing}")
+    tq = found["*inelastic heat fraction"]
+    abnm = found["*plastic, hardening=johnson cook"]
+    c = found["*rate dependent, type=johnson cook"]
+    return tq + abnm + c
+
+
+def cache_key(x, deck: str, solver: str = SOLVER_VERSION) -> str:
+    payload = json.dumps({"params": canonical_params(x), "deck": deck, "solver": solver},
+                         sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ───────────────────────────── the cache ──────────────────────────────
+class ResultCache:
+    def __init__(self, root: Path = CACHE_ROOT):
+        self.root = Path(root)
+
+    def entry_dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str) -> Optional[dict]:
+        """The stored metrics.json record, or None on a miss."""
+        path = self.entry_dir(key) / "metrics.json"
+        if not path.is_file():
+            return None
+        with path.open("r", encoding="utf-8") as fh:
+            return json.load(fh)
+
+    def __contains__(self, key: str) -> bool:
+        return (self.entry_dir(key) / "metrics.json").is_file()
+
+    def put(self, key: str, outputs: dict, x=None, snapshot: dict = None, **meta) -> dict:
+        """
+        Store the extracted outputs (and optionally a reduced field snapshot:
+        a dict of NumPy arrays saved as snapshot.npz).  metrics.json is
+        written last, through a temp file, so a crash never leaves a
+        half-written entry that looks like a hit.
+        """
+        d = self.entry_dir(key)
+        d.mkdir(parents=True, exist_ok=True)
+        if snapshot is not None:
+            import numpy as np
+            np.savez_compressed(d / "snapshot.npz", **snapshot)
+
+        record = {
+            "key": key,
+            "outputs": {k: float(v) for k, v in outputs.items()},
+            "x": None if x is None else [float(v) for v in x],
+            "stored": datetime.datetime.now().isoformat(timespec="seconds"),
+            "snapshot": snapshot is not None,
+        }
+        record.update(meta)
+        tmp = d / "metrics.json.tmp"
+        tmp.write_text(json.dumps(record, indent=2), encoding="utf-8")
+        tmp.replace(d / "metrics.json")
+        return record
+
+    def snapshot(self, key: str):
+        """The stored snapshot as an NpzFile, or None."""
+        path = self.entry_dir(key) / "snapshot.npz"
+        if not path.is_file():
+            return None
+        import numpy as np
+        return np.load(path)
+
+    def entries(self):
+        for path in sorted(self.root.glob("*/*/metrics.json")):
+            with path.open("r", encoding="utf-8") as fh:
+                yield json.load(fh)
+
+
+def main(argv: List[str] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    cache = ResultCache()
+    if argv:
+        deck = Path(argv[0])
+        key = cache_key(deck_params(deck), deck_hash(deck))
+        hit = cache.get(key)
+        print(f"{deck}  →  {key}")
+        print(json.dumps(hit, indent=2) if hit else "  (not cached)")
+        return
+
+    n = 0
+    for rec in cache.entries():
+        n += 1
+        print(f"{rec['key'][:12]}  {rec.get('job', '?'):<16} {rec['outputs']}")
+    print(f"{n} cached result(s) in {cache.root}")
+
+
+if __name__ == "__main__":
+    main()
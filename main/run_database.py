@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+run_database.py  —  every simulation we have ever run, as (x, y) samples
+=======================================================================
+
+One JSON record per line in runs.jsonl (append-only, safe to grep):
+
+    {"name": "AChipInp", "x": [TQ, A, B, n, m, C],
+     "y": [chip, Lc, Fc, Fp] | null, "time": "2025-08-27T17:57:19", ...}
+
+`y` is null for a job that never produced outputs.  Any extra keyword
+passed to `add()` is stored alongside (deck path, iteration, what the
+solver and extractors cost – resources.py, …).  The scheduler tags every
+record with the template it patched ("template", "template_hash"), and
+`arrays()`/`near()` return only runs on the fine template (scheduler.
+TEMPLATE) unless asked for another one, so coarse (multifidelity.py) and
+mass-scaled (mass_scaling.py) runs never feed the surrogate, the local
+Jacobian or the noise estimate.  Untagged records (imported tables, runs
+from before the tag) count as fine.
+
+Run:
+    python run_database.py                       # summary of runs.jsonl
+    python run_database.py import results_table.json
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import sys
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+import numpy as np
+
+HERE    = Path(__file__).resolve().parent
+DB_PATH = HERE / "runs.jsonl"
+
+FINE    = "fine"                    # arrays()/near() default: scheduler.TEMPLATE
+
+_write_lock = threading.Lock()      # batches finish on worker threads
+
+
+@lru_cache(maxsize=None)
+def _template_hash(path: str, mtime: float) -> str:
+    from result_cache import deck_hash
+    return deck_hash(Path(path))
+
+
+def _on_template(template) -> Callable[[dict], bool]:
+    """Record filter for `template`: FINE, a deck path, or None (all)."""
+    if template is None:
+        return lambda r: True
+    legacy = template == FINE
+    if legacy:
+        from scheduler import TEMPLATE as template
+    path = Path(template).resolve()
+    h = _template_hash(str(path), path.stat().st_mtime)
+    return lambda r: r.get("template_hash", h if legacy else None) == h
+
+
+class RunDatabase:
+    def __init__(self, path: Path = DB_PATH):
+        self.path = Path(path)
+
+    # -- writing ----------------------------------------------------------
+    def add(self, name: str, x, y=None, **meta) -> dict:
+        record = {
+            "name": name,
+            "x": [float(v) for v in x],
+            "y": None if y is None else [float(v) for v in y],
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        record.update(meta)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with _write_lock, self.path.open("a", encoding="utf-8") as fh:
+            fh.write(json.dumps(record) + "\n")
+        return record
+
+    def import_table(self, table) -> int:
+        """Append every run of a sensitivity.ResultsTable."""
+        for name, x, y in zip(table.names, table.X, table.Y):
+            self.add(name, x, y, source="results_table")
+        return len(table.names)
+
+    # -- reading ----------------------------------------------------------
+    def records(self) -> Iterator[dict]:
+        if not self.path.is_file():
+            return
+        with self.path.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    def arrays(self, n_out: Optional[int] = None, template=FINE):
+        """
+        (X, Y, names) of every run on `template` (FINE, a deck path, or
+        None for all) that produced outputs.
+        """
+        keep = _on_template(template)
+        rows = [r for r in self.records() if r.get("y") is not None and keep(r)]
+        if n_out is not None:
+            rows = [r for r in rows if len(r["y"]) == n_out]
+        if not rows:
+            return np.empty((0, 0)), np.empty((0, 0)), []
+        X = np.array([r["x"] for r in rows], dtype=float)
+        Y = np.array([r["y"] for r in rows], dtype=float)
+        return X, Y, [r["name"] for r in rows]
+
+    def near(self, x0, radius: float, n_out: Optional[int] = None, template=FINE):
+        """
+        Completed runs within a relative radius of x0:
+        ‖(x − x0) / x0‖₂ ≤ radius.  Returns (X, Y, distances).
+        n_out and template select records as in arrays().
+        """
+        X, Y, _ = self.arrays(n_out, template)
+        x0 = np.asarray(x0, dtype=float)
+        if X.size == 0:
+            return X.reshape(0, x0.size), Y, np.empty(0)
+        d = np.linalg.norm((X - x0) / x0, axis=1)
+        keep = d <= radius
+        return X[keep], Y[keep], d[keep]
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.records())
+
+
+def main(argv: List[str] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    db = RunDatabase()
+    if argv[:1] == ["import"] and len(argv) == 2:
+        from sensitivity import ResultsTable
+        n = db.import_table(ResultsTable.load(Path(argv[1])))
+        print(f"✓ Imported {n} runs into {db.path}")
+        return
+
+    X, Y, names = db.arrays()
+    print(f"{db.path}: {len(db)} records, {len(names)} with outputs on the fine template")
+    for name, x, y in zip(names, X, Y):
+        print(f"  {name:<20} x={np.round(x, 6).tolist()}  y={np.round(y, 6).tolist()}")
+
+
+if __name__ == "__main__":
+    main()
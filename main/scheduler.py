@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+scheduler.py  —  deck → Abaqus → extraction for one parameter vector,
+                 with the result cache consulted before anything is submitted
+=============================================================================
+
+    job = Job("Yil", x=[TQ, A, B, n, m, C])
+    outputs = run_job(job)        # {"chip": …, "contact_length": …, "CForce": …, "PForce": …}
+
+For every job:
+  1. the cache key (result_cache.py) is computed from x, the template deck
+     and the solver version – a hit returns the stored outputs at once;
+  2. otherwise the deck is written with Function_Script.process_inp_file
+     (a batch writes all its decks in one pass, DeckTemplate) and the
+     job's output profile (output_profiles.py: no restart output unless
+     it is a validation run), its runtime
+     is predicted (stable_time.py; refused when far above the template's),
+     and Abaqus runs in the job's own folder  jobs/<name>/,
+  3. chip thickness / contact length (final_code_for_Fegor.py) and the
+     forces (CutForce.py) are extracted with `-- -odb`,
+  4. the outputs go into the cache and into runs.jsonl (run_database.py),
+     with what the solver and each extraction cost (resources.py: CPU,
+     peak RSS, wall time, bytes written, ODB/restart/.sta sizes, tokens);
+     with CLEAN_RESTART the restart files are deleted afterwards;
+  5. with ARCHIVE a reduced snapshot (last-frame EVF, RP forces, metadata)
+     is stored with the cache entry and the ODB falls under archive.py's
+     retention policy.
+
+`run_batch` dispatches a whole list of jobs (a finite-difference stencil,
+a DoE, …) concurrently, at most `max_workers` Abaqus jobs at a time (or
+as many as cpu_tuner.py finds best for `cores` cores).  A
+batch given a `stop` event (speculative.py) skips the jobs that have not
+started yet once the event is set.  Every stage is a tracing.py span
+(deck generation, queue wait, solver, chip/force extraction).
+
+Run (re-running a crashed Yil is then free if it had finished once):
+    python scheduler.py finals_param.json [job_name]
+    python scheduler.py finals_param.json Yil --profile validation:20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import archive
+import output_profiles
+import resources
+from result_cache import ResultCache, cache_key, deck_hash, SOLVER_VERSION
+from run_database import RunDatabase
+from sensitivity import OUTPUT_NAMES
+from tracing import add_span, child_env, now_us, span
+
+# ───────────────────────────── user settings ────────────────────────────────
+ABAQUS_CMD = "abaqus"                 # or full path to abaqus.bat
+HERE       = Path(__file__).resolve().parent
+TEMPLATE   = HERE / "Href.inp"
+JOBS_DIR   = HERE / "jobs"
+
+CHIP_EXTRACT_PY  = HERE / "Chip Geometry" / "final_code_for_Fegor.py"
+FORCE_EXTRACT_PY = HERE / "Force" / "CutForce.py"
+
+DEFAULT_CPUS   = 4
+DEFAULT_MEMORY = "4GB"
+MAX_WORKERS    = 7                    # concurrent Abaqus jobs in a batch
+MAX_RUNTIME_RATIO = 3.0               # refuse decks predicted this much slower than
+                                      # their template (stable_time.py); None: off
+CLEAN_RESTART  = False                # delete .res/.abq/.pac/.sel/.mdl/.stt once extracted
+ARCHIVE        = True                 # snapshot every extracted job into the cache (archive.py)
+# ─────────────────────────────────────────────────────────────────────────────
+
+NUM_RE = r"[-+]?\d+(?:[.,]\d+)?(?:[eE][-+]?\d+)?"
+P_CHIP    = re.compile(r"Distance\s+Minimale\s*:\s*(" + NUM_RE + ")", re.I)
+P_CONTACT = re.compile(r"Distance\s+entre\s+le\s+premier.*?:\s*(" + NUM_RE + ")", re.I)
+
+
+class Job:
+    """One simulation: a name, a parameter vector and the template it patches."""
+
+    def __init__(self, name: str, x, template: Path = TEMPLATE,
+                 cpus: int = DEFAULT_CPUS, memory: str = DEFAULT_MEMORY,
+                 profile: str = output_profiles.DEFAULT_PROFILE):
+        self.name = name
+        self.x = [float(v) for v in x]
+        self.template = Path(template)
+        self.cpus = cpus
+        self.memory = memory
+        self.profile = profile                    # output_profiles.py; not part of the key
+        self.resources: Dict[str, dict] = {}      # stage → resources.py usage
+
+    @property
+    def workdir(self) -> Path:
+        return JOBS_DIR / self.name
+
+    @property
+    def deck(self) -> Path:
+        return self.workdir / f"{self.name}.inp"
+
+    @property
+    def odb(self) -> Path:
+        return self.workdir / f"{self.name}.odb"
+
+    def key(self, solver: str = SOLVER_VERSION) -> str:
+        return cache_key(self.x, _template_hash(str(self.template.resolve())), solver)
+
+    def __repr__(self) -> str:
+        return f"Job({self.name!r}, x={self.x})"
+
+
+@lru_cache(maxsize=None)
+def _template_hash(path: str) -> str:
+    return deck_hash(Path(path))
+
+
+def _template_tag(job: Job) -> dict:
+    """What runs.jsonl keeps of the template, so coarse and scaled runs stay apart."""
+    return {"template": job.template.name, "template_hash": _template_hash(str(job.template.resolve()))}
+
+
+# ─────────────────────────────── stages ─────────────────────────────────────
+def format_params(x) -> tuple:
+    """(inelastic, plastic, rate) strings exactly as update.py writes them."""
+    return (f"{x[0]:.6f}",
+            ", ".join(f"{v:.6f}" for v in x[1:5]),
+            f"{x[5]:.6f}")
+
+
+def write_deck(job: Job) -> Path:
+    from Function_Script import process_inp_file
+
+    inelastic, plastic, rate = format_params(job.x)
+    job.workdir.mkdir(parents=True, exist_ok=True)
+    with span("deck generation", job=job.name):
+        process_inp_file(str(job.template), str(job.deck),
+                         new_inelastic_params=inelastic,
+                         new_plastic_params=plastic,
+                         new_rate_params=rate)
+        output_profiles.apply(job.deck, job.profile)
+    return job.deck
+
+
+class DeckTemplate:
+    """
+    A template read once, with the three material data lines located, so
+    many decks can be written without re-parsing it.  The lines written are
+    the ones Function_Script.process_inp_file would write.
+    """
+
+    KEYWORDS = ("*inelastic heat fraction", "*plastic, hardening=johnson cook",
+                "*rate dependent, type=johnson cook")
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with self.path.open("r") as fh:
+            self.lines = fh.readlines()
+        self.slots = {}                          # keyword → index of its data line
+        self.restart = output_profiles.restart_slots(self.lines)
+        i = 0
+        while i < len(self.lines):
+            low = self.lines[i].lower()
+            kw = next((k for k in self.KEYWORDS if k in low), None)
+            if kw is not None and i + 1 < len(self.lines):
+                self.slots.setdefault(kw, []).append(i + 1)
+                i += 2
+                continue
+            i += 1
+
+    @staticmethod
+    def _merge(original: str, new: str) -> str:
+        """First len(new) values replaced, the rest kept, trailing comma (process_inp_file)."""
+        orig = [p.strip() for p in original.strip().split(",") if p.strip()]
+        parts = [p.strip() for p in new.split(",") if p.strip()]
+        return ", ".join(parts + orig[len(parts):]) + ",\n"
+
+    def render(self, x, profile: str = output_profiles.DEFAULT_PROFILE) -> List[str]:
+        inelastic, plastic, rate = format_params(x)
+        lines = output_profiles.apply_lines(self.lines, profile, self.restart)
+        for idx in self.slots.get(self.KEYWORDS[0], []):
+            lines[idx] = inelastic + "\n"
+        for idx in self.slots.get(self.KEYWORDS[1], []):
+            lines[idx] = self._merge(self.lines[idx], plastic)
+        for idx in self.slots.get(self.KEYWORDS[2], []):
+            lines[idx] = self._merge(self.lines[idx], rate)
+        return lines
+
+    def write(self, job: Job) -> Path:
+        job.workdir.mkdir(parents=True, exist_ok=True)
+        with job.deck.open("w") as fh:
+            fh.writelines(self.render(job.x, job.profile))
+        return job.deck
+
+
+def write_decks(jobs: List[Job]) -> List[Path]:
+    """Every deck of a batch in one pass – each template is read once."""
+    templates: Dict[Path, DeckTemplate] = {}
+    paths = []
+    with span("deck generation", jobs=len(jobs)):
+        for job in jobs:
+            tpl = templates.get(job.template)
+            if tpl is None:
+                tpl = templates[job.template] = DeckTemplate(job.template)
+            paths.append(tpl.write(job))
+    return paths
+
+
+def check_runtime(job: Job) -> Optional[float]:
+    """
+    Predicted wall seconds of the job's deck (stable_time.py); raises if it
+    is MAX_RUNTIME_RATIO times its template's – a changed mesh, density or
+    step time that would otherwise only show up hours later.
+    """
+    from stable_time import predict
+    try:
+        mine = predict(job.deck, (job.cpus,))["wall"][job.cpus]
+        ref = predict(job.template, (job.cpus,))["wall"][job.cpus]
+    except Exception as exc:                 # a deck the analyser does not understand
+        print(f"⚠️ No runtime prediction for '{job.name}': {exc}")
+        return None
+    if MAX_RUNTIME_RATIO is not None and mine > MAX_RUNTIME_RATIO * ref:
+        raise RuntimeError(f"'{job.name}' is predicted to run {mine / ref:.1f}× longer than "
+                           f"{job.template.name} ({mine / 3600:.2f} h) – not submitted")
+    return mine
+
+
+def _run(cmd: str, cwd: Path, what: str) -> subprocess.CompletedProcess:
+    """
+    Run a command in `cwd`; what it cost is on the result as `.usage`
+    (resources.py), and on the RuntimeError raised when it fails.
+    """
+    print(f"→ {what}:\n  {cmd}")
+    result = resources.run(cmd, cwd, env=child_env())
+    if result.returncode != 0:
+        err = RuntimeError(f"{what} failed (return code {result.returncode}):\n{result.stderr}")
+        err.usage = result.usage
+        raise err
+    return result
+
+
+def _stage(job: Job, stage: str, cmd: str, what: str) -> subprocess.CompletedProcess:
+    """_run in the job's folder; its cost goes to job.resources[stage], whether it succeeds or not."""
+    try:
+        result = _run(cmd, job.workdir, what)
+    except RuntimeError as exc:
+        job.resources[stage] = getattr(exc, "usage", {})
+        raise
+    job.resources[stage] = result.usage
+    return result
+
+
+def submit(job: Job) -> None:
+    cmd = (f'{ABAQUS_CMD} job={job.name} input="{job.deck.name}" '
+           f'cpus={job.cpus} memory={job.memory} interactive')
+    try:
+        with span("solver", job=job.name, cpus=job.cpus):
+            _stage(job, "solver", cmd, f"Abaqus job '{job.name}'")
+    finally:                                 # what an aborted job left behind counts as well
+        job.resources.setdefault("solver", {}).update(**resources.job_files(job.workdir, job.name),
+                                                      **resources.job_logs(job.workdir, job.name, job.cpus))
+
+
+def extract_abaqus(job: Job) -> Dict[str, float]:
+    """The four outputs of a finished job, via the Abaqus-Python extractors."""
+    with span("chip extraction", job=job.name):
+        chip_run = _stage(job, "chip extraction", f'{ABAQUS_CMD} cae noGUI="{CHIP_EXTRACT_PY}" -- -odb "{job.odb}"',
+                          f"chip extraction '{job.name}'")
+    # prints land in abaqus.rpy under cae, on stdout otherwise
+    rpy = job.workdir / "abaqus.rpy"
+    text = chip_run.stdout + (rpy.read_text(encoding="latin-1", errors="ignore") if rpy.is_file() else "")
+    chip = P_CHIP.findall(text)
+    contact = P_CONTACT.findall(text)
+    if not chip or not contact:
+        raise RuntimeError(f"No chip thickness / contact length found for '{job.name}'")
+
+    with span("force extraction", job=job.name):
+        _stage(job, "force extraction", f'{ABAQUS_CMD} cae noGUI="{FORCE_EXTRACT_PY}" -- -odb "{job.odb}"',
+               f"force extraction '{job.name}'")
+    hrf = json.loads((job.workdir / "out" / f"{job.odb.stem}.hrf").read_text(encoding="utf-8"))
+
+    return {
+        "chip": float(chip[-1].replace(",", ".")),
+        "contact_length": float(contact[-1].replace(",", ".")),
+        "CForce": float(hrf["force_c"]),
+        "PForce": float(hrf["force_p"]),
+    }
+
+
+# ─────────────────────────────── driver ─────────────────────────────────────
+def run_job(job: Job, cache: Optional[ResultCache] = None, db: Optional[RunDatabase] = None,
+            extract: Callable[[Job], Dict[str, float]] = extract_abaqus,
+            write: bool = True) -> Dict[str, float]:
+    """
+    Outputs for `job`, from the cache if possible, else by simulating it
+    (`write=False`: the deck is already on disk, see write_decks).
+    """
+    cache = cache if cache is not None else ResultCache()
+    db = db if db is not None else RunDatabase()
+
+    key = job.key()
+    hit = cache.get(key)
+    if hit is not None:
+        print(f"✓ Cache hit for '{job.name}' ({key[:12]}, first run as '{hit.get('job')}') – not submitted.")
+        return hit["outputs"]
+
+    if write:
+        write_deck(job)
+    predicted = check_runtime(job)
+    try:
+        submit(job)
+        outputs = extract(job)
+    except Exception as exc:                 # a failed job's cost is recorded too, with y = null
+        db.add(job.name, job.x, None, key=key, deck=str(job.deck), **_template_tag(job), cpus=job.cpus,
+               predicted_wall=predicted, resources=job.resources, error=f"{type(exc).__name__}: {exc}"[:500])
+        raise
+
+    if CLEAN_RESTART:
+        freed = output_profiles.cleanup(job.workdir, job.name)
+        if freed:
+            print(f"  ⊘ {freed / 2 ** 20:.1f} MB of restart files of '{job.name}' removed")
+    snap = None
+    if ARCHIVE:
+        try:
+            with span("archive", job=job.name):
+                snap = archive.snapshot_job(job, outputs)
+        except Exception as exc:             # the outputs are what matters; keep the ODB
+            print(f"⚠️ No snapshot for '{job.name}': {exc}")
+
+    cache.put(key, outputs, x=job.x, snapshot=None if snap is None else snap.arrays(),
+              job=job.name, deck=str(job.deck))
+    if snap is not None:
+        archive.mark(job, key)
+    db.add(job.name, job.x, [outputs[k] for k in OUTPUT_NAMES], key=key, deck=str(job.deck),
+           **_template_tag(job), cpus=job.cpus, predicted_wall=predicted, resources=job.resources)
+    print(f"✓ '{job.name}' → {outputs}")
+    return outputs
+
+
+def run_batch(jobs: List[Job], max_workers: int = MAX_WORKERS,
+              cache: Optional[ResultCache] = None, db: Optional[RunDatabase] = None,
+              extract: Callable[[Job], Dict[str, float]] = extract_abaqus,
+              stop: Optional[threading.Event] = None,
+              cores: Optional[int] = None) -> Dict[str, object]:
+    """
+    Run every job concurrently (threads – each one waits on an Abaqus process).
+    Returns {job name: outputs dict, or the exception that job raised}; one
+    failed job does not cancel the others.  Jobs still queued when `stop` is
+    set come back as CancelledError; running ones finish and are cached.
+    With `cores`, CPUs per job and concurrency come from cpu_tuner.allocate
+    for the jobs that actually have to run (max_workers stays a cap).
+    """
+    names = [j.name for j in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Job names must be unique within a batch: {names}")
+    cache = cache if cache is not None else ResultCache()
+    db = db if db is not None else RunDatabase()
+
+    # identical decks inside one batch are simulated once
+    first_by_key: Dict[str, Job] = {}
+    for j in jobs:
+        first_by_key.setdefault(j.key(), j)
+    # decks of everything not cached, in one pass before the first submission
+    pending = [j for k, j in first_by_key.items() if k not in cache]
+    write_decks(pending)
+    if cores and pending:
+        from cpu_tuner import allocate
+        best = allocate(len(pending), cores, max_workers=max_workers)
+        for j in pending:
+            j.cpus = best["cpus"]
+        max_workers = best["workers"]
+        print(f"⚡ {len(pending)} job(s) on {cores} cores: {best['cpus']} CPU(s) each, "
+              f"{best['workers']} at a time")
+
+    def one(j: Job):
+        add_span("queue wait", queued, now_us(), job=j.name)
+        if stop is not None and stop.is_set():
+            raise CancelledError(f"'{j.name}' cancelled before it started")
+        return run_job(j, cache, db, extract, write=False)
+
+    by_key: Dict[str, object] = {}
+    queued = now_us()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {pool.submit(one, j): k for k, j in first_by_key.items()}
+        for fut in as_completed(futures):
+            key = futures[fut]
+            try:
+                by_key[key] = fut.result()
+            except Exception as exc:
+                print(f"✗ '{first_by_key[key].name}' failed: {exc}")
+                by_key[key] = exc
+    return {j.name: by_key[j.key()] for j in jobs}
+
+
+def main(argv: List[str] = None) -> None:
+    global CLEAN_RESTART
+    ap = argparse.ArgumentParser(description="Run one job through the cache, Abaqus and the extractors.")
+    ap.add_argument("params", help="JSON with the 6 parameters (finals_param.json)")
+    ap.add_argument("name", nargs="?", default="Yil")
+    ap.add_argument("--profile", default=output_profiles.DEFAULT_PROFILE,
+                    help="output profile: identification, validation[:N] or template")
+    ap.add_argument("--clean", action="store_true", help="delete the restart files once extracted")
+    args = ap.parse_args(sys.argv[1:] if argv is None else argv)
+    CLEAN_RESTART = CLEAN_RESTART or args.clean
+    x = json.loads(Path(args.params).read_text(encoding="utf-8"))
+    run_job(Job(args.name, x, profile=args.profile))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+sensitivity.py  —  raw + normalised Jacobian for every output in one call
+========================================================================
+
+Replaces the Gradient.py / Normal.py / CFGradient.py / PFGradient.py /
+CFNormal.py / PFNormal.py / combine.py chain.  Input is a *results table*:
+the baseline run followed by the perturbed runs, each with its parameter
+vector and its outputs
+
+    results_table.json
+    {
+        "parameters": ["TQ", "A", "B", "n", "m", "C"],
+        "outputs":    ["chip", "contact_length", "CForce", "PForce"],
+        "runs": [
+            {"name": "Yil",       "x": [...6 values...], "y": [...4 values...]},
+            {"name": "TQChipInp", "x": [...],            "y": [...]},
+            ...
+        ]
+    }
+
+The raw Jacobian is the least-squares solution of  ΔY = ΔX · Jᵀ  over all
+perturbed runs (exactly the one-sided difference for a one-at-a-time design,
+but any number of runs, parameters or outputs works).  Normalised as in the
+Normal.py scripts:  S_ij = ∂F_i/∂x_j · x_j.
+
+Outputs (same layout combine.py wrote)
+--------------------------------------
+- **sensitivity_param1.json** : baseline outputs  [chip, Lc, Fc, Fp]
+- **sensitivity_matrix.json** : n_out × n_par normalised Jacobian
+
+Run:
+    python sensitivity.py results_table.json [out_dir]
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from typing import List, Sequence
+
+import numpy as np
+
+PARAM_NAMES  = ["TQ", "A", "B", "n", "m", "C"]
+OUTPUT_NAMES = ["chip", "contact_length", "CForce", "PForce"]
+
+
+# ───────────────────────────── results table ─────────────────────────────
+class ResultsTable:
+    """Baseline (row 0) + perturbed runs; X is runs × params, Y runs × outputs."""
+
+    def __init__(self, X, Y, parameters: Sequence[str] = PARAM_NAMES,
+                 outputs: Sequence[str] = OUTPUT_NAMES, names: Sequence[str] = None):
+        self.X = np.atleast_2d(np.asarray(X, dtype=float))
+        self.Y = np.atleast_2d(np.asarray(Y, dtype=float))
+        self.parameters = list(parameters)
+        self.outputs = list(outputs)
+        self.names = list(names) if names is not None else [f"run{i}" for i in range(len(self.X))]
+
+        if self.X.shape[0] != self.Y.shape[0]:
+            raise ValueError(f"{self.X.shape[0]} parameter rows but {self.Y.shape[0]} output rows")
+        if self.X.shape[1] != len(self.parameters):
+            raise ValueError(f"X has {self.X.shape[1]} columns, expected {len(self.parameters)} parameters")
+        if self.Y.shape[1] != len(self.outputs):
+            raise ValueError(f"Y has {self.Y.shape[1]} columns, expected {len(self.outputs)} outputs")
+        if self.X.shape[0] < 2:
+            raise ValueError("Need the baseline plus at least one perturbed run")
+
+    @property
+    def x0(self) -> np.ndarray:
+        return self.X[0]
+
+    @property
+    def y0(self) -> np.ndarray:
+        return self.Y[0]
+
+    # -- I/O --------------------------------------------------------------
+    @classmethod
+    def load(cls, path: Path) -> "ResultsTable":
+        with Path(path).open("r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        runs = data["runs"]
+        return cls([r["x"] for r in runs], [r["y"] for r in runs],
+                   data.get("parameters", PARAM_NAMES), data.get("outputs", OUTPUT_NAMES),
+                   [r.get("name", f"run{i}") for i, r in enumerate(runs)])
+
+    def save(self, path: Path) -> None:
+        data = {
+            "parameters": self.parameters,
+            "outputs": self.outputs,
+            "runs": [{"name": n, "x": x.tolist(), "y": y.tolist()}
+                     for n, x, y in zip(self.names, self.X, self.Y)],
+        }
+        with Path(path).open("w", encoding="utf-8") as fh:
+            json.dump(data, fh, indent=4)
+
+
+def table_from_legacy(x0, y0, perturbed_outputs, eps: float = 0.2, **kw) -> ResultsTable:
+    """
+    Build a table the way the Gradient.py scripts assumed it: perturbation j
+    moved parameter j by  eps·x_j  (eps if x_j == 0).  `perturbed_outputs` is
+    n_par × n_out, i.e. the pet_* lists stacked column-wise.
+    """
+    x0 = np.asarray(x0, dtype=float)
+    steps = np.where(x0 != 0, eps * x0, eps)
+    X = np.vstack([x0, x0 + np.diag(steps)])
+    Y = np.vstack([np.asarray(y0, dtype=float), np.asarray(perturbed_outputs, dtype=float)])
+    return ResultsTable(X, Y, **kw)
+
+
+# ───────────────────────────── the engine ────────────────────────────────
+def raw_jacobian(table: ResultsTable) -> np.ndarray:
+    """∂F_i/∂x_j (n_out × n_par) from every perturbed run at once."""
+    dX = table.X[1:] - table.x0
+    dY = table.Y[1:] - table.y0
+    if np.linalg.matrix_rank(dX) < dX.shape[1]:
+        raise ValueError("Perturbed runs do not span every parameter – Jacobian is undetermined")
+    J_T, *_ = np.linalg.lstsq(dX, dY, rcond=None)
+    return J_T.T
+
+
+def normalised_jacobian(table: ResultsTable, J_raw: np.ndarray = None) -> np.ndarray:
+    """S_ij = ∂F_i/∂x_j · x_j  (what Inverse.py expects as J)."""
+    if J_raw is None:
+        J_raw = raw_jacobian(table)
+    return J_raw * table.x0[None, :]
+
+
+def write_outputs(table: ResultsTable, out_dir: Path = None) -> tuple:
+    """Write sensitivity_param1.json and sensitivity_matrix.json."""
+    out_dir = Path(out_dir) if out_dir is not None else Path.cwd()
+    param1 = table.y0.tolist()
+    matrix = normalised_jacobian(table).tolist()
+
+    with open(out_dir / "sensitivity_param1.json", "w", encoding="utf-8") as fp:
+        json.dump(param1, fp, separators=(',', ':'))
+    with open(out_dir / "sensitivity_matrix.json", "w", encoding="utf-8") as fp:
+        json.dump(matrix, fp, separators=(',', ':'))
+    return param1, matrix
+
+
+def main(argv: List[str] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        sys.exit("usage: python sensitivity.py results_table.json [out_dir]")
+    table = ResultsTable.load(Path(argv[0]))
+    out_dir = Path(argv[1]) if len(argv) > 1 else Path.cwd()
+
+    param1, matrix = write_outputs(table, out_dir)
+
+    print(f"Baseline outputs ({len(param1)}): {param1}")
+    print(f"\nNormalised sensitivity matrix ({len(matrix)}×{len(table.parameters)}):")
+    print(" " * 16 + "".join(f"{p:>14}" for p in table.parameters))
+    for name, row in zip(table.outputs, matrix):
+        print(f"{name:<16}" + "".join(f"{v:14.6f}" for v in row))
+    print(f"\nDone! › Files written to: {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
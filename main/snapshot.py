@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+snapshot.py  —  the reduced result of one job, readable without Abaqus
+=======================================================================
+
+What the post-processing needs from an ODB fits in a few arrays:
+
+    evf        float32 (n_el,)     last-frame Eulerian volume fraction of the
+                                   material, per Massif element (EVF_VOID = 1 − evf)
+    elements   int32   (n_el,)     element labels, in the order of `evf`
+    rf_time    float32 (n_fr,)     frame times
+    rf         float32 (n_fr, 3)   reaction force on Tool-1.Set-RP per frame
+    mesh       str                 key of the Massif mesh in MESH_DIR
+    meta       str                 JSON: job, x, solver, outputs, …
+
+saved as one compressed .npz.  The mesh (node coordinates and
+connectivity) is the same for every job of a template, so it is stored
+once under result_cache/meshes/<key>.npz, keyed by a hash of the *Node
+and *Element blocks, instead of in every snapshot.
+
+archive.py writes one per extracted job into the result cache (from a
+real ODB through `abaqus python`), after which the ODB itself may go;
+fake_abaqus.py writes this format as its "ODB".
+
+    s = load("jobs/Yil/Yil.odb")          # fake_abaqus.py output
+    s.evf, s.rf, s.meta["x"], s.mesh()["centroids"]
+
+Run:
+    python snapshot.py file.npz          # summary of a snapshot
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+HERE     = Path(__file__).resolve().parent
+MESH_DIR = HERE / "result_cache" / "meshes"
+PART     = "Massif"
+KEYS     = ("evf", "elements", "rf_time", "rf", "mesh", "meta")
+
+
+# ─────────────────────────────── meshes ───────────────────────────────
+def _deck(deck):
+    from inp_deck import Deck
+    return deck if isinstance(deck, Deck) else Deck.read(deck)
+
+
+def mesh_arrays(deck, part: str = PART) -> dict:
+    """Node labels/coordinates, element labels/connectivity and centroids of a part (deck: Deck or path)."""
+    deck = _deck(deck)
+    N = deck.first("node", part=part).table()
+    E = deck.first("element", part=part).table().astype(np.int64)
+    lookup = np.zeros(int(N[:, 0].max()) + 1, dtype=np.int64)
+    lookup[N[:, 0].astype(np.int64)] = np.arange(len(N))
+    xyz = N[:, 1:4].astype(np.float32)
+    return {"nodes": N[:, 0].astype(np.int32), "xyz": xyz,
+            "elements": E[:, 0].astype(np.int32), "connectivity": E[:, 1:].astype(np.int32),
+            "centroids": xyz[lookup[E[:, 1:]]].mean(axis=1)}
+
+
+def mesh_key(deck, part: str = PART) -> str:
+    """Hash of the part's *Node and *Element blocks (JC edits do not change it)."""
+    deck = _deck(deck)
+    h = hashlib.sha256()
+    for name in ("node", "element"):
+        h.update(deck.first(name, part=part).text().encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def cache_mesh(deck, part: str = PART, mesh_dir: Path = MESH_DIR) -> str:
+    """Store the part's mesh once; returns its key."""
+    deck = _deck(deck)
+    key = mesh_key(deck, part)
+    path = mesh_dir / f"{key}.npz"
+    if not path.is_file():
+        # concurrent jobs of a batch may all get here: write aside, rename atomically
+        mesh_dir.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{key}.{os.getpid()}.tmp")
+        with tmp.open("wb") as fh:
+            np.savez_compressed(fh, **mesh_arrays(deck, part))
+        os.replace(tmp, path)
+    return key
+
+
+def load_mesh(key: str, mesh_dir: Path = MESH_DIR) -> dict:
+    with np.load(mesh_dir / f"{key}.npz") as z:
+        return {k: z[k] for k in z.files}
+
+
+# ─────────────────────────────── snapshots ────────────────────────────
+class Snapshot:
+    def __init__(self, evf, elements, rf_time, rf, mesh: str = "", meta: Optional[dict] = None):
+        self.evf = np.asarray(evf, dtype=np.float32)
+        self.elements = np.asarray(elements, dtype=np.int32)
+        self.rf_time = np.asarray(rf_time, dtype=np.float32)
+        self.rf = np.asarray(rf, dtype=np.float32).reshape(-1, 3)
+        self.mesh_key = mesh
+        self.meta = meta or {}
+
+    @property
+    def evf_void(self) -> np.ndarray:
+        return 1.0 - self.evf
+
+    def mesh(self, mesh_dir: Path = MESH_DIR) -> dict:
+        return load_mesh(self.mesh_key, mesh_dir)
+
+    def arrays(self) -> dict:
+        """The dict of arrays ResultCache.put(snapshot=…) and `save` store."""
+        return {"evf": self.evf, "elements": self.elements, "rf_time": self.rf_time, "rf": self.rf,
+                "mesh": np.array(self.mesh_key), "meta": np.array(json.dumps(self.meta))}
+
+    def save(self, path: Path) -> Path:
+        """Write as .npz, whatever the suffix (fake_abaqus.py names it <job>.odb)."""
+        path = Path(path)
+        with path.open("wb") as fh:
+            np.savez_compressed(fh, **self.arrays())
+        return path
+
+
+def load(source) -> Snapshot:
+    """A Snapshot from a path or an already opened NpzFile (ResultCache.snapshot)."""
+    z = np.load(source) if isinstance(source, (str, Path)) else source
+    try:
+        missing = [k for k in KEYS if k not in z.files]
+        if missing:
+            raise ValueError(f"Not a snapshot (missing {missing})")
+        return Snapshot(z["evf"], z["elements"], z["rf_time"], z["rf"],
+                        str(z["mesh"]), json.loads(str(z["meta"])))
+    finally:
+        if isinstance(source, (str, Path)):
+            z.close()
+
+
+def main(argv: List[str] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        sys.exit("usage: python snapshot.py file.npz")
+    s = load(Path(argv[0]))
+    print(f"{argv[0]}: {s.evf.size} elements (mesh {s.mesh_key}), {s.rf_time.size} RF frames")
+    print(f"  material volume fraction: mean {s.evf.mean():.3f}, "
+          f"{int(np.sum((s.evf > 0) & (s.evf < 1)))} partially filled elements")
+    print(f"  mean RF: {np.round(s.rf.mean(axis=0), 4).tolist()}")
+    print(f"  meta: {json.dumps(s.meta)}")
+
+
+if __name__ == "__main__":
+    main()
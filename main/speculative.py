@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+speculative.py  —  start the next finite-difference stencil before the step is confirmed
+=======================================================================================
+
+Without speculation, one identification iteration is strictly serial:
+
+    trial run at x⁺  →  grade the step  →  stencil around x⁺  →  next step
+
+Yet x⁺ is known before its run starts, and most steps are accepted.  A
+`Speculation` launches the perturbed runs of the stencil around the
+predicted point x⁺ in the background, while the confirming trial jobs are
+still running, on the workers they leave free (`spare_workers`:
+scheduler.MAX_WORKERS minus the trial batch, so the node is never
+oversubscribed; with no worker to spare there is no speculation):
+
+    spec = Speculation(x_pred, simulate_batch_fn)    # perturbations start now
+    y⁺   = simulate(x_pred)                          # confirming run, meanwhile
+    J    = spec.jacobian(x_acc, y_acc)               # reuse …
+           or None                                   # … or discard
+
+The Jacobian is differenced against the point that was actually accepted,
+with sensitivity.raw_jacobian (least squares over the real displacements).
+So the perturbations stay usable when the accepted point only lands near
+the prediction: a different candidate of the batch, or a rounding shift.
+Each parameter may be off by at most REUSE_FRACTION of its step.
+Farther away the speculation is discarded; runs that already finished
+still land in the cache and runs.jsonl, where local_jacobian.py can use them.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import numpy as np
+
+from fd_planner import plan
+from sensitivity import ResultsTable, raw_jacobian
+
+# ───────────────────────────── settings ──────────────────────────────
+REUSE_FRACTION = 0.5      # |x_acc − x_pred| / x_pred ≤ this × h_j for every j
+# ───────────────────────────────────────────────────────────────────────
+
+
+def spare_workers(trial_jobs: int = 1) -> int:
+    """scheduler.MAX_WORKERS minus the workers the trial batch occupies."""
+    from scheduler import MAX_WORKERS
+    return max(MAX_WORKERS - trial_jobs, 0)
+
+
+def _scheduler_batch(xs, names, stop: threading.Event, max_workers: int) -> list:
+    """scheduler.run_batch on the spare workers; failed or cancelled runs give NaNs."""
+    from scheduler import Job, run_batch
+    from sensitivity import OUTPUT_NAMES
+
+    jobs = [Job(n, x) for n, x in zip(names, xs)]
+    res = run_batch(jobs, max_workers=max_workers, stop=stop)
+    return [np.full(len(OUTPUT_NAMES), np.nan) if isinstance(res[j.name], Exception)
+            else np.array([res[j.name][k] for k in OUTPUT_NAMES], dtype=float) for j in jobs]
+
+
+class Speculation:
+    """Perturbed runs of a stencil around a predicted point, running in the background."""
+
+    def __init__(self, x_pred, simulate_batch_fn: Optional[Callable] = None,
+                 scheme: str = "forward", prefix: str = "spec", steps=None, trial_jobs: int = 1):
+        """
+        `simulate_batch_fn(xs, names)` runs the perturbations (NaN rows for
+        failures); by default they go through scheduler.run_batch on the
+        workers `trial_jobs` concurrent trial runs leave free, and
+        `discard` stops the queued ones.
+        """
+        self.stencil = plan(x_pred, scheme, steps=steps)
+        self.x_pred = self.stencil.x0
+        X = list(self.stencil.X[1:])                # the baseline is the confirming run
+        names = [f"{prefix}_{n}" for n in self.stencil.names[1:]]
+        self.n_runs = len(names)
+        self._stop = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=1)
+        if simulate_batch_fn is None:
+            workers = spare_workers(trial_jobs)
+            if workers < 1:
+                raise ValueError(f"no worker to spare next to {trial_jobs} trial jobs")
+            self._future = pool.submit(_scheduler_batch, X, names, self._stop, workers)
+        else:
+            self._future = pool.submit(simulate_batch_fn, X, names)
+        pool.shutdown(wait=False)
+
+    def distance(self, x) -> np.ndarray:
+        """Per-parameter offset from the prediction, in units of the stencil step."""
+        return np.abs((np.asarray(x, dtype=float) - self.x_pred) / self.x_pred) / self.stencil.steps
+
+    def usable(self, x) -> bool:
+        return bool(np.all(self.distance(x) <= REUSE_FRACTION))
+
+    def jacobian(self, x, y) -> Optional[np.ndarray]:
+        """
+        Raw Jacobian at the confirmed point (x, y) from the speculative runs,
+        or None if x is too far from the prediction or a run failed.
+        Waits for the perturbations that are still running.
+        """
+        if not self.usable(x):
+            self.discard()
+            return None
+        Y = np.asarray(self._future.result(), dtype=float)
+        if not np.all(np.isfinite(Y)):
+            return None
+        table = ResultsTable(np.vstack([x, self.stencil.X[1:]]), np.vstack([y, Y]))
+        return raw_jacobian(table)
+
+    def discard(self) -> None:
+        """Drop the speculation; runs not yet started are cancelled."""
+        self._stop.set()
+        self._future.cancel()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+stable_time.py  —  stable time increment and runtime of an explicit deck, before it runs
+========================================================================================
+
+Abaqus/Explicit advances with the smallest stable increment over the
+mesh, so the runtime of a deck follows from the deck itself:
+
+    L_e   = V_e / max face area                  (characteristic length; the
+                                                  smallest height of a brick)
+    c_d   = √((λ + 2μ) / ρ)                      (dilatational wave speed at
+                                                  REF_TEMPERATURE)
+    Δt_e  = L_e / c_d · (√(1 + ξ²) − ξ)          (ξ: linear bulk viscosity b1)
+    Δt_θ  = L_e² ρ c_p / (2 k)                   (thermal limit of the coupled step)
+    Δt    = min_e min(Δt_e, Δt_θ) · dt_ratio
+    N_inc = step time / Δt                       (0.84 for Href.inp)
+    wall(p) = N_inc · N_el · t₁ (s + (1 − s) / p) + overhead
+
+*Fixed/*Variable Mass Scaling with dt= lifts every Δt_e below that
+target, factor= multiplies them by √factor.  Rigid-body elements (the
+Tool) do not count.  `dt_ratio` (the global estimator Abaqus uses beats
+the element-by-element bound), the cost per element update t₁ and the
+serial fraction s (Amdahl) come from past runs:
+`--calibrate` reads their .sta files and writes stable_time_calibration.json.
+Without it the DEFAULT_* values below are used, good to a factor of a few.
+
+JC parameters do not enter the elastic wave speed, so all perturbations
+of one template share one prediction; the mesh, density, elastic table,
+step time and mass scaling do change it, which is what scheduler.py
+guards against (MAX_RUNTIME_RATIO).
+
+Run:
+    python stable_time.py [deck.inp] [--cpus 1 2 4 8]
+    python stable_time.py --calibrate jobs/*/*.sta [--cpus 4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from inp_deck import TEMPLATE, Deck
+
+# ───────────────────────────── settings ──────────────────────────────
+HERE             = Path(__file__).resolve().parent
+CALIBRATION_PATH = HERE / "stable_time_calibration.json"
+REF_TEMPERATURE  = 25.0          # initial temperature of the Massif (PF-Temperature)
+DEFAULT_BULK_B1  = 0.06          # Abaqus default linear bulk viscosity
+DEFAULT_DT_RATIO = 1.0           # measured / element-by-element stable increment
+DEFAULT_T1       = 2e-6          # s per element update on one CPU (Eulerian, coupled)
+DEFAULT_SERIAL   = 0.15          # Amdahl serial fraction
+DEFAULT_OVERHEAD = 30.0          # s of pre-/post-processing per job
+# ───────────────────────────────────────────────────────────────────────
+
+NUM = r"[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?"
+# explicit .sta progress line: increment, step time, total time, hh:mm:ss, stable increment
+P_STA = re.compile(rf"^\s*(\d+)\s+({NUM})\s+({NUM})\s+(\d+):(\d\d):(\d\d)\s+({NUM})", re.M)
+P_CPUS = re.compile(r"cpus\s*[=:]\s*(\d+)", re.I)
+
+
+# ─────────────────────────────── geometry ─────────────────────────────
+MODEL_KEYWORDS = ("part", "assembly", "surface interaction", "physical constants", "boundary",
+                  "initial conditions", "step")         # end of a *Material's options
+HEX_FACES = ((0, 1, 2, 3), (4, 5, 6, 7), (0, 1, 5, 4), (1, 2, 6, 5), (2, 3, 7, 6), (3, 0, 4, 7))
+
+
+def hex_lengths(xyz: np.ndarray) -> np.ndarray:
+    """Characteristic length V / max face area of 8-node bricks (N × 8 × 3 corners)."""
+    sx = np.array([-1, 1, 1, -1, -1, 1, 1, -1]) / 8.0
+    sy = np.array([-1, -1, 1, 1, -1, -1, 1, 1]) / 8.0
+    sz = np.array([-1, -1, -1, -1, 1, 1, 1, 1]) / 8.0
+    # volume from the isoparametric Jacobian at the centroid (exact for parallelepipeds)
+    J = np.stack([np.einsum("k,nkd->nd", s, xyz) for s in (sx, sy, sz)], axis=1)
+    V = 8.0 * np.abs(np.linalg.det(J))
+    A = np.stack([0.5 * np.linalg.norm(np.cross(xyz[:, f[2]] - xyz[:, f[0]], xyz[:, f[3]] - xyz[:, f[1]]),
+                                       axis=1) for f in HEX_FACES], axis=1)
+    return V / A.max(axis=1)
+
+
+def _at_temperature(table: np.ndarray, ncols: int, T: float) -> np.ndarray:
+    """Row of a temperature-dependent material table interpolated at T."""
+    table = np.atleast_2d(table)
+    if table.shape[1] <= ncols:
+        return table[0, :ncols]
+    order = np.argsort(table[:, ncols])
+    return np.array([np.interp(T, table[order, ncols], table[order, c]) for c in range(ncols)])
+
+
+def materials(deck: Deck, T: float = REF_TEMPERATURE) -> Dict[str, dict]:
+    """Density, elastic and thermal constants per material at temperature T."""
+    out: Dict[str, dict] = {}
+    current = None
+    for b in deck.blocks:
+        if b.name == "material":
+            current = out.setdefault(b.params["name"].strip('"'), {})
+        elif current is not None and b.name in ("density", "elastic", "conductivity", "specific heat"):
+            ncols = 2 if b.name == "elastic" else 1
+            row = _at_temperature(b.table(), ncols, T)
+            if b.name == "elastic":
+                current["E"], current["nu"] = row
+            else:
+                current[b.name] = float(row[0])
+        elif b.name in MODEL_KEYWORDS:
+            current = None
+    return out
+
+
+def wave_speed(props: dict) -> float:
+    E, nu, rho = props["E"], props["nu"], props["density"]
+    lam = E * nu / ((1 + nu) * (1 - 2 * nu))
+    mu = E / (2 * (1 + nu))
+    return float(np.sqrt((lam + 2 * mu) / rho))
+
+
+# ─────────────────────────────── analysis ─────────────────────────────
+def _rigid_parts(deck: Deck) -> set:
+    """Parts whose instances are made rigid by a *Rigid Body constraint."""
+    inst = {b.params["name"]: b.params.get("part") for b in deck.find("instance")}
+    rigid = set()
+    for b in deck.find("rigid body"):
+        ref = (b.params.get("elset") or "").split(".")[0]
+        if ref in inst:
+            rigid.add(inst[ref])
+    return rigid
+
+
+def step_settings(deck: Deck) -> dict:
+    """Step time, bulk viscosity b1 and any mass scaling of the explicit step."""
+    dyn = deck.first("dynamic temperature-displacement") or deck.first("dynamic")
+    step_time = float(dyn.data_lines()[0].split(",")[1]) if dyn is not None else float("nan")
+    bv = deck.first("bulk viscosity")
+    b1 = float(bv.data_lines()[0].split(",")[0]) if bv is not None and bv.data_lines() else DEFAULT_BULK_B1
+    scaling = [b for b in deck.blocks if b.name in ("fixed mass scaling", "variable mass scaling")]
+    return {"step_time": step_time, "b1": b1, "mass_scaling": [b.line.strip() for b in scaling],
+            "mass_dt": max((float(b.params["dt"]) for b in scaling if b.params.get("dt")), default=0.0),
+            "mass_factor": max((float(b.params["factor"]) for b in scaling if b.params.get("factor")),
+                               default=1.0)}
+
+
+def analyse(deck_path: Path = TEMPLATE, T: float = REF_TEMPERATURE) -> dict:
+    """Per-element stable increments of every deformable part and the step settings."""
+    deck = Deck.read(deck_path)
+    mats = materials(deck, T)
+    step = step_settings(deck)
+    rigid = _rigid_parts(deck)
+    damp = np.sqrt(1 + step["b1"] ** 2) - step["b1"]
+
+    labels, dts, dts_th, parts = [], [], [], []
+    for sec in list(deck.find("solid section")) + list(deck.find("eulerian section")):
+        if sec.part is None or sec.part in rigid:
+            continue
+        if sec.name == "solid section":
+            mat = sec.params["material"].strip('"')
+        else:                                   # first material of the Eulerian section
+            mat = sec.data_lines()[0].split(",")[0].strip().strip('"')
+        props = mats[mat]
+        nodes = deck.first("node", part=sec.part).table()
+        elems = deck.first("element", part=sec.part).table().astype(int)
+        in_set = deck.first("elset", part=sec.part, elset=sec.params["elset"])
+        if in_set is not None:
+            elems = elems[np.isin(elems[:, 0], in_set.ids())]
+        lookup = np.zeros(int(nodes[:, 0].max()) + 1, dtype=int)
+        lookup[nodes[:, 0].astype(int)] = np.arange(len(nodes))
+        L = hex_lengths(nodes[lookup[elems[:, 1:9]], 1:4])
+        dts.append(L / wave_speed(props) * damp)
+        if "conductivity" in props and "specific heat" in props:
+            dts_th.append(L ** 2 * props["density"] * props["specific heat"] / (2 * props["conductivity"]))
+        else:
+            dts_th.append(np.full(L.size, np.inf))
+        labels.append(elems[:, 0])
+        parts.append(np.full(L.size, sec.part, dtype=object))
+
+    # mass scaling: a uniform factor f raises every Δt by √f, a target dt lifts those below it
+    dt = np.maximum(np.concatenate(dts) * np.sqrt(step["mass_factor"]), step["mass_dt"])
+    dt_th = np.concatenate(dts_th)
+    return {"deck": str(deck_path), "labels": np.concatenate(labels), "parts": np.concatenate(parts),
+            "dt": np.minimum(dt, dt_th), "dt_mech": dt, "dt_thermal": dt_th, **step}
+
+
+# ─────────────────────────────── calibration ──────────────────────────
+def read_sta(path: Path) -> Optional[dict]:
+    """Increments, step time, wall seconds and first/last stable increment of an explicit .sta."""
+    rows = P_STA.findall(Path(path).read_text(encoding="latin-1", errors="ignore"))
+    if not rows:
+        return None
+    first, last = rows[0], rows[-1]
+    wall = int(last[3]) * 3600 + int(last[4]) * 60 + int(last[5])
+    return {"increments": int(last[0]), "step_time": float(last[1]), "wall": float(wall),
+            "dt_first": float(first[6]), "dt_last": float(last[6])}
+
+
+def job_cpus(sta: Path, default: int) -> int:
+    """CPU count of a finished job, from its .log / .msg when they record it."""
+    for ext in (".log", ".msg"):
+        f = Path(sta).with_suffix(ext)
+        if f.is_file():
+            m = P_CPUS.search(f.read_text(encoding="latin-1", errors="ignore"))
+            if m:
+                return int(m.group(1))
+    return default
+
+
+def fit_amdahl(p, c) -> tuple:
+    """(t₁, s) with c ≈ t₁ (s + (1 − s) / p); s = DEFAULT_SERIAL from a single CPU count."""
+    p, c = np.asarray(p, dtype=float), np.asarray(c, dtype=float)
+    if len(np.unique(p)) < 2:
+        return float(np.median(c * p / (DEFAULT_SERIAL * p + 1 - DEFAULT_SERIAL))), DEFAULT_SERIAL
+    (a, b), *_ = np.linalg.lstsq(np.stack([np.ones_like(p), 1 / p], axis=1), c, rcond=None)
+    a, b = max(a, 0.0), max(b, 1e-30)
+    return float(a + b), float(a / (a + b))
+
+
+def calibrate(sta_paths: Sequence[Path], cpus: Optional[int] = None,
+              out: Path = CALIBRATION_PATH) -> dict:
+    """Fit dt_ratio, t₁ and s from finished jobs (deck next to each .sta)."""
+    from scheduler import DEFAULT_CPUS
+    runs = []
+    for sta in map(Path, sta_paths):
+        s, deck = read_sta(sta), sta.with_suffix(".inp")
+        if s is None or not deck.is_file():
+            print(f"  ⊘ {sta}: no progress lines or no deck – skipped")
+            continue
+        a = analyse_cached(str(deck))
+        p = cpus or job_cpus(sta, DEFAULT_CPUS)
+        updates = s["increments"] * a["labels"].size
+        runs.append({"job": sta.stem, "cpus": p, "elements": int(a["labels"].size),
+                     "increments": s["increments"], "wall": s["wall"],
+                     "dt_ratio": s["dt_first"] / float(a["dt"].min()),
+                     "sec_per_update": max(s["wall"] - DEFAULT_OVERHEAD, 1.0) / updates})
+    if not runs:
+        raise ValueError("No usable .sta files")
+    t1, serial = fit_amdahl([r["cpus"] for r in runs], [r["sec_per_update"] for r in runs])
+    cal = {"dt_ratio": float(np.median([r["dt_ratio"] for r in runs])), "t1": t1, "serial": serial,
+           "overhead": DEFAULT_OVERHEAD, "runs": runs}
+    out.write_text(json.dumps(cal, indent=2), encoding="utf-8")
+    return cal
+
+
+def load_calibration(path: Path = CALIBRATION_PATH) -> dict:
+    if path.is_file():
+        return json.loads(path.read_text(encoding="utf-8"))
+    return {"dt_ratio": DEFAULT_DT_RATIO, "t1": DEFAULT_T1, "serial": DEFAULT_SERIAL,
+            "overhead": DEFAULT_OVERHEAD, "runs": []}
+
+
+# ─────────────────────────────── prediction ───────────────────────────
+_deck_of: Dict[str, str] = {}        # deck hash → a deck file with that hash (read on a miss)
+
+
+@lru_cache(maxsize=32)
+def _analyse_by_hash(digest: str) -> dict:
+    return analyse(Path(_deck_of[digest]))
+
+
+def analyse_cached(deck: str) -> dict:
+    """`analyse`, shared by every deck that differs only in its JC lines."""
+    from result_cache import deck_hash
+    digest = deck_hash(Path(deck))
+    _deck_of[digest] = str(deck)
+    return _analyse_by_hash(digest)
+
+
+def wall_time(updates: float, cpus, cal: dict) -> np.ndarray:
+    p = np.asarray(cpus, dtype=float)
+    return updates * cal["t1"] * (cal["serial"] + (1 - cal["serial"]) / p) + cal["overhead"]
+
+
+def predict(deck: Path = TEMPLATE, cpus: Sequence[int] = (1, 2, 4, 8), cal: dict = None) -> dict:
+    """Stable increment, increment count and wall seconds per CPU count of a deck."""
+    cal = cal or load_calibration()
+    a = analyse_cached(str(deck))
+    dt = float(a["dt"].min()) * cal["dt_ratio"]
+    n_inc = a["step_time"] / dt
+    updates = n_inc * a["labels"].size
+    return {"dt": dt, "increments": int(np.ceil(n_inc)), "elements": int(a["labels"].size),
+            "step_time": a["step_time"], "wall": dict(zip(map(int, cpus), wall_time(updates, cpus, cal).tolist())),
+            "critical": (a["parts"][np.argmin(a["dt"])], int(a["labels"][np.argmin(a["dt"])])),
+            "mass_scaling": a["mass_scaling"]}
+
+
+def main(argv: List[str] = None) -> None:
+    ap = argparse.ArgumentParser(description="Stable increment and runtime of an explicit deck.")
+    ap.add_argument("deck", nargs="*", default=[str(TEMPLATE)], help="deck, or .sta files with --calibrate")
+    ap.add_argument("--cpus", type=int, nargs="*", default=None)
+    ap.add_argument("--calibrate", action="store_true", help="fit the model to finished jobs' .sta files")
+    args = ap.parse_args(argv)
+
+    if args.calibrate:
+        cal = calibrate(args.deck, cpus=args.cpus[0] if args.cpus else None)
+        print(f"✓ {len(cal['runs'])} runs → dt_ratio {cal['dt_ratio']:.3f}, "
+              f"t₁ {cal['t1']:.3e} s/update, serial {cal['serial']:.2f}  ({CALIBRATION_PATH.name})")
+        return
+
+    for deck in args.deck:
+        a = analyse_cached(deck)
+        r = predict(Path(deck), args.cpus or (1, 2, 4, 8))
+        q = np.percentile(a["dt"], [0, 1, 50])
+        print(f"{deck}: {r['elements']} elements, step time {r['step_time']}")
+        print(f"  Δt element-by-element: min {q[0]:.3e} (element {r['critical'][1]} of {r['critical'][0]}), "
+              f"1% {q[1]:.3e}, median {q[2]:.3e}; thermal limit {a['dt_thermal'].min():.3e}")
+        print(f"  → Δt ≈ {r['dt']:.3e}, {r['increments']} increments"
+              + (f"  (mass scaling: {'; '.join(r['mass_scaling'])})" if r["mass_scaling"] else ""))
+        for p, t in r["wall"].items():
+            print(f"    {p:>3} CPU(s): {t / 3600:6.2f} h")
+
+
+if __name__ == "__main__":
+    main()
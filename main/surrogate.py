@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+surrogate.py  —  response-surface models fitted to every simulation in runs.jsonl
+================================================================================
+
+Each Abaqus run costs hours; evaluating a fitted model costs microseconds.
+Two surrogates map (TQ, A, B, n, m, C) to (chip, Lc, Fc, Fp), both on the
+parameters scaled to the physical box of Inverse.py,  u = 2(x − LB)/(UB − LB) − 1:
+
+  QuadraticSurface   full quadratic in u (28 terms), ridge-stabilised least
+                     squares; uncertainty from the regression covariance.
+                     Needs more runs than terms before it reports a finite σ.
+  GaussianProcess    linear trend + squared-exponential GP on the residuals,
+                     one length scale per parameter (ARD) shared by the four
+                     outputs, hyper-parameters by maximum marginal likelihood
+                     (SciPy).  σ grows away from the sampled runs.
+
+Both give  predict(x) → (mean, σ)  and  jacobian(x) → ∂y/∂x  analytically, in
+physical units, so  J · x0  is the normalised Jacobian Inverse.py consumes.
+
+`AssistedJacobian` plugs a surrogate into identify.py (--surrogate): at every
+new iterate the model is refitted to runs.jsonl.  A model fitted with the
+baseline run at x would reproduce it whatever its slopes, so trust is
+decided on evidence the fit has not seen:
+
+  hold-out     refitted without the runs at x, the model predicts the
+               simulated baseline, with a σ, both within REL_TOL of |y|
+  stability    its Jacobian at x agrees with the full model's within JAC_TOL
+  secant       J · Δx of the step that led to x (trapezoid over both ends)
+               matches the observed Δy within SECANT_TOL (+ REL_TOL · |y|)
+
+Anywhere else the perturbation stencil runs as usual, and those runs
+feed the next fit.
+
+Run:
+    python surrogate.py                       # fit both, leave-one-out errors
+    python surrogate.py x.json --kind gp      # prediction, σ and Jacobian at x
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from sensitivity import OUTPUT_NAMES, PARAM_NAMES
+
+# ───────────────────────────── settings ──────────────────────────────
+RIDGE    = 1e-8            # relative ridge on the quadratic normal equations
+REL_TOL  = 0.02            # trust: hold-out |μ − y| and σ within 2 % of |y| at the iterate
+JAC_TOL  = 0.10            # … hold-out and full normalised Jacobians within 10 % per output
+SECANT_TOL = 0.25          # … J · Δx of the last step within 25 % of the observed Δy
+MIN_RUNS = 8               # fewer runs than this → never trusted
+# ───────────────────────────────────────────────────────────────────────
+
+
+class _Surrogate:
+    """Scaling shared by both models; subclasses implement _fit/_predict/_jacobian_u."""
+
+    def __init__(self, lb=None, ub=None):
+        if lb is None or ub is None:
+            from Inverse import LB_phys, UB_phys
+            lb = LB_phys if lb is None else lb
+            ub = UB_phys if ub is None else ub
+        self.lb = np.asarray(lb, dtype=float)
+        self.ub = np.asarray(ub, dtype=float)
+        self.n_runs = 0
+
+    def scale(self, X) -> np.ndarray:
+        return 2.0 * (np.asarray(X, dtype=float) - self.lb) / (self.ub - self.lb) - 1.0
+
+    def fit(self, X, Y) -> "_Surrogate":
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        Y = np.atleast_2d(np.asarray(Y, dtype=float))
+        keep = np.all(np.isfinite(Y), axis=1)
+        self.n_runs = int(keep.sum())
+        self._fit(self.scale(X[keep]), Y[keep])
+        return self
+
+    @classmethod
+    def from_database(cls, db=None, **kw) -> "_Surrogate":
+        if db is None:
+            from run_database import RunDatabase
+            db = RunDatabase()
+        X, Y, _ = db.arrays(len(OUTPUT_NAMES))
+        if len(X) == 0:
+            raise ValueError(f"No completed runs in {db.path}")
+        return cls(**kw).fit(X, Y)
+
+    def predict(self, x):
+        """(mean, σ) of the outputs at x (n_out each; rows for a batch of x)."""
+        U = np.atleast_2d(self.scale(x))
+        mean, std = self._predict(U)
+        return (mean[0], std[0]) if np.ndim(x) == 1 else (mean, std)
+
+    def jacobian(self, x) -> np.ndarray:
+        """∂y_i/∂x_j (n_out × n_par) of the mean at x."""
+        return self._jacobian_u(self.scale(x)) * (2.0 / (self.ub - self.lb))[None, :]
+
+
+class QuadraticSurface(_Surrogate):
+    """y ≈ c + b·u + ½ uᵀ H u per output."""
+
+    def _features(self, U):
+        n = U.shape[1]
+        iu, ju = np.triu_indices(n)
+        return np.hstack([np.ones((U.shape[0], 1)), U, U[:, iu] * U[:, ju]])
+
+    def _fit(self, U, Y):
+        Phi = self._features(U)
+        p = Phi.shape[1]
+        A = Phi.T @ Phi
+        A += RIDGE * np.trace(A) / p * np.eye(p)
+        self._A_inv = np.linalg.inv(A)
+        self.coef = self._A_inv @ Phi.T @ Y                        # p × n_out
+        dof = U.shape[0] - p
+        rss = np.sum((Y - Phi @ self.coef) ** 2, axis=0)
+        self.sigma2 = rss / dof if dof > 0 else np.full(Y.shape[1], np.inf)
+
+    def _predict(self, U):
+        Phi = self._features(U)
+        lev = np.einsum("bi,ij,bj->b", Phi, self._A_inv, Phi)
+        return Phi @ self.coef, np.sqrt(self.sigma2[None, :] * (1.0 + lev[:, None]))
+
+    def _jacobian_u(self, u):
+        n = u.size
+        iu, ju = np.triu_indices(n)
+        dPhi = np.zeros((1 + n + iu.size, n))
+        dPhi[1:1 + n] = np.eye(n)
+        k = np.arange(iu.size)
+        dPhi[1 + n + k, iu] += u[ju]
+        dPhi[1 + n + k, ju] += u[iu]
+        return self.coef.T @ dPhi
+
+
+class GaussianProcess(_Surrogate):
+    """Linear trend + ARD squared-exponential GP on the standardised residuals."""
+
+    def _kernel(self, U1, U2, ell):
+        d = (U1[:, None, :] - U2[None, :, :]) / ell
+        return np.exp(-0.5 * np.sum(d * d, axis=2))
+
+    def _nll(self, theta, U, R):
+        ell, g = np.exp(theta[:-1]), np.exp(theta[-1])
+        K = self._kernel(U, U, ell) + g * np.eye(len(U))
+        try:
+            L = np.linalg.cholesky(K)
+        except np.linalg.LinAlgError:
+            return 1e30
+        a = np.linalg.solve(L, R)
+        N = len(U)
+        s2 = np.sum(a * a, axis=0) / N                              # σ² profiled out
+        return 0.5 * N * np.sum(np.log(s2)) + R.shape[1] * np.sum(np.log(np.diag(L)))
+
+    def _fit(self, U, Y):
+        from scipy.optimize import minimize
+
+        N, n = U.shape
+        T = np.hstack([np.ones((N, 1)), U])
+        self.trend, *_ = np.linalg.lstsq(T, Y, rcond=None)          # (1 + n) × n_out
+        R = Y - T @ self.trend
+        self.y_scale = np.where(R.std(axis=0) > 0, R.std(axis=0), 1.0)
+        R = R / self.y_scale
+
+        theta0 = np.r_[np.zeros(n), np.log(1e-4)]
+        bounds = [(np.log(0.05), np.log(20.0))] * n + [(np.log(1e-8), np.log(0.5))]
+        res = minimize(self._nll, theta0, args=(U, R), method="L-BFGS-B", bounds=bounds)
+        self.ell, self.nugget = np.exp(res.x[:-1]), float(np.exp(res.x[-1]))
+
+        K = self._kernel(U, U, self.ell) + self.nugget * np.eye(N)
+        self._U = U
+        self._K_inv = np.linalg.inv(K)
+        self.alpha = self._K_inv @ R                                  # N × n_out
+        self.sigma2 = np.sum(R * self.alpha, axis=0) / N
+
+    def _predict(self, U):
+        k = self._kernel(U, self._U, self.ell)                       # B × N
+        mean = np.hstack([np.ones((len(U), 1)), U]) @ self.trend + (k @ self.alpha) * self.y_scale
+        var = 1.0 + self.nugget - np.einsum("bi,ij,bj->b", k, self._K_inv, k)
+        std = np.sqrt(np.maximum(var, 0.0)[:, None] * self.sigma2[None, :]) * self.y_scale
+        return mean, std
+
+    def _jacobian_u(self, u):
+        k = self._kernel(u[None, :], self._U, self.ell)[0]           # N
+        dk = -k[:, None] * (u[None, :] - self._U) / self.ell ** 2     # N × n
+        return self.trend[1:].T + (self.alpha.T @ dk) * self.y_scale[:, None]
+
+
+MODELS = {"quadratic": QuadraticSurface, "gp": GaussianProcess}
+
+
+# ─────────────────────── Jacobian for identify.py ─────────────────────
+class AssistedJacobian:
+    """
+    Drop-in `jacobian_fn` for identify.identify: the surrogate's Jacobian
+    where it is trusted at x, the usual stencil (`fallback`) elsewhere.
+    `last_runs` is the number of perturbed runs the last call cost, and
+    `reduced` / `full_next` pass through to a fallback that has them
+    (identifiability.ReducedJacobian), so identify.py still sees a step
+    stalled in the reduced directions.
+    """
+
+    def __init__(self, kind: str = "gp", db=None, rel_tol: float = REL_TOL,
+                 simulate_fn: Optional[Callable] = None, fallback: Optional[Callable] = None):
+        self.kind = kind
+        self.db = db
+        self.rel_tol = rel_tol
+        self.simulate_fn = simulate_fn
+        self.fallback = fallback
+        self.last_runs = 0
+        self.model = None
+        self.holdout = None             # the model without the runs at x
+        self.why = None                 # why the last x was not trusted
+        self._last = None               # (x, y) of the previous call
+        self.reduced = False            # did the last call freeze directions (fallback's)?
+        self._full = False
+
+    def full_next(self) -> None:
+        """Make the next call a full stencil: no surrogate, and the fallback's full_next."""
+        self._full = True
+        if hasattr(self.fallback, "full_next"):
+            self.fallback.full_next()
+
+    def _fit(self, x) -> None:
+        from result_cache import PARAM_DECIMALS
+        if self.db is None:
+            from run_database import RunDatabase
+            self.db = RunDatabase()
+        self.model = self.holdout = None
+        X, Y, _ = self.db.arrays(len(OUTPUT_NAMES))
+        if len(X) == 0:
+            raise ValueError(f"No completed runs in {self.db.path}")
+        self.model = MODELS[self.kind]().fit(X, Y)
+        at_x = np.all(np.round(X, PARAM_DECIMALS) == np.round(x, PARAM_DECIMALS), axis=1)
+        if (~at_x).sum() >= MIN_RUNS:
+            self.holdout = MODELS[self.kind]().fit(X[~at_x], Y[~at_x])
+
+    def trusted(self, x, y) -> bool:
+        if self.model is None or self.holdout is None or self.holdout.n_runs < MIN_RUNS:
+            self.why = "too few runs"
+            return False
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        scale = np.abs(y)
+        mean, std = self.holdout.predict(x)
+        if np.any(np.abs(mean - y) > self.rel_tol * scale) or np.any(std > self.rel_tol * scale):
+            self.why = "hold-out prediction off"
+            return False
+        J, J_hold = self.model.jacobian(x) * x, self.holdout.jacobian(x) * x
+        if np.any(np.linalg.norm(J - J_hold, axis=1) > JAC_TOL * np.linalg.norm(J, axis=1)):
+            self.why = "Jacobian unstable without the runs at x"
+            return False
+        if self._last is not None and np.any(self._last[0] != x):
+            x_prev, y_prev = self._last
+            dy = y - y_prev
+            pred = 0.5 * (self.model.jacobian(x) + self.model.jacobian(x_prev)) @ (x - x_prev)
+            if np.any(np.abs(pred - dy) > SECANT_TOL * np.abs(dy) + self.rel_tol * scale):
+                self.why = "last step's secant not matched"
+                return False
+        self.why = None
+        return True
+
+    def __call__(self, x, scheme: str = "forward", prefix: str = "fd", **kw):
+        import identify
+        simulate_fn = self.simulate_fn or identify.simulate
+        fallback = self.fallback or identify.fd_jacobian
+
+        try:
+            self._fit(x)
+        except (ValueError, np.linalg.LinAlgError) as err:
+            print(f"  surrogate not available: {err}")
+            self.model = self.holdout = None
+        y = np.asarray(simulate_fn(x, f"{prefix}_base"), dtype=float)   # cache hit in the loop
+        trusted = not self._full and self.trusted(x, y)
+        self._last = (np.asarray(x, dtype=float), y)
+        if trusted:
+            self.last_runs = 0
+            self.reduced = False
+            print(f"  ◆ surrogate Jacobian ({self.kind}, {self.model.n_runs} runs) – no stencil")
+            return y, self.model.jacobian(x)
+        print(f"  surrogate not used ({'full stencil requested' if self._full else self.why}) – stencil")
+        self._full = False
+        out = fallback(x, scheme, prefix, **kw)
+        self.last_runs = getattr(fallback, "last_runs", identify.jacobian_runs(scheme, np.size(x)))
+        self.reduced = getattr(fallback, "reduced", False)
+        return out
+
+
+# ─────────────────────────────── CLI ─────────────────────────────────
+def loo_errors(model_cls, X, Y) -> np.ndarray:
+    """Leave-one-out |error| / |y| per run and output."""
+    err = np.empty_like(Y)
+    for i in range(len(X)):
+        keep = np.arange(len(X)) != i
+        mean, _ = model_cls().fit(X[keep], Y[keep]).predict(X[i])
+        err[i] = np.abs(mean - Y[i]) / np.abs(Y[i])
+    return err
+
+
+def main(argv: List[str] = None) -> None:
+    ap = argparse.ArgumentParser(description="Fit surrogates to runs.jsonl.")
+    ap.add_argument("x", nargs="?", help="JSON with 6 parameters to predict at")
+    ap.add_argument("--kind", choices=sorted(MODELS), default=None)
+    args = ap.parse_args(argv)
+
+    from run_database import RunDatabase
+    X, Y, _ = RunDatabase().arrays(len(OUTPUT_NAMES))
+    if len(X) == 0:
+        raise SystemExit("No completed runs in runs.jsonl")
+    kinds = [args.kind] if args.kind else sorted(MODELS)
+
+    for kind in kinds:
+        model = MODELS[kind]().fit(X, Y)
+        print(f"{kind}: fitted to {model.n_runs} runs")
+        if args.x is None:
+            err = loo_errors(MODELS[kind], X, Y)
+            print("  leave-one-out median error  " +
+                  "  ".join(f"{o} {e:.2%}" for o, e in zip(OUTPUT_NAMES, np.median(err, axis=0))))
+            continue
+        x = np.array(json.loads(Path(args.x).read_text(encoding="utf-8")), dtype=float)
+        t0 = time.perf_counter()
+        mean, std = model.predict(x)
+        J = model.jacobian(x)
+        dt = (time.perf_counter() - t0) * 1e6
+        for o, m, s in zip(OUTPUT_NAMES, mean, std):
+            print(f"  {o:<15} {m:12.6g} ± {s:.3g}")
+        print("  normalised Jacobian (∂y/∂x · x):   " + "  ".join(PARAM_NAMES))
+        for row in J * x[None, :]:
+            print("  " + "".join(f"{v:14.6f}" for v in row))
+        print(f"  prediction + Jacobian in {dt:.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
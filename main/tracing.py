@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+tracing.py  —  where the minutes go: spans from every process, one Chrome trace per iteration
+==============================================================================================
+
+    with span("solver", job="Yil", cpus=4):
+        submit(job)
+
+records one complete event ("ph": "X") in the Chrome trace format, which
+chrome://tracing and ui.perfetto.dev open directly.  Spans cost nothing
+until tracing is on: `identify.py --trace` calls `enable`, then
+`start_iteration("it03")` at every iteration.  The iteration's folder is
+put in LOOP_TRACE_DIR, which every subprocess inherits (the Abaqus
+solver, the cae extractors, fake_abaqus.py), and each process appends its
+spans to spans-<pid>.jsonl there.  Timestamps are wall-clock
+microseconds, so the files of different processes line up; when the
+iteration ends they are merged into traces/<run>/it03.json.
+
+Only the standard library is used, so the Abaqus-Python extractors can
+import it (scheduler.py puts this folder on their PYTHONPATH while
+tracing); without it they fall back to a no-op `span`.
+
+Stages reported: deck generation, queue wait, solver, chip/force
+extraction (and inside them ODB open, EVF read, detection, distance
+search, contact length, RF read), Jacobian, QP solve, trial, deck update.
+
+Run:
+    python identify.py x0.json --trace
+    python tracing.py summary traces/<run>/it03.json   # seconds per stage
+    python tracing.py merge <span folder> out.json
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+# ───────────────────────────── settings ──────────────────────────────
+HERE       = Path(__file__).resolve().parent
+TRACE_ROOT = HERE / "traces"
+ENV_DIR    = "LOOP_TRACE_DIR"        # folder the spans of the current iteration go to
+# ───────────────────────────────────────────────────────────────────────
+
+_lock = threading.Lock()
+_named = set()                       # (folder, pid, tid) already given a name
+_run: Optional[Path] = None          # traces/<run> of this driver, once enabled
+_current: Optional[str] = None       # name of the open iteration
+PROCESS_NAME: Optional[str] = None   # label of this process in the trace
+
+
+def now_us() -> int:
+    return time.time_ns() // 1000
+
+
+def enabled() -> bool:
+    return bool(os.environ.get(ENV_DIR))
+
+
+def set_process_name(name: str) -> None:
+    global PROCESS_NAME
+    PROCESS_NAME = name
+
+
+def _emit(event: dict) -> None:
+    folder = os.environ.get(ENV_DIR)
+    if not folder:
+        return
+    pid, tid = os.getpid(), threading.get_ident()
+    event.update(pid=pid, tid=tid)
+    lines = []
+    with _lock:
+        if (folder, pid, None) not in _named:
+            _named.add((folder, pid, None))
+            name = PROCESS_NAME or " ".join([os.path.basename(sys.argv[0] or "python")] + sys.argv[1:3])
+            lines.append({"name": "process_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+        if (folder, pid, tid) not in _named:
+            _named.add((folder, pid, tid))
+            lines.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                          "args": {"name": threading.current_thread().name}})
+        lines.append(event)
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"spans-{pid}.jsonl"), "a", encoding="utf-8") as fh:
+            fh.write("".join(json.dumps(e) + "\n" for e in lines))
+
+
+def add_span(name: str, start_us: int, end_us: int, cat: str = "loop", **args) -> None:
+    """A span measured elsewhere (e.g. the wait of a job in the queue)."""
+    if enabled():
+        _emit({"name": name, "cat": cat, "ph": "X", "ts": start_us, "dur": max(0, end_us - start_us),
+               "args": args})
+
+
+@contextmanager
+def span(name: str, cat: str = "loop", **args):
+    if not enabled():
+        yield
+        return
+    ts, t0 = now_us(), time.perf_counter()
+    try:
+        yield
+    finally:
+        _emit({"name": name, "cat": cat, "ph": "X", "ts": ts,
+               "dur": int((time.perf_counter() - t0) * 1e6), "args": args})
+
+
+# ─────────────────────────────── iterations ───────────────────────────
+def enable(root: Path = TRACE_ROOT, run: Optional[str] = None) -> Path:
+    """Turn tracing on for this driver; traces go to root/<run>/."""
+    global _run
+    _run = Path(root) / (run or datetime.now().strftime("%Y%m%d-%H%M%S"))
+    _run.mkdir(parents=True, exist_ok=True)
+    return _run
+
+
+def start_iteration(name: str) -> None:
+    """Close the open iteration (merged into its trace file) and send spans to a new one."""
+    global _current
+    if _run is None:
+        return
+    finish()
+    _current = name
+    os.environ[ENV_DIR] = str(_run / f"{name}.spans")
+
+
+def finish() -> Optional[Path]:
+    """Merge the open iteration into traces/<run>/<name>.json and stop recording."""
+    global _current
+    if _run is None or _current is None:
+        return None
+    folder = Path(os.environ.pop(ENV_DIR, "") or _run / f"{_current}.spans")
+    out = merge(folder, _run / f"{_current}.json")
+    shutil.rmtree(folder, ignore_errors=True)
+    print(f"  ◆ trace {out}")
+    _current = None
+    return out
+
+
+def merge(folder: Path, out: Path) -> Path:
+    """All spans-*.jsonl of a folder as one Chrome trace JSON (metadata first, then by time)."""
+    meta, events = [], []
+    for f in sorted(Path(folder).glob("spans-*.jsonl")):
+        for line in f.read_text(encoding="utf-8").splitlines():
+            try:
+                e = json.loads(line)
+            except ValueError:              # a process killed mid-write
+                continue
+            (meta if e.get("ph") == "M" else events).append(e)
+    events.sort(key=lambda e: e["ts"])
+    Path(out).write_text(json.dumps({"traceEvents": meta + events, "displayTimeUnit": "ms"}), encoding="utf-8")
+    return Path(out)
+
+
+def summary(trace: Path) -> dict:
+    """{span name: (count, total seconds)} of a merged trace."""
+    out: dict = {}
+    for e in json.loads(Path(trace).read_text(encoding="utf-8"))["traceEvents"]:
+        if e.get("ph") == "X":
+            n, s = out.get(e["name"], (0, 0.0))
+            out[e["name"]] = (n + 1, s + e["dur"] / 1e6)
+    return out
+
+
+def child_env() -> dict:
+    """Environment for a subprocess: this folder on PYTHONPATH, so extractors can import tracing."""
+    env = dict(os.environ)
+    if enabled():
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (str(HERE), env.get("PYTHONPATH")) if p)
+    return env
+
+
+def main(argv: List[str] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["merge"] and len(argv) == 3:
+        print(f"✓ {merge(Path(argv[1]), Path(argv[2]))}")
+    elif argv[:1] == ["summary"] and len(argv) == 2:
+        rows = sorted(summary(Path(argv[1])).items(), key=lambda kv: -kv[1][1])
+        for name, (n, s) in rows:
+            print(f"  {name:<22} {n:>5} ×  {s:10.3f} s")
+    else:
+        sys.exit("usage: python tracing.py merge <span folder> out.json | summary trace.json")
+
+
+if __name__ == "__main__":
+    main()